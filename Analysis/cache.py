@@ -0,0 +1,40 @@
+"""On-disk cache locations keyed by the content they were derived from."""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+CACHE_ROOT = "Data/cache"
+
+
+def file_key(path: str | Path) -> str:
+    """Short key that changes whenever *path* is moved, rewritten or touched."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return hashlib.sha1(f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def params_key(**params: Any) -> str:
+    """Short key for a set of JSON-serialisable parameters."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cache_file(kind: str, source: str | Path, suffix: str = ".npz", cache_root: str | Path = CACHE_ROOT,
+               **params: Any) -> Path:
+    """``<cache_root>/<kind>/<source stem>_<key><suffix>`` for a recording and parameters."""
+    key = file_key(source)
+    if params:
+        key = f"{key}_{params_key(**params)}"
+    return Path(cache_root) / kind / f"{Path(source).stem}_{key}{suffix}"
+
+
+def cohort_cache_file(kind: str, name: str, suffix: str = ".npz", cache_root: str | Path = CACHE_ROOT,
+                      **params: Any) -> Path:
+    """``<cache_root>/<kind>/<name>_<key><suffix>`` for results derived from several recordings.
+
+    The recordings are not part of the key; store their :func:`file_key`
+    with the result and compare on load.
+    """
+    return Path(cache_root) / kind / f"{name}_{params_key(**params)}{suffix}"
@@ -0,0 +1,119 @@
+"""Attentional capture by the ItalianGame distractors.
+
+For every ``VISUAL_DISTRACTION n x y`` the module looks for a saccade landing
+within ``RED_CIRCLE_RADIUS`` of the red circle and reports the capture
+latency; every ``VISUAL_DISTRACTION`` and ``BEEP n`` also gets a
+baseline-corrected pupil response.  Saccade windows are resolved for all
+events at once from sorted saccade starts (``searchsorted`` + flattened
+index ranges), never by scanning a trial per event.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .pupil import preprocess_pupil
+from .task_constants import RED_CIRCLE_DURATION, RED_CIRCLE_RADIUS
+from .trial_arrays import expand_ranges, session_saccades, trial_of
+
+CAPTURE_WINDOW = (80, int(RED_CIRCLE_DURATION) + 500)  # ms after onset
+PUPIL_WINDOW = (-200, 2000)
+PUPIL_BASELINE = (-200, 0)
+
+
+def distraction_events(asc: AscParser) -> pd.DataFrame:
+    """``BEEP``/``VISUAL_DISTRACTION`` messages as ``time, kind, count, x, y, trial_id``."""
+    rows = []
+    for ts, msg in asc.messages:
+        parts = msg.split()
+        if parts[0] == "VISUAL_DISTRACTION" and len(parts) == 4:
+            rows.append((ts, "visual", int(parts[1]), float(parts[2]), float(parts[3])))
+        elif parts[0] == "BEEP" and len(parts) == 2:
+            rows.append((ts, "beep", int(parts[1]), np.nan, np.nan))
+    events = pd.DataFrame(rows, columns=["time", "kind", "count", "x", "y"])
+    events["trial_id"] = trial_of(asc, events["time"].to_numpy())
+    return events
+
+
+def saccade_capture(events: pd.DataFrame, saccades: pd.DataFrame,
+                    window: Tuple[int, int] = CAPTURE_WINDOW,
+                    radius: float = RED_CIRCLE_RADIUS) -> Tuple[np.ndarray, np.ndarray]:
+    """Capture flag and latency (ms, NaN if not captured) for every event.
+
+    Only events with a position (visual distractions) can be captured.
+    """
+    onsets = events["time"].to_numpy(dtype=np.int64)
+    starts = saccades["start"].to_numpy(dtype=np.int64)
+    lo = np.searchsorted(starts, onsets + window[0], side="left")
+    hi = np.searchsorted(starts, onsets + window[1], side="right")
+    owner, idx = expand_ranges(lo, hi)
+
+    dx = saccades["x_end"].to_numpy(float)[idx] - events["x"].to_numpy(float)[owner]
+    dy = saccades["y_end"].to_numpy(float)[idx] - events["y"].to_numpy(float)[owner]
+    hit = np.hypot(dx, dy) <= radius  # NaN positions never hit
+
+    captured = np.zeros(len(events), dtype=bool)
+    latency = np.full(len(events), np.nan)
+    first_owner, first = np.unique(owner[hit], return_index=True)  # owner is sorted
+    captured[first_owner] = True
+    latency[first_owner] = starts[idx[hit][first]] - onsets[first_owner]
+    return captured, latency
+
+
+def analyse_distractions(asc: AscParser, eye: Optional[str] = None,
+                         window: Tuple[int, int] = CAPTURE_WINDOW,
+                         radius: float = RED_CIRCLE_RADIUS) -> pd.DataFrame:
+    """One row per distraction with capture and pupil-response columns.
+
+    ``pupil_peak`` / ``pupil_peak_latency`` are the maximum baseline-corrected
+    dilation in ``PUPIL_WINDOW`` and its time after onset; ``pupil_mean`` is
+    the mean over the post-onset part of the window.
+    """
+    events = distraction_events(asc)
+    captured, latency = saccade_capture(events, session_saccades(asc, eye), window, radius)
+    events["captured"] = captured
+    events["capture_latency"] = latency
+
+    trace = preprocess_pupil(asc, eye)
+    offsets, data = trace.epochs(events["time"].to_numpy(), PUPIL_WINDOW, PUPIL_BASELINE)
+    post = data[:, offsets >= 0]
+    has_data = np.isfinite(post).any(axis=1)
+    peak_idx = np.argmax(np.where(np.isfinite(post), post, -np.inf), axis=1)
+    events["pupil_peak"] = np.where(has_data, post[np.arange(len(post)), peak_idx], np.nan)
+    events["pupil_peak_latency"] = np.where(has_data, offsets[offsets >= 0][peak_idx], np.nan)
+    with np.errstate(all="ignore"):
+        events["pupil_mean"] = np.where(has_data, np.nansum(post, axis=1) / np.isfinite(post).sum(axis=1), np.nan)
+    return events
+
+
+def report_accuracy(performance_file: str | Path) -> pd.DataFrame:
+    """Shown vs. reported distraction counts from a ``GAME_*_performance.json``.
+
+    ``game_round`` returns ``(health, spawned, tung_tung_kills, shown, reported)``:
+    *spawned* counts every animal, *tung_tung_kills* only the killed
+    ``Tung_Tung_Sahur``.
+    """
+    with open(performance_file, "r") as f:
+        rounds = json.load(f)
+    table = pd.DataFrame(rounds, columns=["health", "spawned", "tung_tung_kills", "shown", "reported"])
+    table["count_error"] = table["reported"] - table["shown"]
+    return table
+
+
+def _session_distractions(asc_file: str | Path, kwargs: dict) -> pd.DataFrame:
+    return analyse_distractions(AscParser(asc_file), **kwargs)
+
+
+def cohort_distractions(asc_files: Dict[str, str | Path], max_workers: Optional[int] = None,
+                        **kwargs) -> pd.DataFrame:
+    """:func:`analyse_distractions` for every participant in a process pool."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_distractions, asc_files.values(), [kwargs] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
@@ -0,0 +1,169 @@
+"""Offline drift correction from the fixation-cross periods.
+
+``Utils.drift_correction`` only runs at block starts, but every search and
+reaction trial opens with ``FIX_POINT_DRAWN`` and a 1 s central "+".  The
+median gaze in that window minus the screen centre is a per-trial drift
+estimate.  Unreliable windows (too dispersed, too far off, too little data)
+are dropped, and the remaining offsets are applied either per trial (step
+function) or linearly interpolated over the session.
+
+Corrected samples and the drift model are cached per recording.  The
+fixation-based AOI measures take a ``drift=`` mode and correct the EFIX
+positions with :func:`fixation_positions`::
+
+    samples = corrected_samples(AscParser("SEARCH_roi.asc"))
+    fixations = fixation_positions(asc, "3", drift="trial")
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cache_file
+from .epochs import SessionGrid
+from .trial_arrays import event_times, fixation_array, screen_size, session_samples
+
+FIXATION_MSG = "FIX_POINT_DRAWN"
+FIXATION_WINDOW = (300, 1000)  # ms after FIX_POINT_DRAWN, skipping the saccade to the cross
+MAX_DISPERSION = 60  # px, median absolute deviation of gaze in the window
+MAX_OFFSET = 200  # px
+MIN_VALID_FRACTION = 0.5
+X_CHANNELS = ("x", "x_l", "x_r")
+Y_CHANNELS = ("y", "y_l", "y_r")
+
+
+class DriftModel:
+    """Accepted drift estimates of one session.
+
+    ``anchor_times`` are the ``FIX_POINT_DRAWN`` times, ``offsets`` the
+    ``(N, 2)`` gaze-minus-centre estimates in px.
+    """
+
+    def __init__(self, anchor_times: np.ndarray, offsets: np.ndarray, mode: str = "trial"):
+        if mode not in ("trial", "interpolate"):
+            raise ValueError(f"Unknown drift mode {mode!r}")
+        self.anchor_times = anchor_times
+        self.offsets = offsets
+        self.mode = mode
+
+    def offset_at(self, times: np.ndarray) -> np.ndarray:
+        """``(N, 2)`` offset to subtract at each EyeLink time."""
+        times = np.asarray(times, dtype=float)
+        if self.anchor_times.size == 0:
+            return np.zeros((times.size, 2))
+        if self.mode == "interpolate":
+            return np.column_stack([np.interp(times, self.anchor_times, self.offsets[:, k]) for k in (0, 1)])
+        idx = np.clip(np.searchsorted(self.anchor_times, times, side="right") - 1, 0, None)
+        return self.offsets[idx]
+
+    def apply(self, times: np.ndarray, xy: np.ndarray) -> np.ndarray:
+        """Corrected copy of an ``(N, 2)`` position array."""
+        return np.asarray(xy, dtype=float) - self.offset_at(times)
+
+
+def estimate_drift(asc: AscParser, mode: str = "trial", grid: Optional[SessionGrid] = None,
+                   window: Tuple[int, int] = FIXATION_WINDOW,
+                   centre: Optional[Tuple[float, float]] = None) -> DriftModel:
+    """Per-trial drift estimates from the fixation-cross windows.
+
+    *centre* defaults to the middle of the recorded ``DISPLAY_COORDS``.
+    """
+    grid = grid or SessionGrid(asc, ["x", "y"])
+    cx, cy = centre or tuple(s // 2 for s in screen_size(asc))
+    onsets = event_times(asc, FIXATION_MSG)
+    xy = grid.epochs_at(onsets, window, ["x", "y"]).data  # (E, S, 2)
+
+    valid_fraction = np.isfinite(xy).all(axis=2).mean(axis=1) if xy.size else np.zeros(len(onsets))
+    enough = valid_fraction >= MIN_VALID_FRACTION
+    median = np.full((len(onsets), 2), np.nan)
+    dispersion = np.full(len(onsets), np.inf)
+    if enough.any():
+        median[enough] = np.nanmedian(xy[enough], axis=1)
+        dispersion[enough] = np.nanmedian(np.abs(xy[enough] - median[enough, None, :]), axis=1).max(axis=1)
+    offsets = median - (cx, cy)
+
+    ok = enough & (dispersion <= MAX_DISPERSION) & (np.hypot(offsets[:, 0], offsets[:, 1]) <= MAX_OFFSET)
+    return DriftModel(onsets[ok], offsets[ok], mode)
+
+
+def correct_samples(samples: pd.DataFrame, model: DriftModel) -> pd.DataFrame:
+    """Copy of *samples* (indexed by time) with every gaze channel corrected."""
+    corrected = samples.copy()
+    offset = model.offset_at(samples.index.to_numpy())
+    for column in X_CHANNELS:
+        if column in corrected:
+            corrected[column] = corrected[column] - offset[:, 0]
+    for column in Y_CHANNELS:
+        if column in corrected:
+            corrected[column] = corrected[column] - offset[:, 1]
+    return corrected
+
+
+def correct_fixations(fixations: np.ndarray, model: DriftModel) -> np.ndarray:
+    """Copy of an ``(N, 5)`` :func:`~Analysis.trial_arrays.fixation_array` with corrected positions.
+
+    Each fixation is corrected with the offset at its midpoint.
+    """
+    corrected = np.array(fixations, dtype=float)
+    corrected[:, 2:4] = model.apply((corrected[:, 0] + corrected[:, 1]) / 2, corrected[:, 2:4])
+    return corrected
+
+
+def _cache_path(asc: AscParser, mode: str, cache_root: str | Path) -> Path:
+    return cache_file("drift", asc.filepath, mode=mode, window=FIXATION_WINDOW,
+                      max_dispersion=MAX_DISPERSION, max_offset=MAX_OFFSET, cache_root=cache_root)
+
+
+def corrected_samples(asc: AscParser, mode: str = "trial", cache_root: str | Path = CACHE_ROOT,
+                      refresh: bool = False) -> pd.DataFrame:
+    """Drift-corrected session samples, cached as ``.npz``.
+
+    The cached file holds the corrected channels and the drift model, keyed
+    by the ASC file and *mode*.
+    """
+    path = _cache_path(asc, mode, cache_root)
+    if path.exists() and not refresh:
+        with np.load(path, allow_pickle=False) as data:
+            columns = data["columns"].tolist()
+            return pd.DataFrame(data["corrected"], index=pd.Index(data["time"], name="time"), columns=columns)
+
+    samples = session_samples(asc)
+    model = estimate_drift(asc, mode)
+    corrected = correct_samples(samples, model)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        time=samples.index.to_numpy(),
+        columns=np.array(samples.columns, dtype=str),
+        corrected=corrected.to_numpy(dtype=float),
+        anchor_times=model.anchor_times,
+        offsets=model.offsets,
+    )
+    return corrected
+
+
+def drift_model(asc: AscParser, mode: str = "trial", cache_root: str | Path = CACHE_ROOT) -> DriftModel:
+    """The cached :class:`DriftModel` of a session."""
+    path = _cache_path(asc, mode, cache_root)
+    if not path.exists():
+        corrected_samples(asc, mode, cache_root)
+    with np.load(path, allow_pickle=False) as data:
+        return DriftModel(data["anchor_times"], data["offsets"], mode)
+
+
+def fixation_positions(asc: AscParser, trial_id: str, eye: Optional[str] = None, drift: Optional[str] = None,
+                       cache_root: str | Path = CACHE_ROOT) -> np.ndarray:
+    """:func:`~Analysis.trial_arrays.fixation_array`, drift-corrected when *drift* names a mode.
+
+    *drift* is ``"trial"`` or ``"interpolate"`` (see :class:`DriftModel`);
+    *None* keeps the recorded positions.
+    """
+    fixations = fixation_array(asc, trial_id, eye)
+    if drift is None:
+        return fixations
+    return correct_fixations(fixations, drift_model(asc, drift, cache_root))
@@ -0,0 +1,139 @@
+"""Message-anchored epoching into stacked NumPy arrays.
+
+A :class:`SessionGrid` puts every sample of a recording on a uniform time
+grid once; cutting epochs is then a single fancy-indexing step that returns
+an ``(n_epochs, n_samples, n_channels)`` array::
+
+    grid = SessionGrid(AscParser("MOT_roi.asc"))
+    ep = grid.epochs(r"MOVEMENT_START", window=(-500, 2000))
+    mean_x = ep.average()[:, ep.channels.index("x")]
+
+Messages are matched with ``re.match`` against the text, so ``r"BEEP \\d+"``
+or ``"VISUAL_DISTRACTION"`` work for the game markers.
+"""
+from __future__ import annotations
+
+import re
+import warnings
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .trial_arrays import session_samples, trial_of
+
+
+def uniform_grid(samples: pd.DataFrame, columns: Sequence[str], step: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Resample-free regridding: place samples on ``t0, t0+step, ...`` and NaN-fill gaps."""
+    t = samples.index.to_numpy(dtype=np.int64)
+    if t.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(columns)))
+    time = np.arange(t[0], t[-1] + step, step, dtype=np.int64)
+    data = np.full((time.size, len(columns)), np.nan)
+    data[(t - t[0]) // step] = samples[list(columns)].to_numpy(dtype=float)
+    return time, data
+
+
+def epoch_index(time: np.ndarray, events: np.ndarray, window: Tuple[int, int],
+                step: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Relative offsets, clipped grid indices and in-range mask for every epoch sample."""
+    offsets = np.arange(window[0], window[1], step)
+    idx = np.searchsorted(time, np.asarray(events, dtype=np.int64))[:, None] + offsets[None, :] // step
+    inside = (idx >= 0) & (idx < time.size)
+    return offsets, np.clip(idx, 0, max(time.size - 1, 0)), inside
+
+
+class Epochs:
+    """Stack of event-locked epochs.
+
+    Attributes
+    ----------
+    times : (S,) ndarray
+        Offset of every sample from its event, in ms.
+    data : (E, S, C) ndarray
+        Epoch samples, NaN outside the recording.
+    onsets : (E,) int64 ndarray
+        EyeLink time of the anchoring messages.
+    labels, trial_ids : list[str]
+        Message text and trial of every epoch.
+    channels : list[str]
+    """
+
+    def __init__(self, times: np.ndarray, data: np.ndarray, onsets: np.ndarray,
+                 labels: List[str], trial_ids: List[Optional[str]], channels: List[str]):
+        self.times = times
+        self.data = data
+        self.onsets = onsets
+        self.labels = labels
+        self.trial_ids = trial_ids
+        self.channels = channels
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def channel(self, name: str) -> np.ndarray:
+        """``(E, S)`` view of one channel."""
+        return self.data[..., self.channels.index(name)]
+
+    def average(self) -> np.ndarray:
+        """Event-locked NaN-mean over epochs, ``(S, C)``."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            return np.nanmean(self.data, axis=0)
+
+    def baseline_corrected(self, baseline: Tuple[int, int] = (-200, 0), mode: str = "subtractive") -> "Epochs":
+        """Copy with the per-epoch, per-channel baseline mean removed (or divided out)."""
+        in_base = (self.times >= baseline[0]) & (self.times < baseline[1])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            base = np.nanmean(self.data[:, in_base], axis=1, keepdims=True)
+        if mode == "subtractive":
+            data = self.data - base
+        elif mode == "divisive":
+            data = self.data / base - 1.0
+        else:
+            raise ValueError(f"Unknown baseline mode {mode!r}")
+        return Epochs(self.times, data, self.onsets, self.labels, self.trial_ids, self.channels)
+
+
+class SessionGrid:
+    """All samples of a recording on a uniform grid, ready for epoching."""
+
+    def __init__(self, asc: AscParser, channels: Optional[Sequence[str]] = None):
+        self.asc = asc
+        samples = session_samples(asc)
+        if channels is None:
+            channels = [c for c in samples.columns if samples[c].dtype.kind == "f"]
+        self.channels = list(channels)
+        self.step = max(1, int(round(1000 / (asc.get_sample_rate() or 1000))))
+        self.time, self.data = uniform_grid(samples, self.channels, self.step)
+
+    def events(self, pattern: str) -> Tuple[np.ndarray, List[str]]:
+        """Times and texts of the session messages matching *pattern*."""
+        regex = re.compile(pattern)
+        hits = [(ts, msg) for ts, msg in self.asc.messages if regex.match(msg)]
+        return np.array([ts for ts, _ in hits], dtype=np.int64), [msg for _, msg in hits]
+
+    def epochs_at(self, onsets: np.ndarray, window: Tuple[int, int] = (-500, 2000),
+                  channels: Optional[Sequence[str]] = None, labels: Optional[List[str]] = None) -> Epochs:
+        """Epochs around arbitrary EyeLink times."""
+        onsets = np.asarray(onsets, dtype=np.int64)
+        cols = [self.channels.index(c) for c in (channels or self.channels)]
+        offsets, idx, inside = epoch_index(self.time, onsets, window, self.step)
+        data = self.data[idx[..., None], np.array(cols)[None, None, :]]
+        data[~inside] = np.nan
+        return Epochs(offsets, data, onsets, labels or [""] * len(onsets),
+                      list(trial_of(self.asc, onsets)), [self.channels[c] for c in cols])
+
+    def epochs(self, pattern: str, window: Tuple[int, int] = (-500, 2000),
+               channels: Optional[Sequence[str]] = None) -> Epochs:
+        """Epochs around every message matching *pattern*."""
+        onsets, labels = self.events(pattern)
+        return self.epochs_at(onsets, window, channels, labels)
+
+
+def epochs(asc: AscParser, pattern: str, window: Tuple[int, int] = (-500, 2000),
+           channels: Optional[Sequence[str]] = None) -> Epochs:
+    """One-off convenience wrapper around :class:`SessionGrid`."""
+    return SessionGrid(asc, channels).epochs(pattern, window)
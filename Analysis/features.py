@@ -0,0 +1,301 @@
+"""Fixed-length per-trial feature vectors for workload modelling.
+
+Every trial of every task becomes one row built from the feature groups in
+:data:`FEATURE_GROUPS` (fixations, saccade main sequence, pupil, blinks,
+AOI-grid entropy and task performance from ``<TASK>_<participant>_performance.json``).
+Each group of a session is memoised under ``Data/cache/features`` with a key
+derived from the ASC file, the performance file (plus ``animal_trials.json``
+for the game) and :data:`FEATURES_VERSION`,
+so only groups whose inputs changed are recomputed.  Sessions run in a
+process pool; within a session the groups work on all trials at once.
+
+The cohort table is stored column by column in a compressed ``.npz``::
+
+    table = cohort_features({"p01": ["Data/p01/MOT_p01.asc", "Data/p01/GAME_p01.asc"]})
+    write_feature_table(table, "Data/features.npz")
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cache_file, file_key
+from .game_trajectories import load_game_trials
+from .gaze_entropy import session_entropy
+from .pupil import preprocess_pupil
+from .task_constants import ANIMAL_TRIALS_PATH, COUNTED_KILL_TYPE
+
+FEATURES_VERSION = 2  # bump when a feature definition changes
+TASKS = ("MOT", "REACTION", "SEARCH", "GAME")
+MIN_MAIN_SEQUENCE = 3  # saccades needed for a main-sequence fit
+INDEX = ["participant", "task", "trial_id"]
+
+
+def task_of(asc_file: str | Path) -> Optional[str]:
+    """Task name from the ``<TASK>_<participant>`` file naming of ``terminate_task``."""
+    prefix = Path(asc_file).stem.split("_")[0].upper()
+    return prefix if prefix in TASKS else None
+
+
+def performance_file_for(asc_file: str | Path) -> Path:
+    return Path(asc_file).with_name(f"{Path(asc_file).stem}_performance.json")
+
+
+def _trials(asc: AscParser) -> List[str]:
+    return [t for t in asc.list_trials() if t.isdigit()]
+
+
+def _trial_spans(asc: AscParser, trials: Sequence[str]) -> np.ndarray:
+    """``(T, 2)`` first and last sample time of every trial."""
+    spans = np.full((len(trials), 2), np.nan)
+    for k, trial_id in enumerate(trials):
+        index = asc.to_dataframe(trial_id).index
+        if len(index):
+            spans[k] = index[0], index[-1]
+    return spans
+
+
+# ---------------------------------------------------------------------
+# Feature groups (each returns one row per trial, indexed by trial_id)
+# ---------------------------------------------------------------------
+
+def fixation_features(asc: AscParser, trials: Sequence[str], **_) -> pd.DataFrame:
+    spans = _trial_spans(asc, trials)
+    rows = []
+    for trial_id in trials:
+        df = asc.fixations_to_dataframe(trial_id)
+        duration = df["duration"].to_numpy(float) if len(df) else np.empty(0)
+        rows.append({
+            "fix_count": len(duration),
+            "fix_dur_mean": duration.mean() if duration.size else np.nan,
+            "fix_dur_median": np.median(duration) if duration.size else np.nan,
+            "fix_dur_sd": duration.std() if duration.size > 1 else np.nan,
+        })
+    table = pd.DataFrame(rows, index=pd.Index(trials, name="trial_id"))
+    seconds = (spans[:, 1] - spans[:, 0]) / 1000
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table["trial_seconds"] = seconds
+        table["fix_rate"] = table["fix_count"] / seconds
+    return table
+
+
+def saccade_features(asc: AscParser, trials: Sequence[str], **_) -> pd.DataFrame:
+    rows = []
+    for trial_id in trials:
+        df = asc.saccades_to_dataframe(trial_id)
+        amplitude = df["amplitude"].to_numpy(float) if len(df) else np.empty(0)
+        velocity = df["peak_velocity"].to_numpy(float) if len(df) else np.empty(0)
+        ok = np.isfinite(amplitude) & np.isfinite(velocity) & (amplitude > 0)
+        slope = intercept = np.nan
+        if ok.sum() >= MIN_MAIN_SEQUENCE and np.ptp(amplitude[ok]) > 0:
+            slope, intercept = np.polyfit(amplitude[ok], velocity[ok], 1)
+        rows.append({
+            "sacc_count": len(df),
+            "sacc_amp_mean": amplitude[ok].mean() if ok.any() else np.nan,
+            "sacc_vpeak_mean": velocity[ok].mean() if ok.any() else np.nan,
+            "main_seq_slope": slope,
+            "main_seq_intercept": intercept,
+        })
+    return pd.DataFrame(rows, index=pd.Index(trials, name="trial_id"))
+
+
+def pupil_features(asc: AscParser, trials: Sequence[str], **_) -> pd.DataFrame:
+    trace = preprocess_pupil(asc)
+    spans = _trial_spans(asc, trials)
+    table = pd.DataFrame(index=pd.Index(trials, name="trial_id"),
+                         columns=["pupil_mean", "pupil_sd", "pupil_interp_fraction"], dtype=float)
+    if not trace.time.size:
+        return table
+
+    valid = np.isfinite(spans).all(axis=1)
+    lo = np.searchsorted(trace.time, spans[valid, 0], side="left")
+    hi = np.searchsorted(trace.time, spans[valid, 1], side="right")
+    # per-trial sums over [lo, hi) with cumulative sums instead of a loop
+    finite = np.isfinite(trace.clean)
+    clean = np.where(finite, trace.clean, 0.0)
+    c_n = np.concatenate(([0], np.cumsum(finite)))
+    c_x = np.concatenate(([0.0], np.cumsum(clean)))
+    c_xx = np.concatenate(([0.0], np.cumsum(clean ** 2)))
+    c_i = np.concatenate(([0], np.cumsum(trace.interpolated)))
+    n = c_n[hi] - c_n[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (c_x[hi] - c_x[lo]) / n
+        var = (c_xx[hi] - c_xx[lo]) / n - mean ** 2
+        table.loc[valid, "pupil_mean"] = mean
+        table.loc[valid, "pupil_sd"] = np.sqrt(np.maximum(var, 0))
+        table.loc[valid, "pupil_interp_fraction"] = (c_i[hi] - c_i[lo]) / (hi - lo)
+    return table
+
+
+def blink_features(asc: AscParser, trials: Sequence[str], **_) -> pd.DataFrame:
+    spans = _trial_spans(asc, trials)
+    rows = []
+    for trial_id, (start, end) in zip(trials, spans):
+        blinks = [b for b in asc.blinks.get(trial_id, []) if "end" in b]
+        eyes = {b["eye"] for b in blinks}
+        # binocular blinks are counted once, from the eye with more blinks
+        per_eye = max((sum(b["eye"] == e for b in blinks) for e in eyes), default=0)
+        durations = np.array([b["end"] - b["start"] for b in blinks], dtype=float)
+        minutes = (end - start) / 60_000
+        rows.append({
+            "blink_count": per_eye,
+            "blink_rate": per_eye / minutes if minutes > 0 else np.nan,
+            "blink_dur_mean": durations.mean() if durations.size else np.nan,
+        })
+    return pd.DataFrame(rows, index=pd.Index(trials, name="trial_id"))
+
+
+def entropy_features(asc: AscParser, trials: Sequence[str], cache_root: str | Path = CACHE_ROOT,
+                     drift: Optional[str] = None, **_) -> pd.DataFrame:
+    table = session_entropy(asc, "grid", cache_root=cache_root, drift=drift).set_index("trial_id")
+    table = table[["stationary_entropy_norm", "transition_entropy_norm"]]
+    return table.rename(columns=lambda c: "grid_" + c.replace("_norm", "")).reindex(trials)
+
+
+def performance_features(asc: AscParser, trials: Sequence[str], task: Optional[str] = None,
+                         performance_file: Optional[str | Path] = None, **_) -> pd.DataFrame:
+    """Task outcome of every trial; ``terminate_task`` stores one entry per trial, in order.
+
+    MOT ``(score, n_targets)``, REACTION and SEARCH a response time (-1 on
+    error/timeout), GAME ``(health, spawned, tung_tung_kills, shown, reported)``
+    where *spawned* counts all animals and only ``Tung_Tung_Sahur`` kills are
+    counted.  ``perf_tung_tung_kill_ratio`` divides those kills by the number
+    of ``Tung_Tung_Sahur`` among the spawned animals of the round.
+    """
+    columns = ["perf_accuracy", "perf_rt", "perf_health", "perf_tung_tung_kill_ratio", "perf_count_error"]
+    table = pd.DataFrame(index=pd.Index(trials, name="trial_id"), columns=columns, dtype=float)
+    if performance_file is None or not Path(performance_file).exists():
+        return table
+    with open(performance_file, "r") as f:
+        entries = json.load(f)
+    game_trials = load_game_trials() if task == "GAME" else None
+
+    for trial_id in trials:
+        k = int(trial_id)
+        if k >= len(entries) or entries[k] is None:
+            continue
+        entry = entries[k]
+        if task == "MOT":
+            score, n_targets = entry
+            table.loc[trial_id, "perf_accuracy"] = score / n_targets if n_targets else np.nan
+        elif task in ("REACTION", "SEARCH"):
+            table.loc[trial_id, "perf_accuracy"] = float(entry != -1)
+            table.loc[trial_id, "perf_rt"] = entry if entry != -1 else np.nan
+        elif task == "GAME":
+            health, spawned, kills, shown, reported = entry
+            animals = game_trials[k]["animals"][:spawned] if k < len(game_trials) else []
+            counted = sum(animal["animal_type"] == COUNTED_KILL_TYPE for animal in animals)
+            table.loc[trial_id, "perf_health"] = health
+            table.loc[trial_id, "perf_tung_tung_kill_ratio"] = kills / counted if counted else np.nan
+            table.loc[trial_id, "perf_count_error"] = reported - shown
+    return table
+
+
+FEATURE_GROUPS: Dict[str, Callable[..., pd.DataFrame]] = {
+    "fixations": fixation_features,
+    "saccades": saccade_features,
+    "pupil": pupil_features,
+    "blinks": blink_features,
+    "entropy": entropy_features,
+    "performance": performance_features,
+}
+
+
+# ---------------------------------------------------------------------
+# Memoised session / cohort assembly
+# ---------------------------------------------------------------------
+
+def _group_cache(asc_file: str | Path, group: str, performance_file: Optional[Path],
+                 cache_root: str | Path, drift: Optional[str] = None) -> Path:
+    inputs = {"group": group, "version": FEATURES_VERSION}
+    if group == "entropy" and drift is not None:
+        inputs["drift"] = drift
+    if group == "performance":
+        exists = performance_file is not None and performance_file.exists()
+        inputs["performance"] = file_key(performance_file) if exists else None
+        if task_of(asc_file) == "GAME":
+            inputs["animal_trials"] = file_key(ANIMAL_TRIALS_PATH)
+    return cache_file("features", asc_file, cache_root=cache_root, **inputs)
+
+
+def session_features(asc_file: str | Path, performance_file: Optional[str | Path] = None,
+                     groups: Sequence[str] = tuple(FEATURE_GROUPS), cache_root: str | Path = CACHE_ROOT,
+                     refresh: bool = False, drift: Optional[str] = None) -> pd.DataFrame:
+    """All feature groups of one recording, one row per trial.
+
+    The ASC file is only parsed when at least one group is missing from the
+    cache.  *drift* is the drift mode of the AOI-based (entropy) features.
+    """
+    task = task_of(asc_file)
+    performance_file = Path(performance_file) if performance_file else performance_file_for(asc_file)
+    asc = trials = None
+    parts = []
+    for group in groups:
+        path = _group_cache(asc_file, group, performance_file, cache_root, drift)
+        if path.exists() and not refresh:
+            with np.load(path, allow_pickle=False) as data:
+                parts.append(pd.DataFrame(data["values"], columns=data["columns"].tolist(),
+                                          index=pd.Index(data["trial_ids"].tolist(), name="trial_id")))
+            continue
+
+        if asc is None:
+            asc = AscParser(asc_file)
+            trials = _trials(asc)
+        table = FEATURE_GROUPS[group](asc, trials, task=task, performance_file=performance_file,
+                                      cache_root=cache_root, drift=drift).astype(float)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, values=table.to_numpy(float), columns=np.array(table.columns, dtype=str),
+                            trial_ids=np.array(table.index, dtype=str))
+        parts.append(table)
+
+    table = pd.concat(parts, axis=1) if parts else pd.DataFrame()
+    table.insert(0, "task", task)
+    return table.reset_index()
+
+
+def _session_job(args) -> pd.DataFrame:
+    participant, asc_file, groups, cache_root, drift = args
+    return session_features(asc_file, groups=groups, cache_root=cache_root,
+                            drift=drift).assign(participant=participant)
+
+
+def cohort_features(sessions: Dict[str, Sequence[str | Path]], groups: Sequence[str] = tuple(FEATURE_GROUPS),
+                    cache_root: str | Path = CACHE_ROOT, max_workers: Optional[int] = None,
+                    drift: Optional[str] = None) -> pd.DataFrame:
+    """Feature table of every trial of every participant (*sessions* maps participant to ASC files).
+
+    Columns missing for a task (e.g. ``perf_rt`` in MOT) are NaN, so every
+    row has the same length.
+    """
+    jobs = [(participant, asc_file, tuple(groups), cache_root, drift)
+            for participant, files in sessions.items() for asc_file in files]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_job, jobs))
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=INDEX)
+    features = [c for c in table.columns if c not in INDEX]
+    return table[INDEX + features]
+
+
+def write_feature_table(table: pd.DataFrame, path: str | Path) -> Path:
+    """Store *table* column by column in a compressed ``.npz``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = {}
+    for name in table.columns:
+        values = table[name].to_numpy()
+        columns[name] = values.astype(str) if values.dtype == object else values
+    np.savez_compressed(path, __columns__=np.array(table.columns, dtype=str), **columns)
+    return path
+
+
+def read_feature_table(path: str | Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Load a table written by :func:`write_feature_table`, optionally only some columns."""
+    with np.load(path, allow_pickle=False) as data:
+        names = list(columns) if columns is not None else data["__columns__"].tolist()
+        return pd.DataFrame({name: data[name] for name in names})
@@ -0,0 +1,236 @@
+"""Offline reconstruction of ItalianGame animal positions.
+
+``game_round`` never logs where the animals are, but every path is fully
+determined by ``animal_trials.json``: animal *k* spawns on the *k+1*-th
+``SPAWN_INTERVAL`` timer tick after ``TRIALID``, then advances
+``ANIMAL_SPEED`` px along its seeded :class:`Spline` on every rendered frame
+(one ``!MOUSE_POS`` message per frame) until it reaches the home base.
+
+The per-step path of every animal is recording independent and cached per
+trial; placing those tracks on a recording's frame clock is a single fancy
+indexing step.  Animals removed by the player are not reconstructed – their
+track continues until they would have reached the home base.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from stimulus.ItalianGame.Spline import Spline
+from .cache import CACHE_ROOT, cache_file
+from .task_constants import (
+    ANIMAL_DAMAGE,
+    ANIMAL_SPEED,
+    ANIMAL_TRIALS_PATH,
+    ANIMALS_CIRCLE_RADIUS,
+    GAME_FPS,
+    HOME_BASE_BOUNDARY_RADIUS,
+    SPAWN_INTERVAL,
+)
+from .trial_arrays import gaze_array, mouse_array
+
+GAZE_CHUNK = 20_000  # samples per distance block in nearest_animal
+
+
+# ---------------------------------------------------------------------
+# Recording-independent tracks
+# ---------------------------------------------------------------------
+
+def load_game_trials(path: str | Path = ANIMAL_TRIALS_PATH) -> list:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _build_tracks(animals: list) -> Tuple[np.ndarray, np.ndarray]:
+    """Circle-centre position after every move, padded with NaN after arrival."""
+    per_animal = []
+    for animal in animals:
+        spline_data = animal["spline"]
+        spline = Spline.create(tuple(spline_data["start"]), tuple(spline_data["end"]), seed=spline_data["seed"])
+        points = np.asarray(spline.spline_points, dtype=float)
+        arc = np.asarray(spline.arc_lengths, dtype=float)
+
+        # Spline.get_next is a linear interpolation over arc length, clamped at the end
+        steps = np.arange(1, int(np.ceil(spline.total_length / ANIMAL_SPEED)) + 2) * ANIMAL_SPEED
+        centres = np.column_stack([np.interp(steps, arc, points[:, 0]), np.interp(steps, arc, points[:, 1])])
+        centres += ANIMALS_CIRCLE_RADIUS
+
+        # removed on the first frame its circle touches the home-base boundary
+        home = np.asarray(spline_data["end"], dtype=float)
+        reached = np.hypot(*(centres - home).T) <= ANIMALS_CIRCLE_RADIUS + HOME_BASE_BOUNDARY_RADIUS
+        per_animal.append(centres[:np.argmax(reached)] if reached.any() else centres)
+
+    n_steps = np.array([len(c) for c in per_animal])
+    tracks = np.full((len(animals), n_steps.max(initial=0), 2), np.nan, dtype=np.float32)
+    for a, centres in enumerate(per_animal):
+        tracks[a, :len(centres)] = centres
+    return tracks, n_steps
+
+
+def animal_tracks(trial_index: int, trials_path: str | Path = ANIMAL_TRIALS_PATH,
+                  cache_root: str | Path = CACHE_ROOT,
+                  refresh: bool = False) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Animal types, ``(n_animals, max_steps, 2)`` tracks and per-animal step counts.
+
+    ``tracks[a, k]`` is the circle centre of animal *a* after its ``k+1``-th
+    move.  Results are cached per round, keyed by ``animal_trials.json`` and
+    the motion constants.
+    """
+    animals = load_game_trials(trials_path)[trial_index]["animals"]
+    types = [a["animal_type"] for a in animals]
+    path = cache_file("game_tracks", trials_path, cache_root=cache_root, trial=trial_index, speed=ANIMAL_SPEED,
+                      radius=ANIMALS_CIRCLE_RADIUS, home_radius=HOME_BASE_BOUNDARY_RADIUS, fps=GAME_FPS)
+    if path.exists() and not refresh:
+        with np.load(path) as data:
+            return types, data["tracks"], data["n_steps"]
+
+    tracks, n_steps = _build_tracks(animals)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, tracks=tracks, n_steps=n_steps)
+    return types, tracks, n_steps
+
+
+# ---------------------------------------------------------------------
+# Recording-specific timeline
+# ---------------------------------------------------------------------
+
+class GameTimeline:
+    """Dense animal positions of one recorded game round.
+
+    Attributes
+    ----------
+    frame_times : (F,) int64 ndarray
+        EyeLink time of every rendered frame.
+    positions : (F, A, 2) float32 ndarray
+        Circle centre of every animal per frame, NaN while not on screen.
+    spawn_frames : (A,) int64 ndarray
+        Frame on which each animal appeared (``F`` if it never did).
+    """
+
+    def __init__(self, trial_id: str, animal_types: List[str], frame_times: np.ndarray,
+                 positions: np.ndarray, spawn_frames: np.ndarray):
+        self.trial_id = trial_id
+        self.animal_types = animal_types
+        self.frame_times = frame_times
+        self.positions = positions
+        self.spawn_frames = spawn_frames
+
+    @property
+    def damage(self) -> np.ndarray:
+        return np.array([ANIMAL_DAMAGE.get(t, 0) for t in self.animal_types])
+
+    def frame_index(self, times: np.ndarray) -> np.ndarray:
+        """Index of the frame on screen at each EyeLink time (-1 before the first frame)."""
+        return np.searchsorted(self.frame_times, times, side="right") - 1
+
+
+def frame_clock(asc: AscParser, trial_id: str, messages: Optional[list] = None) -> np.ndarray:
+    """EyeLink times of the rendered frames of a game round.
+
+    Uses the per-frame ``!MOUSE_POS`` messages; recordings without them fall
+    back to a nominal ``GAME_FPS`` grid from ``TRIALID`` to ``GAME_OVER``.
+    """
+    messages = asc.get_messages(trial_id) if messages is None else messages
+    frames = mouse_array(messages)[:, 0].astype(np.int64)
+    if frames.size:
+        return frames
+
+    start = asc.trial_start_times[trial_id]
+    end = next((ts for ts, msg in messages if msg.startswith("GAME_OVER")), None)
+    if end is None:
+        end = int(asc.to_dataframe(trial_id).index[-1])
+    return np.arange(start, end, 1000 / GAME_FPS).astype(np.int64)
+
+
+def reconstruct_trial(asc: AscParser, trial_id: str, trial_index: Optional[int] = None,
+                      trials_path: str | Path = ANIMAL_TRIALS_PATH, cache_root: str | Path = CACHE_ROOT,
+                      refresh: bool = False) -> GameTimeline:
+    """Place the cached animal tracks of one round on the recording's frame clock."""
+    trial_index = int(trial_id) if trial_index is None else trial_index
+    types, tracks, n_steps = animal_tracks(trial_index, trials_path, cache_root, refresh)
+    frames = frame_clock(asc, trial_id)
+
+    # spawn timer ticks are handled by the first frame rendered after them
+    ticks = asc.trial_start_times[trial_id] + SPAWN_INTERVAL * np.arange(1, len(types) + 1)
+    spawn_frames = np.searchsorted(frames, ticks, side="left")
+
+    step = np.arange(len(frames))[:, None] - spawn_frames[None, :]
+    visible = (step >= 0) & (step < n_steps[None, :])
+    positions = np.full((len(frames), len(types), 2), np.nan, dtype=np.float32)
+    f_idx, a_idx = np.nonzero(visible)
+    positions[f_idx, a_idx] = tracks[a_idx, step[f_idx, a_idx]]
+    return GameTimeline(trial_id, types, frames, positions, spawn_frames)
+
+
+# ---------------------------------------------------------------------
+# Gaze join
+# ---------------------------------------------------------------------
+
+def nearest_animal(timeline: GameTimeline, gaze: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest visible animal and its distance for every gaze sample.
+
+    *gaze* is an ``(N, 3)`` ``time, x, y`` array.  Samples with no animal on
+    screen (or missing gaze) get index -1 and distance ``inf``.
+    """
+    frame = timeline.frame_index(gaze[:, 0])
+    nearest = np.full(len(gaze), -1, dtype=np.int64)
+    dist = np.full(len(gaze), np.inf)
+    if not timeline.positions.shape[1]:
+        return nearest, dist
+
+    for lo in range(0, len(gaze), GAZE_CHUNK):
+        hi = min(lo + GAZE_CHUNK, len(gaze))
+        f = frame[lo:hi]
+        valid = f >= 0
+        pos = timeline.positions[f[valid]]
+        g = gaze[lo:hi][valid]
+        d = np.hypot(pos[..., 0] - g[:, 1:2], pos[..., 1] - g[:, 2:3])
+        d = np.where(np.isnan(d), np.inf, d)
+        best = np.argmin(d, axis=1)
+        best_d = d[np.arange(len(best)), best]
+        hit = np.isfinite(best_d)
+        idx = np.flatnonzero(valid)[hit]
+        nearest[lo + idx] = best[hit]
+        dist[lo + idx] = best_d[hit]
+    return nearest, dist
+
+
+def threat_metrics(timeline: GameTimeline, gaze: np.ndarray, sample_rate: int = 1000,
+                   radius: float = 2 * ANIMALS_CIRCLE_RADIUS) -> pd.DataFrame:
+    """Per-animal gaze summary of one round.
+
+    Columns: ``animal_type``, ``damage``, ``spawn_time``, ``first_look_latency``
+    (ms from spawn to the first sample within *radius*, NaN if never looked
+    at) and ``dwell_ms`` (time the animal was the nearest one within *radius*).
+    """
+    nearest, dist = nearest_animal(timeline, gaze)
+    on = (nearest >= 0) & (dist <= radius)
+    n_animals = len(timeline.animal_types)
+
+    dwell = np.bincount(nearest[on], minlength=n_animals) * (1000 / sample_rate)
+    first_look = np.full(n_animals, np.nan)
+    animals, first_idx = np.unique(nearest[on], return_index=True)
+    first_look[animals] = gaze[np.flatnonzero(on)[first_idx], 0]
+
+    spawned = timeline.spawn_frames < len(timeline.frame_times)
+    spawn_time = np.full(n_animals, np.nan)
+    spawn_time[spawned] = timeline.frame_times[timeline.spawn_frames[spawned]]
+
+    return pd.DataFrame({
+        "animal_type": timeline.animal_types,
+        "damage": timeline.damage,
+        "spawn_time": spawn_time,
+        "first_look_latency": first_look - spawn_time,
+        "dwell_ms": dwell,
+    })
+
+
+def analyse_round(asc: AscParser, trial_id: str, **kwargs) -> pd.DataFrame:
+    """:func:`threat_metrics` for one recorded round, straight from the parser."""
+    timeline = reconstruct_trial(asc, trial_id)
+    return threat_metrics(timeline, gaze_array(asc, trial_id), asc.get_sample_rate() or 1000, **kwargs)
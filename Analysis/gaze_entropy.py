@@ -0,0 +1,295 @@
+"""Stationary and transition gaze entropy over AOIs (Krejtz et al., 2015).
+
+Fixations are coded into AOIs by one of the :data:`SCHEMES`:
+
+``grid``
+    cells of a regular grid over the screen;
+``mot``
+    target dot, distractor dot or elsewhere (dots reconstructed per frame);
+``search``
+    target letter, distractor letter or elsewhere;
+``game``
+    nearest animal, home base, weapon cooldown/ammo HUD, health HUD or
+    elsewhere.
+
+Fixation positions can be drift-corrected first (``drift=`` mode, see
+:mod:`Analysis.drift`).
+
+Per trial ``H_s = -sum p_i log2 p_i`` over the AOI distribution of the
+fixations and ``H_t = -sum_i p_i sum_j p_ij log2 p_ij`` over the first-order
+transition matrix.  Codes are cached per trial; counts and entropies for
+all trials (of all participants) come from one ``bincount`` over
+``trial * n * n + i * n + j``.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cache_file, file_key
+from .game_trajectories import nearest_animal, reconstruct_trial
+from .mot_objects import load_mot_config, reconstruct_mot_trial
+from .scanpath_similarity import DEFAULT_GRID, aoi_string
+from .task_constants import (
+    ANIMAL_TRIALS_PATH,
+    ANIMALS_CIRCLE_RADIUS,
+    BALL_RADIUS,
+    DISPLAY_SIZE_MULTIPLIER,
+    GAME_FONT_SIZE,
+    HOME_BASE_BOUNDARY_RADIUS,
+    HOUSE_IMAGE_SIZE,
+    MOT_CONFIG_PATH,
+    SEARCH_FONT_SIZE,
+    SEARCH_TRIALS_PATHS,
+)
+from .drift import fixation_positions
+from .trial_arrays import screen_size
+
+SCHEMES = ("grid", "mot", "search", "game")
+MOT_AOIS = ("target", "distractor", "other")
+SEARCH_AOIS = ("target", "distractor", "other")
+GAME_AOIS = ("animal", "home_base", "weapon_hud", "health_hud", "other")
+MOT_AOI_RADIUS = 2 * BALL_RADIUS
+GAME_ANIMAL_RADIUS = 2 * ANIMALS_CIRCLE_RADIUS
+# task configuration the AOIs of each scheme are built from (part of the cache key)
+AOI_CONFIG_PATHS = {"mot": (MOT_CONFIG_PATH,), "search": SEARCH_TRIALS_PATHS, "game": (ANIMAL_TRIALS_PATH,)}
+
+
+def aoi_labels(scheme: str, grid: Tuple[int, int] = DEFAULT_GRID) -> List[str]:
+    if scheme == "grid":
+        return [f"cell_{k}" for k in range(grid[0] * grid[1])]
+    if scheme == "mot":
+        return list(MOT_AOIS)
+    if scheme == "search":
+        return list(SEARCH_AOIS)
+    if scheme == "game":
+        return list(GAME_AOIS)
+    raise ValueError(f"Unknown AOI scheme {scheme!r}")
+
+
+# ---------------------------------------------------------------------
+# AOI coding
+# ---------------------------------------------------------------------
+
+def _item_codes(xy: np.ndarray, items: np.ndarray, is_target: np.ndarray, radius: float) -> np.ndarray:
+    """0 for the nearest item within *radius* being a target, 1 for a distractor, 2 otherwise.
+
+    *items* is ``(O, 2)`` or, for moving items, ``(N, O, 2)``.
+    """
+    if items.ndim == 2:
+        items = np.broadcast_to(items, (len(xy),) + items.shape)
+    dist = np.hypot(items[..., 0] - xy[:, None, 0], items[..., 1] - xy[:, None, 1])
+    dist = np.where(np.isnan(dist), np.inf, dist)
+    codes = np.full(len(xy), 2, dtype=np.int64)
+    if not items.shape[1]:
+        return codes
+    best = np.argmin(dist, axis=1)
+    near = dist[np.arange(len(xy)), best] <= radius
+    codes[near] = np.where(is_target[best[near]], 0, 1)
+    return codes
+
+
+def load_search_items(paths=SEARCH_TRIALS_PATHS) -> Dict[str, np.ndarray]:
+    """Item centres per search ``trial_id``, target first."""
+    items = {}
+    for path in paths:
+        with open(path, "r") as f:
+            for trial in json.load(f):
+                positions = [trial["target_pos"]] + [d["pos"] for d in trial["distractors"]]
+                items[str(trial["trial_id"])] = np.asarray(positions, dtype=float)
+    return items
+
+
+def game_hud_codes(xy: np.ndarray, screen: Tuple[int, int]) -> np.ndarray:
+    """Static game AOIs (indices into :data:`GAME_AOIS`, never ``animal``)."""
+    width, height = screen
+    x, y = xy[:, 0], xy[:, 1]
+    dsm = DISPLAY_SIZE_MULTIPLIER
+    home = ((width - HOUSE_IMAGE_SIZE[0]) // 2 + HOUSE_IMAGE_SIZE[0] // 2,
+            (height - HOUSE_IMAGE_SIZE[1]) // 2 + HOUSE_IMAGE_SIZE[1] // 2)
+    hud_bottom = 50 * dsm + GAME_FONT_SIZE  # two text lines from 10 * dsm
+
+    codes = np.full(len(xy), GAME_AOIS.index("other"), dtype=np.int64)
+    health = (y <= 10 * dsm + GAME_FONT_SIZE) & (x >= width * 0.45) & (x < width * 0.6)
+    weapons = (y <= hud_bottom) & ((x < width * 0.4) | (x >= width * 0.85))
+    codes[health] = GAME_AOIS.index("health_hud")
+    codes[weapons] = GAME_AOIS.index("weapon_hud")
+    codes[np.hypot(x - home[0], y - home[1]) <= HOME_BASE_BOUNDARY_RADIUS] = GAME_AOIS.index("home_base")
+    return codes
+
+
+def trial_codes(asc: AscParser, trial_id: str, scheme: str, grid: Tuple[int, int] = DEFAULT_GRID,
+                eye: Optional[str] = None, context: Optional[dict] = None, drift: Optional[str] = None,
+                cache_root: str | Path = CACHE_ROOT) -> Optional[np.ndarray]:
+    """AOI code of every fixation of one trial (None when the trial has no AOIs in *scheme*).
+
+    *context* holds the loaded task configuration (``mot_config``,
+    ``search_items``, ``animal_trials``) so it is read once per session.  *drift* is a drift
+    mode to correct the fixation positions with, *None* to use them as
+    recorded.
+    """
+    fixations = fixation_positions(asc, trial_id, eye, drift, cache_root)
+    xy = fixations[:, 2:4]
+    context = context or {}
+    if scheme == "grid":
+        return aoi_string(fixations[:, 2:5], screen_size(asc), grid, collapse=False)
+
+    if scheme == "mot":
+        if not trial_id.isdigit():
+            return None
+        timeline = reconstruct_mot_trial(asc, trial_id, config=context.get("mot_config"))
+        # dot positions at the fixation midpoint
+        positions = timeline.positions_at((fixations[:, 0] + fixations[:, 1]) / 2)
+        return _item_codes(xy, positions, timeline.targets, MOT_AOI_RADIUS)
+
+    if scheme == "search":
+        items = context.get("search_items", {}).get(trial_id)
+        if items is None:
+            return None
+        is_target = np.arange(len(items)) == 0
+        return _item_codes(xy, items, is_target, SEARCH_FONT_SIZE)
+
+    if scheme == "game":
+        if not trial_id.isdigit():
+            return None
+        codes = game_hud_codes(xy, screen_size(asc))
+        timeline = reconstruct_trial(asc, trial_id, trials_path=context.get("animal_trials", ANIMAL_TRIALS_PATH),
+                                     cache_root=cache_root)
+        gaze = np.column_stack([fixations[:, 0], xy])
+        nearest, dist = nearest_animal(timeline, gaze)
+        codes[(nearest >= 0) & (dist <= GAME_ANIMAL_RADIUS)] = GAME_AOIS.index("animal")
+        return codes
+    raise ValueError(f"Unknown AOI scheme {scheme!r}")
+
+
+def _context(scheme: str) -> dict:
+    if scheme == "mot":
+        return {"mot_config": load_mot_config(*AOI_CONFIG_PATHS["mot"])}
+    if scheme == "search":
+        return {"search_items": load_search_items(AOI_CONFIG_PATHS["search"])}
+    if scheme == "game":
+        return {"animal_trials": AOI_CONFIG_PATHS["game"][0]}
+    return {}
+
+
+def session_codes(asc: AscParser, scheme: str, grid: Tuple[int, int] = DEFAULT_GRID,
+                  eye: Optional[str] = None, cache_root: str | Path = CACHE_ROOT,
+                  refresh: bool = False, drift: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """AOI codes of every trial, cached as one ``.npz`` per trial.
+
+    The cache key includes the task configuration of *scheme*
+    (:data:`AOI_CONFIG_PATHS`), so editing it recomputes the codes.
+    """
+    context = None
+    codes = {}
+    config = [file_key(p) for p in AOI_CONFIG_PATHS.get(scheme, ())]
+    for trial_id in asc.list_trials():
+        path = cache_file("aoi_codes", asc.filepath, cache_root=cache_root, trial=trial_id,
+                          scheme=scheme, grid=grid, eye=eye, drift=drift, config=config)
+        if path.exists() and not refresh:
+            with np.load(path) as data:
+                if data["codes"].ndim:
+                    codes[trial_id] = data["codes"]
+            continue
+
+        context = _context(scheme) if context is None else context
+        trial = trial_codes(asc, trial_id, scheme, grid, eye, context, drift, cache_root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # trials without AOIs are cached as a 0-d placeholder
+        np.savez_compressed(path, codes=np.array(-1) if trial is None else trial)
+        if trial is not None:
+            codes[trial_id] = trial
+    return codes
+
+
+# ---------------------------------------------------------------------
+# Batched counts and entropies
+# ---------------------------------------------------------------------
+
+def transition_counts(sequences: List[np.ndarray], n_aoi: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``(T, n, n)`` transition counts and ``(T, n)`` fixation counts of *sequences*."""
+    lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+    n_trials = len(sequences)
+    if not lengths.sum():
+        return np.zeros((n_trials, n_aoi, n_aoi), dtype=np.int64), np.zeros((n_trials, n_aoi), dtype=np.int64)
+    codes = np.concatenate(sequences).astype(np.int64)
+    owner = np.repeat(np.arange(n_trials), lengths)
+
+    visits = np.bincount(owner * n_aoi + codes, minlength=n_trials * n_aoi).reshape(n_trials, n_aoi)
+    same = owner[1:] == owner[:-1]  # transitions never cross trials
+    flat = owner[1:][same] * n_aoi * n_aoi + codes[:-1][same] * n_aoi + codes[1:][same]
+    transitions = np.bincount(flat, minlength=n_trials * n_aoi * n_aoi).reshape(n_trials, n_aoi, n_aoi)
+    return transitions, visits
+
+
+def _plogp(p: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(p > 0, p * np.log2(p), 0.0)
+
+
+def entropies(transitions: np.ndarray, visits: np.ndarray) -> pd.DataFrame:
+    """Stationary and transition entropy (bits, and normalised by ``log2 n``) per trial."""
+    n_aoi = visits.shape[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stationary = visits / visits.sum(axis=1, keepdims=True)
+        rows = transitions.sum(axis=2, keepdims=True)
+        conditional = np.where(rows > 0, transitions / rows, 0.0)
+    h_s = 0.0 - _plogp(stationary).sum(axis=1)  # 0.0 - x avoids printing -0.0
+    h_t = 0.0 - (np.nan_to_num(stationary) * _plogp(conditional).sum(axis=2)).sum(axis=1)
+    empty = visits.sum(axis=1) == 0
+    h_s[empty] = np.nan
+    h_t[empty] = np.nan
+    norm = np.log2(n_aoi) if n_aoi > 1 else np.nan
+    return pd.DataFrame({
+        "n_fixations": visits.sum(axis=1),
+        "stationary_entropy": h_s,
+        "transition_entropy": h_t,
+        "stationary_entropy_norm": h_s / norm,
+        "transition_entropy_norm": h_t / norm,
+    })
+
+
+def session_entropy(asc: AscParser, scheme: str = "grid", grid: Tuple[int, int] = DEFAULT_GRID,
+                    eye: Optional[str] = None, **kwargs) -> pd.DataFrame:
+    """One entropy row per trial with AOIs under *scheme*."""
+    codes = session_codes(asc, scheme, grid, eye, **kwargs)
+    transitions, visits = transition_counts(list(codes.values()), len(aoi_labels(scheme, grid)))
+    table = entropies(transitions, visits)
+    table.insert(0, "trial_id", list(codes))
+    return table
+
+
+def _session_codes(asc_file: str | Path, scheme: str, grid: Tuple[int, int], eye: Optional[str],
+                   cache_root: str | Path, drift: Optional[str]) -> Dict[str, np.ndarray]:
+    return session_codes(AscParser(asc_file), scheme, grid, eye, cache_root, drift=drift)
+
+
+def cohort_entropy(asc_files: Dict[str, str | Path], scheme: str = "grid",
+                   grid: Tuple[int, int] = DEFAULT_GRID, eye: Optional[str] = None,
+                   cache_root: str | Path = CACHE_ROOT, max_workers: Optional[int] = None,
+                   drift: Optional[str] = None) -> pd.DataFrame:
+    """Entropies of every trial of every participant.
+
+    AOI coding runs one session per process; counting and entropies are a
+    single batched pass over all trials.
+    """
+    names = list(asc_files)
+    n = len(names)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        per_session = list(pool.map(_session_codes, asc_files.values(), [scheme] * n, [grid] * n,
+                                    [eye] * n, [cache_root] * n, [drift] * n))
+
+    participants = [name for name, codes in zip(names, per_session) for _ in codes]
+    trial_ids = [trial_id for codes in per_session for trial_id in codes]
+    sequences = [seq for codes in per_session for seq in codes.values()]
+    transitions, visits = transition_counts(sequences, len(aoi_labels(scheme, grid)))
+    table = entropies(transitions, visits)
+    table.insert(0, "trial_id", trial_ids)
+    table.insert(0, "participant", participants)
+    return table
@@ -0,0 +1,130 @@
+"""Eye–hand coupling from gaze and the per-frame ``!MOUSE_POS`` messages.
+
+Per trial, gaze and mouse are linearly resampled onto a common
+``RESAMPLE_MS`` grid, z-scored per axis and cross-correlated with a real FFT
+(O(n log n)).  ``lag_ms`` is positive when the eye leads the hand.  The
+eye-to-click latency is the time from the start of the first fixation near
+a click position (within ``CLICK_RADIUS`` px, up to ``CLICK_LOOKBACK_MS``
+earlier) to the ``!LEFT_MOUSE_DOWN``.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .trial_arrays import expand_ranges, fixation_array, gaze_array, messages_by_trial, mouse_array
+
+RESAMPLE_MS = 10
+MAX_LAG_MS = 1500
+CLICK_RADIUS = 100
+CLICK_LOOKBACK_MS = 2000
+MIN_OVERLAP_MS = 1000
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def fft_xcorr(a: np.ndarray, b: np.ndarray, max_lag: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``c[k] = mean_t a[t] * b[t + k]`` for ``|k| <= max_lag`` via zero-padded rFFT."""
+    n = a.size
+    size = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    full = np.fft.irfft(np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size), size) / n
+    lags = np.arange(-max_lag, max_lag + 1)
+    return lags, full[lags % size]
+
+
+def _resample(t: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    valid = np.isfinite(values)
+    return np.interp(grid, t[valid], values[valid])
+
+
+def coupling(gaze: np.ndarray, mouse: np.ndarray, step: int = RESAMPLE_MS,
+             max_lag_ms: int = MAX_LAG_MS) -> Tuple[float, float]:
+    """Lag (ms, eye leading positive) and peak correlation of gaze vs. mouse position.
+
+    *gaze* and *mouse* are ``(N, 3)`` ``time, x, y`` arrays.
+    """
+    if len(mouse) < 2 or np.isfinite(gaze[:, 1]).sum() < 2:
+        return np.nan, np.nan
+    start, end = max(gaze[0, 0], mouse[0, 0]), min(gaze[-1, 0], mouse[-1, 0])
+    if end - start < MIN_OVERLAP_MS:
+        return np.nan, np.nan
+
+    grid = np.arange(start, end, step)
+    max_lag = min(max_lag_ms // step, grid.size - 1)
+    corr = 0.0
+    for axis in (1, 2):
+        g = _zscore(_resample(gaze[:, 0], gaze[:, axis], grid))
+        m = _zscore(_resample(mouse[:, 0], mouse[:, axis], grid))
+        lags, c = fft_xcorr(g, m, max_lag)
+        corr = corr + c / 2
+    best = int(np.argmax(corr))
+    return float(lags[best] * step), float(corr[best])
+
+
+def click_latencies(fixations: np.ndarray, clicks: np.ndarray, radius: float = CLICK_RADIUS,
+                    lookback: int = CLICK_LOOKBACK_MS) -> np.ndarray:
+    """Eye-to-click latency for every click (NaN when the eye never got there).
+
+    *fixations* is the ``start, end, x, y, duration`` array of
+    :func:`fixation_array`, *clicks* an ``(N, 3)`` ``time, x, y`` array.
+    """
+    starts = fixations[:, 0]
+    lo = np.searchsorted(starts, clicks[:, 0] - lookback, side="left")
+    hi = np.searchsorted(starts, clicks[:, 0], side="right")
+    owner, idx = expand_ranges(lo, hi)
+    near = np.hypot(fixations[idx, 2] - clicks[owner, 1], fixations[idx, 3] - clicks[owner, 2]) <= radius
+
+    latency = np.full(len(clicks), np.nan)
+    first_owner, first = np.unique(owner[near], return_index=True)
+    latency[first_owner] = clicks[first_owner, 0] - starts[idx[near][first]]
+    return latency
+
+
+def _clicks(messages) -> np.ndarray:
+    rows = []
+    for ts, msg in messages:
+        if msg.startswith("!LEFT_MOUSE_DOWN"):
+            parts = msg.split()
+            if len(parts) == 3:
+                rows.append((ts, float(parts[1]), float(parts[2])))
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+
+def trial_coupling(asc: AscParser, eye: Optional[str] = None) -> pd.DataFrame:
+    """One row per trial: ``lag_ms``, ``peak_corr``, ``n_clicks``, ``eye_to_click_ms`` (median)."""
+    grouped = messages_by_trial(asc)
+    rows = []
+    for trial_id in asc.list_trials():
+        messages = grouped.get(trial_id, [])
+        lag, peak = coupling(gaze_array(asc, trial_id), mouse_array(messages))
+        clicks = _clicks(messages)
+        latencies = click_latencies(fixation_array(asc, trial_id, eye), clicks)
+        rows.append({
+            "trial_id": trial_id,
+            "lag_ms": lag,
+            "peak_corr": peak,
+            "n_clicks": len(clicks),
+            "eye_to_click_ms": np.nanmedian(latencies) if np.isfinite(latencies).any() else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def _session_coupling(asc_file: str | Path, eye: Optional[str]) -> pd.DataFrame:
+    return trial_coupling(AscParser(asc_file), eye)
+
+
+def cohort_coupling(asc_files: Dict[str, str | Path], eye: Optional[str] = None,
+                    max_workers: Optional[int] = None) -> pd.DataFrame:
+    """:func:`trial_coupling` for every session, one session per process."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_coupling, asc_files.values(), [eye] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
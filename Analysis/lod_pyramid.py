@@ -0,0 +1,135 @@
+"""Min/max decimation pyramids for drawing long signals at any zoom.
+
+Level 0 holds the samples on a uniform grid.  Every level above keeps the
+minimum and maximum of ``FACTOR`` bins of the level below, so the envelope
+of any time window can be read from the coarsest level that still has
+about one bin per output pixel: a 10-minute 1000 Hz round shrinks to a few
+thousand values at full zoom-out, and spikes and blinks stay visible at
+every level.
+
+Pyramids are built per channel (gaze x/y, pupil and gaze speed) for one
+trial or the whole session and cached as ``.npz`` per recording.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cache_file
+from .epochs import uniform_grid
+from .pursuit import gaze_velocity
+from .trial_arrays import session_samples
+
+CHANNELS = ("x", "y", "pupil", "speed")
+FACTOR = 4  # bins merged per level
+MIN_BINS = 256  # the pyramid stops once a level is this small
+LIMIT_PERCENTILES = (0.5, 99.5)  # robust display range of every channel
+
+
+def _reduce(mins: np.ndarray, maxs: np.ndarray, factor: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge every *factor* rows; NaN rows are ignored, all-NaN bins stay NaN."""
+    n = -(-len(mins) // factor) * factor
+    pad = ((0, n - len(mins)), (0, 0))
+    mins = np.pad(mins, pad, constant_values=np.nan).reshape(-1, factor, mins.shape[1])
+    maxs = np.pad(maxs, pad, constant_values=np.nan).reshape(-1, factor, maxs.shape[1])
+    return np.fmin.reduce(mins, axis=1), np.fmax.reduce(maxs, axis=1)
+
+
+class LodPyramid:
+    """Min/max pyramid of a few channels sampled every *step* ms from *start*.
+
+    Attributes
+    ----------
+    levels : list[((n_k, C) ndarray, (n_k, C) ndarray)]
+        Bin minima and maxima; level *k* bins span ``step * factor**k`` ms.
+        Level 0 is the samples themselves (minimum equals maximum).
+    limits : (C, 2) ndarray
+        Display range of every channel (``LIMIT_PERCENTILES`` of the samples).
+    """
+
+    def __init__(self, start: int, step: int, channels: Sequence[str],
+                 levels: List[Tuple[np.ndarray, np.ndarray]], limits: np.ndarray, factor: int = FACTOR):
+        self.start = start
+        self.step = step
+        self.channels = list(channels)
+        self.levels = levels
+        self.limits = limits
+        self.factor = factor
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.levels[0][0]) * self.step
+
+    def bin_ms(self, level: int) -> int:
+        return self.step * self.factor ** level
+
+    def level_for(self, t0: float, t1: float, max_bins: int) -> int:
+        """Finest level with at most *max_bins* bins between *t0* and *t1*."""
+        for level in range(len(self.levels)):
+            if (t1 - t0) / self.bin_ms(level) <= max_bins:
+                return level
+        return len(self.levels) - 1
+
+    def envelope(self, t0: float, t1: float, max_bins: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bin start times, minima and maxima covering ``[t0, t1]`` with at most ~*max_bins* bins."""
+        level = self.level_for(t0, t1, max_bins)
+        mins, maxs = self.levels[level]
+        width = self.bin_ms(level)
+        lo = max(int((t0 - self.start) // width), 0)
+        hi = min(int((t1 - self.start) // width) + 1, len(mins))
+        times = self.start + np.arange(lo, max(hi, lo)) * width
+        return times, mins[lo:hi], maxs[lo:hi]
+
+
+def build_pyramid(time: np.ndarray, data: np.ndarray, channels: Sequence[str], factor: int = FACTOR,
+                  min_bins: int = MIN_BINS) -> LodPyramid:
+    """Pyramid of ``(N, C)`` *data* on the uniform grid *time*."""
+    step = int(time[1] - time[0]) if len(time) > 1 else 1
+    levels = [(data, data)]
+    while len(levels[-1][0]) > min_bins:
+        levels.append(_reduce(*levels[-1], factor))
+    limits = np.full((data.shape[1], 2), np.nan)
+    finite = np.isfinite(data)
+    for c in range(data.shape[1]):
+        if finite[:, c].any():
+            limits[c] = np.percentile(data[finite[:, c], c], LIMIT_PERCENTILES)
+    start = int(time[0]) if len(time) else 0
+    return LodPyramid(start, step, channels, levels, limits, factor)
+
+
+def channel_samples(asc: AscParser, trial_id: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Uniform time grid and ``(N, 4)`` :data:`CHANNELS` of a trial (or the session)."""
+    samples = session_samples(asc) if trial_id is None else asc.to_dataframe(trial_id)
+    samples = samples[~samples.index.duplicated()]
+    step = max(1, round(1000 / (asc.get_sample_rate() or 1000)))
+    time, data = uniform_grid(samples, ["x", "y", "pupil"], step)
+    speed = np.linalg.norm(gaze_velocity(data[:, :2], step), axis=1)
+    return time, np.column_stack([data, speed])
+
+
+def lod_pyramid(asc: AscParser, trial_id: Optional[str] = None, factor: int = FACTOR,
+                cache_root: str | Path = CACHE_ROOT, refresh: bool = False) -> LodPyramid:
+    """Pyramid of :data:`CHANNELS` for one trial (the whole session if *trial_id* is None), cached."""
+    path = cache_file("lod_pyramid", asc.filepath, cache_root=cache_root, trial=trial_id, factor=factor)
+    if path.exists() and not refresh:
+        with np.load(path) as data:
+            samples = data["samples"].astype(float)
+            levels = [(samples, samples)]
+            levels += [(data[f"min_{k}"].astype(float), data[f"max_{k}"].astype(float))
+                       for k in range(1, int(data["n_levels"]))]
+            return LodPyramid(int(data["start"]), int(data["step"]), CHANNELS, levels, data["limits"], factor)
+
+    time, data = channel_samples(asc, trial_id)
+    # levels are stored as float32: build from the rounded samples so a fresh
+    # pyramid equals the cached one
+    data = data.astype(np.float32).astype(float)
+    pyramid = build_pyramid(time, data, CHANNELS, factor)
+    arrays = {f"{kind}_{k}": level[i].astype(np.float32) for k, level in enumerate(pyramid.levels) if k
+              for i, kind in enumerate(("min", "max"))}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, start=pyramid.start, step=pyramid.step, n_levels=len(pyramid.levels),
+                        limits=pyramid.limits, samples=data.astype(np.float32), **arrays)
+    return pyramid
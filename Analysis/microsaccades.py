@@ -0,0 +1,217 @@
+"""Engbert–Kliegl microsaccade detection for MOT central tracking.
+
+Per trial and eye:
+
+1. velocity from the 5-sample moving-window difference
+   ``v(n) = [x(n+2) + x(n+1) - x(n-1) - x(n-2)] / (6 dt)``;
+2. median-based noise ``sigma = sqrt(median(v^2) - median(v)^2)`` per axis,
+   elliptic threshold at ``VELOCITY_FACTOR * sigma``;
+3. supra-threshold runs of at least ``MIN_DURATION_MS`` become candidates;
+4. binocular microsaccades are left/right candidates that overlap in time,
+   matched with interval arithmetic on the sorted start/end arrays.
+
+By default only the motion phase (``MOVEMENT_START`` to ``MOVEMENT_STOPPED``)
+is analysed, which is when participants track covertly from the centre.
+Positions are in screen px; amplitudes are also converted to degrees with
+the px/deg ratio implied by EyeLink's own ``ESACC`` amplitudes.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .epochs import uniform_grid
+from .trial_arrays import (expand_ranges, interval_mask, message_times, messages_by_trial, session_saccades,
+                           true_runs)
+
+VELOCITY_FACTOR = 6.0
+MIN_DURATION_MS = 6
+MAX_AMPLITUDE_DEG = 1.0
+PHASE = ("MOVEMENT_START", "MOVEMENT_STOPPED")
+
+
+def pixels_per_degree(asc: AscParser) -> float:
+    """Median px/deg over the recording's saccades (NaN without usable saccades)."""
+    sacc = session_saccades(asc)
+    xy = sacc[["x_start", "y_start", "x_end", "y_end"]].to_numpy(float)
+    length = np.hypot(xy[:, 2] - xy[:, 0], xy[:, 3] - xy[:, 1])
+    amplitude = sacc["amplitude"].to_numpy(float)
+    ok = np.isfinite(length) & (amplitude > 0.5)
+    return float(np.median(length[ok] / amplitude[ok])) if ok.any() else np.nan
+
+
+def window_velocity(pos: np.ndarray, dt: float) -> np.ndarray:
+    """Moving-window velocity of an ``(N, 2)`` position array (px/s, NaN at the edges)."""
+    vel = np.full(pos.shape, np.nan)
+    vel[2:-2] = (pos[4:] + pos[3:-1] - pos[1:-3] - pos[:-4]) / (6 * dt / 1000)
+    return vel
+
+
+def _run_extent(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Peak-to-peak of ``values[lo[k]:hi[k]]`` for every run, via one ``reduceat`` pair."""
+    if lo.size == 0:
+        return np.empty(0)
+    padded = np.append(values, values[-1])
+    bounds = np.column_stack([lo, hi]).ravel()
+    return np.maximum.reduceat(padded, bounds)[::2] - np.minimum.reduceat(padded, bounds)[::2]
+
+
+def detect_monocular(time: np.ndarray, pos: np.ndarray, dt: float,
+                     factor: float = VELOCITY_FACTOR, min_duration: int = MIN_DURATION_MS) -> pd.DataFrame:
+    """Candidate microsaccades of one eye from ``(N, 2)`` positions on a uniform grid.
+
+    NaN samples (gaps, or samples outside the analysed phase) never form
+    part of an event and do not enter the noise estimate.
+    """
+    columns = ["start", "end", "peak_velocity", "dx", "dy", "amplitude_px"]
+    vel = window_velocity(pos, dt)
+    finite = np.isfinite(vel).all(axis=1)
+    if finite.sum() < 10:
+        return pd.DataFrame(columns=columns)
+
+    v = vel[finite]
+    sigma = np.sqrt(np.median(v ** 2, axis=0) - np.median(v, axis=0) ** 2)
+    sigma = np.where(sigma > 0, sigma, np.inf)
+    radius = np.zeros(len(vel))
+    radius[finite] = ((v / (factor * sigma)) ** 2).sum(axis=1)
+    lo, hi = true_runs(radius > 1)
+    keep = (hi - lo) * dt >= min_duration
+    lo, hi = lo[keep], hi[keep]
+
+    speed = np.nan_to_num(np.hypot(vel[:, 0], vel[:, 1]))
+    peak = np.maximum.reduceat(np.append(speed, 0), np.column_stack([lo, hi]).ravel())[::2] if lo.size else np.empty(0)
+    disp = pos[hi - 1] - pos[lo]
+    return pd.DataFrame({
+        "start": time[lo],
+        "end": time[hi - 1],
+        "peak_velocity": peak,
+        "dx": disp[:, 0],
+        "dy": disp[:, 1],
+        "amplitude_px": np.hypot(_run_extent(pos[:, 0], lo, hi), _run_extent(pos[:, 1], lo, hi)),
+    }, columns=columns)
+
+
+def binocular_overlap(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """Merge left/right candidates that overlap in time into binocular events.
+
+    Both tables are sorted and non-overlapping per eye, so the right-eye
+    events overlapping left event ``k`` are ``[lo[k], hi[k])`` with
+    ``lo = searchsorted(right.end, left.start)`` and
+    ``hi = searchsorted(right.start, left.end, "right")``.  The merged event
+    spans both eyes; velocities take the maximum, displacements the mean.
+    """
+    r_start = right["start"].to_numpy()
+    r_end = right["end"].to_numpy()
+    lo = np.searchsorted(r_end, left["start"].to_numpy(), side="left")
+    hi = np.searchsorted(r_start, left["end"].to_numpy(), side="right")
+    owner, idx = expand_ranges(lo, hi)
+    # one pair per left event: its first overlapping right event
+    owner, first = np.unique(owner, return_index=True)
+    idx = idx[first]
+    l, r = left.iloc[owner].reset_index(drop=True), right.iloc[idx].reset_index(drop=True)
+    return pd.DataFrame({
+        "start": np.minimum(l["start"], r["start"]),
+        "end": np.maximum(l["end"], r["end"]),
+        "peak_velocity": np.maximum(l["peak_velocity"], r["peak_velocity"]),
+        "dx": (l["dx"] + r["dx"]) / 2,
+        "dy": (l["dy"] + r["dy"]) / 2,
+        "amplitude_px": (l["amplitude_px"] + r["amplitude_px"]) / 2,
+    })
+
+
+def phase_mask(time: np.ndarray, messages, phase: Optional[Tuple[str, str]] = PHASE) -> np.ndarray:
+    """Grid samples between each *phase* start message and the next end message."""
+    if phase is None:
+        return np.ones(time.size, dtype=bool)
+    starts = message_times(messages, phase[0])
+    ends = message_times(messages, phase[1])
+    # pair every start with the first end after it; an unterminated phase runs to the trial end
+    after = np.searchsorted(ends, starts)
+    paired = np.append(ends, time[-1] if time.size else 0)[after]
+    return interval_mask(time, starts, paired)
+
+
+def detect_microsaccades(asc: AscParser, phase: Optional[Tuple[str, str]] = PHASE,
+                         factor: float = VELOCITY_FACTOR, min_duration: int = MIN_DURATION_MS,
+                         max_amplitude_deg: Optional[float] = MAX_AMPLITUDE_DEG,
+                         require_binocular: bool = True) -> pd.DataFrame:
+    """Microsaccades of every trial, one row per event.
+
+    Binocular recordings report only events present in both eyes when
+    *require_binocular* is set (Engbert & Kliegl, 2003); otherwise, and for
+    monocular recordings, the events of the single/right eye are returned.
+    Events larger than *max_amplitude_deg* are dropped.
+    """
+    sample_rate = asc.get_sample_rate() or 1000
+    step = max(1, int(round(1000 / sample_rate)))
+    ppd = pixels_per_degree(asc)
+    grouped = messages_by_trial(asc)
+    tables = []
+    for trial_id in asc.list_trials():
+        samples = asc.to_dataframe(trial_id)
+        if samples.empty:
+            continue
+        binocular = "x_l" in samples.columns
+        columns = ["x_l", "y_l", "x_r", "y_r"] if binocular else ["x", "y"]
+        time, data = uniform_grid(samples, columns, step)
+        data[~phase_mask(time, grouped.get(trial_id, []), phase)] = np.nan
+
+        if binocular:
+            left = detect_monocular(time, data[:, :2], step, factor, min_duration)
+            right = detect_monocular(time, data[:, 2:], step, factor, min_duration)
+            events = binocular_overlap(left, right) if require_binocular else right
+            events["binocular"] = require_binocular
+        else:
+            events = detect_monocular(time, data, step, factor, min_duration)
+            events["binocular"] = False
+        events.insert(0, "trial_id", trial_id)
+        tables.append(events)
+
+    if not tables:
+        return pd.DataFrame(columns=["trial_id", "start", "end", "duration", "peak_velocity", "dx", "dy",
+                                     "amplitude_px", "amplitude_deg", "binocular"])
+    events = pd.concat(tables, ignore_index=True)
+    events.insert(3, "duration", events["end"] - events["start"] + step)
+    events.insert(8, "amplitude_deg", events["amplitude_px"] / ppd)
+    if max_amplitude_deg is not None and np.isfinite(ppd):
+        events = events[events["amplitude_deg"] <= max_amplitude_deg].reset_index(drop=True)
+    return events
+
+
+def microsaccade_rate(events: pd.DataFrame, asc: AscParser,
+                      phase: Optional[Tuple[str, str]] = PHASE) -> pd.DataFrame:
+    """Per-trial count and rate (events/s) over the analysed phase."""
+    grouped = messages_by_trial(asc)
+    rows = []
+    for trial_id in asc.list_trials():
+        messages = grouped.get(trial_id, [])
+        if phase is None:
+            samples = asc.to_dataframe(trial_id)
+            seconds = (samples.index[-1] - samples.index[0]) / 1000 if len(samples) else 0.0
+        else:
+            starts = message_times(messages, phase[0])
+            ends = message_times(messages, phase[1])
+            n = min(starts.size, ends.size)
+            seconds = float((ends[:n] - starts[:n]).sum()) / 1000
+        count = int((events["trial_id"] == trial_id).sum())
+        rows.append({"trial_id": trial_id, "count": count,
+                     "rate_hz": count / seconds if seconds > 0 else np.nan})
+    return pd.DataFrame(rows)
+
+
+def _session_microsaccades(asc_file: str | Path, kwargs: dict) -> pd.DataFrame:
+    return detect_microsaccades(AscParser(asc_file), **kwargs)
+
+
+def cohort_microsaccades(asc_files: Dict[str, str | Path], max_workers: Optional[int] = None,
+                         **kwargs) -> pd.DataFrame:
+    """:func:`detect_microsaccades` for every participant, one session per process."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_microsaccades, asc_files.values(), [kwargs] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
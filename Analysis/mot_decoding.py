@@ -0,0 +1,221 @@
+"""Which MOT dots a participant was actually tracking.
+
+Gaze is averaged per movement frame and compared with every reconstructed
+dot and with the centroid of the targets (the usual "centre-looking"
+strategy).  A hidden Markov model over the attended state – one state per
+dot plus the centroid – is decoded with Viterbi:
+
+* emission: isotropic Gaussian of the gaze-to-state distance
+  (``EMISSION_SIGMA`` px) mixed with a uniform floor so a stray sample
+  cannot force a switch; frames without gaze are uninformative;
+* transition: stay with probability ``1 - SWITCH_PROB`` per frame, else
+  move to any other state with equal probability.
+
+With the uniform switch model the Viterbi maximum over previous states only
+needs the best and second-best score per trial, so all trials are decoded
+together as ``(trials, states)`` arrays, one step per frame.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .mot_objects import MotTimeline, load_mot_config, reconstruct_mot_trial
+from .task_constants import BALL_RADIUS
+from .trial_arrays import gaze_array, screen_size
+
+EMISSION_SIGMA = 2.0 * BALL_RADIUS  # px
+OUTLIER_PROB = 0.05
+SWITCH_PROB = 0.02  # per frame, about one switch every 1.7 s at 30 fps
+CENTROID = -1  # attended value of the target-centroid state
+
+
+def frame_gaze(timeline: MotTimeline, gaze: np.ndarray) -> np.ndarray:
+    """Mean gaze during every movement frame, ``(F, 2)`` with NaN for frames without samples."""
+    n_frames = len(timeline.frame_times)
+    frame = timeline.frame_index(gaze[:, 0])
+    ok = (frame >= 0) & np.isfinite(gaze[:, 1:]).all(axis=1)
+    counts = np.bincount(frame[ok], minlength=n_frames)[:n_frames]
+    mean = np.full((n_frames, 2), np.nan)
+    for axis in (0, 1):
+        sums = np.bincount(frame[ok], weights=gaze[ok, axis + 1], minlength=n_frames)[:n_frames]
+        with np.errstate(invalid="ignore"):
+            mean[:, axis] = np.where(counts > 0, sums / counts, np.nan)
+    return mean
+
+
+def state_positions(timeline: MotTimeline) -> np.ndarray:
+    """``(F, O + 1, 2)`` positions of every dot followed by the target centroid."""
+    centroid = timeline.positions[:, timeline.targets].mean(axis=1, keepdims=True)
+    return np.concatenate([timeline.positions, centroid], axis=1)
+
+
+def emission_log_prob(gaze: np.ndarray, states: np.ndarray, screen_area: float,
+                      sigma: float = EMISSION_SIGMA, outlier: float = OUTLIER_PROB) -> np.ndarray:
+    """``(F, S)`` log-likelihood of each frame's gaze under each attended state."""
+    d2 = ((states - gaze[:, None, :]) ** 2).sum(axis=2)
+    gauss = np.exp(-d2 / (2 * sigma ** 2)) / (2 * np.pi * sigma ** 2)
+    log_p = np.log((1 - outlier) * gauss + outlier / screen_area)
+    log_p[~np.isfinite(gaze).all(axis=1)] = 0.0
+    return log_p
+
+
+def viterbi_uniform(emissions: np.ndarray, n_states: np.ndarray, n_frames: np.ndarray,
+                    switch_prob: float = SWITCH_PROB) -> np.ndarray:
+    """Most likely state paths of a batch of trials.
+
+    *emissions* is ``(T, F, S)``, padded with ``-inf`` for states a trial
+    does not have; *n_states* and *n_frames* give the real sizes.  Returns
+    ``(T, F)`` state indices (padding frames repeat the last state).
+    """
+    n_trials, max_frames, max_states = emissions.shape
+    log_stay = np.log1p(-switch_prob)
+    log_switch = np.log(switch_prob / np.maximum(n_states - 1, 1))[:, None]  # (T, 1)
+    states = np.arange(max_states)[None, :]
+    rows = np.arange(n_trials)
+
+    delta = emissions[:, 0] - np.log(n_states)[:, None]
+    back = np.zeros((n_trials, max_frames, max_states), dtype=np.int32)
+    for f in range(1, max_frames):
+        order = np.argsort(delta, axis=1)
+        first = order[:, -1]
+        second = order[:, -2] if max_states > 1 else first
+        best_other = np.where(states == first[:, None], delta[rows, second][:, None], delta[rows, first][:, None])
+        arg_other = np.where(states == first[:, None], second[:, None], first[:, None])
+        stay = delta + log_stay
+        switch = best_other + log_switch
+        take_stay = stay >= switch
+        back[:, f] = np.where(take_stay, states, arg_other)
+        step = np.where(take_stay, stay, switch) + emissions[:, f]
+        active = (f < n_frames)[:, None]
+        delta = np.where(active, step, delta)
+        back[~active[:, 0], f] = states
+
+    path = np.zeros((n_trials, max_frames), dtype=np.int64)
+    path[:, -1] = np.argmax(delta, axis=1)
+    for f in range(max_frames - 1, 0, -1):
+        path[:, f - 1] = back[rows, f, path[:, f]]
+    return path
+
+
+def decode_trials(timelines: List[MotTimeline], gazes: List[np.ndarray], screen: Tuple[int, int],
+                  switch_prob: float = SWITCH_PROB) -> List[np.ndarray]:
+    """Attended dot per frame for every trial (``CENTROID`` for the target centroid)."""
+    if not timelines:
+        return []
+    emissions = []
+    for timeline, gaze in zip(timelines, gazes):
+        emissions.append(emission_log_prob(frame_gaze(timeline, gaze), state_positions(timeline),
+                                           float(screen[0] * screen[1])))
+    n_frames = np.array([e.shape[0] for e in emissions])
+    n_states = np.array([e.shape[1] for e in emissions])
+    padded = np.full((len(emissions), max(n_frames.max(), 1), n_states.max()), -np.inf)
+    for k, e in enumerate(emissions):
+        padded[k, :len(e), :e.shape[1]] = e
+        padded[k, len(e):, :e.shape[1]] = 0.0
+
+    paths = viterbi_uniform(padded, n_states, n_frames, switch_prob)
+    decoded = []
+    for path, timeline, frames in zip(paths, timelines, n_frames):
+        path = path[:frames]
+        decoded.append(np.where(path == timeline.n_objects, CENTROID, path))
+    return decoded
+
+
+def state_kind(timeline: MotTimeline, attended: np.ndarray) -> np.ndarray:
+    """``"target"``, ``"distractor"`` or ``"centroid"`` for every attended state."""
+    is_target = np.append(timeline.targets, False)[attended]  # CENTROID indexes the padding
+    return np.where(attended == CENTROID, "centroid", np.where(is_target, "target", "distractor"))
+
+
+def swap_events(trial_id: str, timeline: MotTimeline, attended: np.ndarray) -> pd.DataFrame:
+    """Changes of the attended state, with the target status on both sides."""
+    change = np.flatnonzero(attended[1:] != attended[:-1]) + 1
+    before, after = attended[change - 1], attended[change]
+    return pd.DataFrame({
+        "trial_id": trial_id,
+        "time": timeline.frame_times[change],
+        "frame": change,
+        "from_object": before,
+        "to_object": after,
+        "from_kind": state_kind(timeline, before),
+        "to_kind": state_kind(timeline, after),
+    })
+
+
+def decode_session(asc: AscParser, config: Optional[list] = None,
+                   switch_prob: float = SWITCH_PROB) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Decode every MOT trial of a recording.
+
+    Returns
+    -------
+    frames : DataFrame
+        ``trial_id, frame, time, attended, kind`` per movement frame.
+    swaps : DataFrame
+        One row per change of the attended state (see :func:`swap_events`).
+    summary : DataFrame
+        Per trial: ``target_fraction`` and ``centroid_fraction`` of frames,
+        ``n_swaps``, ``n_target_distractor_swaps`` and ``decoded_hits`` –
+        how many of the most attended dots (as many as there are targets)
+        are real targets.
+    """
+    config = load_mot_config() if config is None else config
+    trial_ids, timelines, gazes = [], [], []
+    for trial_id in asc.list_trials():
+        if not trial_id.isdigit():
+            continue
+        timeline = reconstruct_mot_trial(asc, trial_id, config=config)
+        if len(timeline.frame_times):
+            trial_ids.append(trial_id)
+            timelines.append(timeline)
+            gazes.append(gaze_array(asc, trial_id))
+
+    decoded = decode_trials(timelines, gazes, screen_size(asc), switch_prob)
+    frames, swaps, summary = [], [], []
+    for trial_id, timeline, attended in zip(trial_ids, timelines, decoded):
+        kind = state_kind(timeline, attended)
+        is_target = kind == "target"
+        frames.append(pd.DataFrame({"trial_id": trial_id, "frame": np.arange(len(attended)),
+                                    "time": timeline.frame_times, "attended": attended, "kind": kind}))
+        trial_swaps = swap_events(trial_id, timeline, attended)
+        swaps.append(trial_swaps)
+
+        dots = attended[attended != CENTROID]
+        counts = np.bincount(dots, minlength=timeline.n_objects)
+        n_targets = int(timeline.targets.sum())
+        top = np.argsort(-counts, kind="stable")[:n_targets]
+        top = top[counts[top] > 0]
+        crossings = trial_swaps["from_kind"].isin(["target", "distractor"]) & \
+            trial_swaps["to_kind"].isin(["target", "distractor"]) & \
+            (trial_swaps["from_kind"] != trial_swaps["to_kind"])
+        summary.append({
+            "trial_id": trial_id,
+            "target_fraction": float(is_target.mean()),
+            "centroid_fraction": float((attended == CENTROID).mean()),
+            "n_swaps": len(trial_swaps),
+            "n_target_distractor_swaps": int(crossings.sum()),
+            "decoded_hits": int(timeline.targets[top].sum()),
+            "n_targets": n_targets,
+        })
+
+    if not trial_ids:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    return pd.concat(frames, ignore_index=True), pd.concat(swaps, ignore_index=True), pd.DataFrame(summary)
+
+
+def _session_summary(asc_file: str | Path, switch_prob: float) -> pd.DataFrame:
+    return decode_session(AscParser(asc_file), switch_prob=switch_prob)[2]
+
+
+def cohort_decoding(asc_files: Dict[str, str | Path], switch_prob: float = SWITCH_PROB,
+                    max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Per-trial decoding summary for every participant, one session per process."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_summary, asc_files.values(), [switch_prob] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
@@ -0,0 +1,230 @@
+"""Offline reconstruction of the MOT dot positions.
+
+``Mot.mot_trial`` never logs where the dots are, but the motion is fully
+determined by ``mot_config.yaml``: on every rendered frame (one
+``!MOUSE_POS`` message each) a dot moves by ``int(dir)`` px and reverses
+the x/y direction once it reaches ``BALL_RADIUS`` from a screen edge.  The
+simulation below replays that update for all dots at once, one frame per
+step, so the result matches the experiment pixel for pixel.
+
+For random access during replay, :func:`mot_keyframes` caches snapshots of
+the positions and directions every ``KEYFRAME_MS`` instead of every frame.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import yaml
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cache_file
+from .task_constants import BALL_RADIUS, DISPLAY_SIZE_MULTIPLIER, MOT_CONFIG_PATH, MOT_FPS
+from .trial_arrays import message_times, mouse_array, screen_size
+
+KEYFRAME_MS = 500
+KEYFRAME_EVERY = round(KEYFRAME_MS * MOT_FPS / 1000)  # frames between snapshots
+
+
+def load_mot_config(path: str | Path = MOT_CONFIG_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)["trials"]
+
+
+def _start_state(trial_cfg: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Initial dot centres and per-frame displacement vectors."""
+    _, _, _, speed = trial_cfg["params"]
+    speed = int(speed * DISPLAY_SIZE_MULTIPLIER)
+    pos = np.asarray(trial_cfg["locations"], dtype=float)
+    dirs = np.asarray(trial_cfg["directions"], dtype=float)
+    return pos, dirs / np.linalg.norm(dirs, axis=-1, keepdims=True) * speed
+
+
+def _step(pos: np.ndarray, dirs: np.ndarray, upper: np.ndarray, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """One rendered frame: move by ``int(dir)`` and bounce off the edges."""
+    pos = pos + np.trunc(dirs)
+    return pos, np.where((pos <= radius) | (pos >= upper), -dirs, dirs)
+
+
+def simulate_objects(trial_cfg: dict, screen: Tuple[int, int], n_frames: int,
+                     radius: int = BALL_RADIUS) -> np.ndarray:
+    """``(n_frames + 1, n_objects, 2)`` dot centres; row 0 is the static target display.
+
+    Row ``k`` is the position drawn on the ``k``-th movement frame.
+    """
+    pos, dirs = _start_state(trial_cfg)
+    upper = np.asarray(screen, dtype=float) - radius
+
+    positions = np.empty((n_frames + 1,) + pos.shape)
+    positions[0] = pos
+    for k in range(1, n_frames + 1):
+        pos, dirs = _step(pos, dirs, upper, radius)
+        positions[k] = pos
+    return positions
+
+
+def simulate_keyframes(trial_cfg: dict, screen: Tuple[int, int], n_frames: int, every: int = KEYFRAME_EVERY,
+                       radius: int = BALL_RADIUS) -> Tuple[np.ndarray, np.ndarray]:
+    """Dot centres and displacement vectors of rows ``0, every, 2 * every, ...``.
+
+    Rows are numbered as in :func:`simulate_objects`; only the snapshots are
+    kept, so memory does not grow with the trial length.
+    """
+    pos, dirs = _start_state(trial_cfg)
+    upper = np.asarray(screen, dtype=float) - radius
+    n_keys = n_frames // every + 1
+    key_pos = np.empty((n_keys,) + pos.shape)
+    key_dirs = np.empty((n_keys,) + dirs.shape)
+    key_pos[0], key_dirs[0] = pos, dirs
+    for k in range(1, (n_keys - 1) * every + 1):
+        pos, dirs = _step(pos, dirs, upper, radius)
+        if k % every == 0:
+            key_pos[k // every], key_dirs[k // every] = pos, dirs
+    return key_pos, key_dirs
+
+
+class MotTimeline:
+    """Dot positions of one recorded MOT trial.
+
+    Attributes
+    ----------
+    frame_times : (F,) int64 ndarray
+        EyeLink time of every movement frame.
+    positions : (F, O, 2) float ndarray
+        Dot centre per frame.
+    initial : (O, 2) float ndarray
+        Positions during the target display, which are also the positions
+        before the first frame.
+    targets : (O,) bool ndarray
+    """
+
+    def __init__(self, trial_id: str, frame_times: np.ndarray, positions: np.ndarray,
+                 initial: np.ndarray, targets: np.ndarray):
+        self.trial_id = trial_id
+        self.frame_times = frame_times
+        self.positions = positions
+        self.initial = initial
+        self.targets = targets
+
+    @property
+    def n_objects(self) -> int:
+        return self.positions.shape[1]
+
+    def frame_index(self, times: np.ndarray) -> np.ndarray:
+        """Index of the frame on screen at each EyeLink time (-1 before the first frame)."""
+        return np.searchsorted(self.frame_times, times, side="right") - 1
+
+    def positions_at(self, times: np.ndarray) -> np.ndarray:
+        """``(N, O, 2)`` dot centres on screen at each EyeLink time."""
+        frame = self.frame_index(times)
+        return np.where((frame >= 0)[:, None, None], self.positions[np.maximum(frame, 0)], self.initial)
+
+
+def mot_frame_clock(asc: AscParser, trial_id: str, messages: Optional[list] = None) -> np.ndarray:
+    """EyeLink times of the movement frames of one MOT trial.
+
+    Uses the ``!MOUSE_POS`` messages between ``MOVEMENT_START`` and
+    ``MOVEMENT_STOPPED``; recordings without them fall back to a nominal
+    ``MOT_FPS`` grid over the same span.
+    """
+    messages = asc.get_messages(trial_id) if messages is None else messages
+    start = message_times(messages, "MOVEMENT_START")
+    stop = message_times(messages, "MOVEMENT_STOPPED")
+    if not start.size or not stop.size:
+        return np.empty(0, dtype=np.int64)
+
+    frames = mouse_array(messages)[:, 0].astype(np.int64)
+    frames = frames[(frames >= start[0]) & (frames <= stop[0])]
+    if frames.size:
+        return frames
+    return np.arange(start[0], stop[0], 1000 / MOT_FPS).astype(np.int64)
+
+
+def reconstruct_mot_trial(asc: AscParser, trial_id: str, trial_index: Optional[int] = None,
+                          config: Optional[list] = None) -> MotTimeline:
+    """Simulate the dots of one trial on the recording's frame clock."""
+    trial_index = int(trial_id) if trial_index is None else trial_index
+    config = load_mot_config() if config is None else config
+    trial_cfg = config[trial_index]
+    frames = mot_frame_clock(asc, trial_id)
+
+    positions = simulate_objects(trial_cfg, screen_size(asc), len(frames))
+    targets = np.zeros(positions.shape[1], dtype=bool)
+    targets[trial_cfg["targets"]] = True
+    return MotTimeline(trial_id, frames, positions[1:], positions[0], targets)
+
+
+class MotKeyframes:
+    """Dot positions of one recorded MOT trial, resolved from keyframe snapshots.
+
+    Same interface as :class:`MotTimeline` for lookups by time, but only
+    every ``every``-th frame is stored; a lookup restores the snapshot at
+    or before the frame and simulates fewer than ``every`` frames from it.
+    """
+
+    def __init__(self, trial_id: str, frame_times: np.ndarray, key_positions: np.ndarray,
+                 key_directions: np.ndarray, targets: np.ndarray, every: int,
+                 screen: Tuple[int, int], radius: int = BALL_RADIUS):
+        self.trial_id = trial_id
+        self.frame_times = frame_times
+        self.key_positions = key_positions
+        self.key_directions = key_directions
+        self.targets = targets
+        self.every = every
+        self.upper = np.asarray(screen, dtype=float) - radius
+        self.radius = radius
+
+    @property
+    def n_objects(self) -> int:
+        return self.key_positions.shape[1]
+
+    @property
+    def initial(self) -> np.ndarray:
+        return self.key_positions[0]
+
+    def frame_index(self, times: np.ndarray) -> np.ndarray:
+        """Index of the frame on screen at each EyeLink time (-1 before the first frame)."""
+        return np.searchsorted(self.frame_times, times, side="right") - 1
+
+    def frame_positions(self, frames: np.ndarray) -> np.ndarray:
+        """``(N, O, 2)`` dot centres on the given movement frames (-1 for the target display)."""
+        rows = np.clip(np.asarray(frames) + 1, 0, len(self.frame_times))
+        keys = rows // self.every
+        offsets = rows - keys * self.every
+        pos, dirs = self.key_positions[keys], self.key_directions[keys]
+        for s in range(int(offsets.max(initial=0))):
+            active = (offsets > s)[:, None, None]
+            moved, turned = _step(pos, dirs, self.upper, self.radius)
+            pos, dirs = np.where(active, moved, pos), np.where(active, turned, dirs)
+        return pos
+
+    def positions_at(self, times: np.ndarray) -> np.ndarray:
+        """``(N, O, 2)`` dot centres on screen at each EyeLink time."""
+        return self.frame_positions(self.frame_index(times))
+
+
+def mot_keyframes(asc: AscParser, trial_id: str, trial_index: Optional[int] = None,
+                  config: Optional[list] = None, every: int = KEYFRAME_EVERY,
+                  cache_root: str | Path = CACHE_ROOT, refresh: bool = False) -> MotKeyframes:
+    """Keyframes of one trial, cached as a compressed ``.npz`` next to the other per-trial caches."""
+    trial_index = int(trial_id) if trial_index is None else trial_index
+    config = load_mot_config() if config is None else config
+    trial_cfg = config[trial_index]
+    screen = screen_size(asc)
+    path = cache_file("mot_keyframes", asc.filepath, cache_root=cache_root, trial=trial_id,
+                      trial_cfg=trial_cfg, every=every, screen=screen)
+    if path.exists() and not refresh:
+        with np.load(path) as data:
+            return MotKeyframes(trial_id, data["frame_times"], data["key_positions"].astype(float),
+                                data["key_directions"], data["targets"], every, screen)
+
+    frames = mot_frame_clock(asc, trial_id)
+    key_positions, key_directions = simulate_keyframes(trial_cfg, screen, len(frames), every)
+    targets = np.zeros(key_positions.shape[1], dtype=bool)
+    targets[trial_cfg["targets"]] = True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # positions stay integral (int steps from integer starts), so they fit int32
+    np.savez_compressed(path, frame_times=frames, key_positions=key_positions.astype(np.int32),
+                        key_directions=key_directions, targets=targets)
+    return MotKeyframes(trial_id, frames, key_positions, key_directions, targets, every, screen)
@@ -0,0 +1,201 @@
+"""Pupillometry preprocessing over whole-session arrays.
+
+Pipeline (every step works on the full session at once):
+
+1. put the samples on a uniform time grid, recording gaps become NaN;
+2. reject samples inside the parsed ``SBLINK``/``EBLINK`` spans (padded);
+3. reject dilation-speed outliers, ``median + k * MAD`` (Kret & Sjak-Shie, 2019);
+4. linearly interpolate rejected samples across gaps up to ``max_gap_ms``;
+5. zero-phase Butterworth low-pass;
+6. cut message-anchored epochs and baseline-correct them.
+"""
+from __future__ import annotations
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
+
+from parser import AscParser
+from .epochs import epoch_index, uniform_grid
+from .trial_arrays import event_times, interval_mask, session_samples, true_runs
+
+BLINK_PADDING = (50, 150)  # ms removed before SBLINK / after EBLINK
+VELOCITY_MAD_FACTOR = 16
+LOWPASS_HZ = 4.0
+FILTER_ORDER = 3
+MAX_GAP_MS = 750
+
+
+# ---------------------------------------------------------------------
+# Array helpers
+# ---------------------------------------------------------------------
+
+def dilation_speed(values: np.ndarray, dt: float) -> np.ndarray:
+    """Larger of the backward and forward absolute change per ms (NaN-aware)."""
+    diff = np.abs(np.diff(values)) / dt
+    return np.fmax(np.concatenate(([np.nan], diff)), np.concatenate((diff, [np.nan])))
+
+
+# ---------------------------------------------------------------------
+# Preprocessing
+# ---------------------------------------------------------------------
+
+class PupilTrace:
+    """Preprocessed pupil signal of one session on a uniform time grid.
+
+    Attributes
+    ----------
+    time : (N,) int64 ndarray
+        EyeLink time of every grid sample.
+    raw, clean : (N,) float ndarray
+        Pupil size before and after preprocessing (NaN where unrecoverable).
+    interpolated : (N,) bool ndarray
+        Samples replaced by interpolation.
+    """
+
+    def __init__(self, time: np.ndarray, raw: np.ndarray, clean: np.ndarray,
+                 interpolated: np.ndarray, sample_rate: int):
+        self.time = time
+        self.raw = raw
+        self.clean = clean
+        self.interpolated = interpolated
+        self.sample_rate = sample_rate
+
+    @property
+    def step_ms(self) -> int:
+        return int(self.time[1] - self.time[0]) if self.time.size > 1 else 1
+
+    def epochs(self, events: np.ndarray, window: Tuple[int, int] = (-500, 2000),
+               baseline: Optional[Tuple[int, int]] = (-200, 0),
+               mode: str = "subtractive") -> Tuple[np.ndarray, np.ndarray]:
+        """Event-locked epochs of the clean signal.
+
+        Returns the relative times (ms) and an ``(n_events, n_samples)``
+        array.  *mode* ``"subtractive"`` removes the baseline mean,
+        ``"divisive"`` returns the change relative to it.
+        """
+        offsets, idx, inside = epoch_index(self.time, events, window, self.step_ms)
+        data = np.where(inside, self.clean[idx], np.nan)
+        if baseline is not None:
+            in_base = (offsets >= baseline[0]) & (offsets < baseline[1])
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN baselines
+                base = np.nanmean(data[:, in_base], axis=1, keepdims=True)
+            if mode == "subtractive":
+                data = data - base
+            elif mode == "divisive":
+                data = data / base - 1.0
+            else:
+                raise ValueError(f"Unknown baseline mode {mode!r}")
+        return offsets, data
+
+    def interpolated_fraction(self, events: np.ndarray, window: Tuple[int, int] = (-500, 2000)) -> np.ndarray:
+        """Share of interpolated or missing samples per epoch, for epoch rejection."""
+        _, idx, inside = epoch_index(self.time, events, window, self.step_ms)
+        bad = ~inside | self.interpolated[idx] | np.isnan(self.clean[idx])
+        return bad.mean(axis=1)
+
+
+def preprocess_pupil(
+    asc: AscParser,
+    eye: Optional[str] = None,
+    blink_padding: Tuple[int, int] = BLINK_PADDING,
+    velocity_mad_factor: float = VELOCITY_MAD_FACTOR,
+    lowpass_hz: Optional[float] = LOWPASS_HZ,
+    max_gap_ms: int = MAX_GAP_MS,
+) -> PupilTrace:
+    """Run the full pipeline on every sample of a recording.
+
+    *eye* selects ``pupil_l``/``pupil_r`` in binocular files; by default the
+    binocular average (or the mono channel) is used together with the blinks
+    of both eyes.
+    """
+    samples = session_samples(asc)
+    sample_rate = asc.get_sample_rate() or 1000
+    step = max(1, int(round(1000 / sample_rate)))
+    binocular = "pupil_l" in samples.columns
+    column = f"pupil_{eye.lower()}" if eye is not None and binocular else "pupil"
+
+    # 1) uniform grid
+    time, raw = uniform_grid(samples, [column], step)
+    raw = raw[:, 0]
+    raw[raw <= 0] = np.nan
+
+    # 2) blinks
+    blinks = [b for trial in asc.blinks.values() for b in trial
+              if eye is None or not binocular or b["eye"] == eye.upper()]
+    starts = np.array([b["start"] for b in blinks], dtype=np.int64) - blink_padding[0]
+    ends = np.array([b.get("end", b["start"]) for b in blinks], dtype=np.int64) + blink_padding[1]
+    rejected = np.isnan(raw) | interval_mask(time, starts, ends)
+
+    # 3) dilation-speed outliers
+    speed = dilation_speed(np.where(rejected, np.nan, raw), step)
+    finite = speed[np.isfinite(speed)]
+    if finite.size:
+        med = np.median(finite)
+        deviation = np.abs(finite - med)
+        # integer-valued EyeLink pupil data often has MAD == 0
+        mad = np.median(deviation) or deviation.mean()
+        threshold = med + velocity_mad_factor * mad
+        rejected |= speed > threshold
+
+    # 4) interpolation across short gaps only
+    clean = np.full(time.size, np.nan)
+    valid = ~rejected
+    if valid.any():
+        clean = np.interp(time, time[valid], raw[valid])
+        run_start, run_end = true_runs(rejected)
+        too_long = (run_end - run_start) * step > max_gap_ms
+        too_long |= (run_start == 0) | (run_end == time.size)  # no sample on one side
+        keep_nan = np.zeros(time.size + 1, dtype=np.int64)
+        np.add.at(keep_nan, run_start[too_long], 1)
+        np.add.at(keep_nan, run_end[too_long], -1)
+        clean[np.cumsum(keep_nan[:-1]) > 0] = np.nan
+
+    # 5) low-pass, one call per contiguous stretch of data
+    if lowpass_hz is not None:
+        sos = butter(FILTER_ORDER, lowpass_hz, fs=1000 / step, output="sos")
+        pad = 3 * (2 * len(sos) + 1)
+        for lo, hi in zip(*true_runs(np.isfinite(clean))):
+            if hi - lo > pad:
+                clean[lo:hi] = sosfiltfilt(sos, clean[lo:hi])
+
+    return PupilTrace(time, raw, clean, rejected & np.isfinite(clean), sample_rate)
+
+
+# ---------------------------------------------------------------------
+# Cohort entry point
+# ---------------------------------------------------------------------
+
+def _session_epochs(asc_file: str | Path, pattern: str, window: Tuple[int, int],
+                    baseline: Optional[Tuple[int, int]], kwargs: dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    asc = AscParser(asc_file)
+    trace = preprocess_pupil(asc, **kwargs)
+    events = event_times(asc, pattern)
+    offsets, data = trace.epochs(events, window, baseline)
+    return offsets, data, trace.interpolated_fraction(events, window)
+
+
+def cohort_epochs(
+    asc_files: Dict[str, str | Path],
+    pattern: str,
+    window: Tuple[int, int] = (-500, 2000),
+    baseline: Optional[Tuple[int, int]] = (-200, 0),
+    max_workers: Optional[int] = None,
+    **kwargs,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Baseline-corrected pupil epochs for every participant.
+
+    *pattern* is a regex matched against message text (e.g. ``"TARGET_DRAWN"``);
+    extra keyword arguments go to :func:`preprocess_pupil`.  Returns
+    ``{participant: (relative_ms, epochs, interpolated_fraction)}``.
+    """
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(_session_epochs, asc_files.values(), [pattern] * len(names),
+                           [window] * len(names), [baseline] * len(names), [kwargs] * len(names))
+        return dict(zip(names, results))
@@ -0,0 +1,226 @@
+"""Smooth-pursuit classification against the moving MOT dots and game animals.
+
+Samples are labelled with an I-VVT scheme (Komogortsev & Karpov, 2013):
+speeds above ``SACCADE_DEG_S`` are saccadic, speeds between
+``FIXATION_DEG_S`` and ``SACCADE_DEG_S`` are pursuit, the rest fixation.
+MOT dots move at only a few deg/s, so a sample is also pursuit when gaze is
+within ``MATCH_RADIUS`` of an object whose velocity it reproduces
+(``|v_gaze - v_object| <= VELOCITY_TOLERANCE * |v_object|``).  The object
+test is broadcast over ``(samples, objects)`` blocks of ``GAZE_CHUNK``
+samples against the reconstructed per-frame positions and velocities.
+
+Consecutive samples with the same label and object form a segment; pursuit
+segments shorter than ``MIN_PURSUIT_MS`` are relabelled as fixation.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .epochs import uniform_grid
+from .game_trajectories import reconstruct_trial
+from .microsaccades import pixels_per_degree
+from .mot_objects import load_mot_config, reconstruct_mot_trial
+from .task_constants import BALL_RADIUS
+from .trial_arrays import expand_ranges, true_runs
+
+LABELS = ("fixation", "saccade", "pursuit")
+FIXATION, SACCADE, PURSUIT = range(3)
+
+SACCADE_DEG_S = 70.0
+FIXATION_DEG_S = 20.0
+VELOCITY_WINDOW_MS = 50
+MATCH_RADIUS = 4 * BALL_RADIUS  # px
+VELOCITY_TOLERANCE = 0.5
+MIN_OBJECT_SPEED = 50.0  # px/s, static objects cannot be pursued
+MIN_PURSUIT_MS = 50
+GAZE_CHUNK = 20_000
+
+
+def object_velocities(frame_times: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """``(F, O, 2)`` object velocities in px/s (NaN where the object is not on screen)."""
+    if len(frame_times) < 2:
+        return np.zeros(positions.shape)
+    return np.gradient(positions, frame_times.astype(float) / 1000, axis=0)
+
+
+def gaze_velocity(xy: np.ndarray, step: int, window_ms: int = VELOCITY_WINDOW_MS) -> np.ndarray:
+    """Central-difference velocity (px/s) of an ``(N, 2)`` gaze array over *window_ms*."""
+    k = max(1, window_ms // (2 * step))
+    vel = np.full(xy.shape, np.nan)
+    vel[k:-k] = (xy[2 * k:] - xy[:-2 * k]) / (2 * k * step / 1000)
+    return vel
+
+
+def match_objects(time: np.ndarray, xy: np.ndarray, vel: np.ndarray, frame_times: np.ndarray,
+                  positions: np.ndarray, velocities: np.ndarray, radius: float = MATCH_RADIUS,
+                  tolerance: float = VELOCITY_TOLERANCE) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest velocity-matched object and pursuit gain for every gaze sample.
+
+    Unmatched samples get object -1 and gain NaN.  Gain is the projection
+    of the gaze velocity on the object velocity, ``v_g . v_o / |v_o|^2``.
+    """
+    frame = np.searchsorted(frame_times, time, side="right") - 1
+    matched = np.full(len(time), -1, dtype=np.int64)
+    gain = np.full(len(time), np.nan)
+    if not positions.shape[1]:
+        return matched, gain
+
+    for lo in range(0, len(time), GAZE_CHUNK):
+        hi = min(lo + GAZE_CHUNK, len(time))
+        f = frame[lo:hi]
+        valid = (f >= 0) & np.isfinite(vel[lo:hi]).all(axis=1)
+        pos, v_obj = positions[f[valid]], velocities[f[valid]]  # (n, O, 2)
+        g, v_g = xy[lo:hi][valid][:, None, :], vel[lo:hi][valid][:, None, :]
+
+        dist = np.hypot(*np.moveaxis(pos - g, -1, 0))
+        obj_speed = np.hypot(*np.moveaxis(v_obj, -1, 0))
+        error = np.hypot(*np.moveaxis(v_g - v_obj, -1, 0))
+        with np.errstate(invalid="ignore"):
+            ok = (dist <= radius) & (obj_speed >= MIN_OBJECT_SPEED) & (error <= tolerance * obj_speed)
+        dist = np.where(ok, dist, np.inf)
+        best = np.argmin(dist, axis=1)
+        rows = np.arange(len(best))
+        hit = np.isfinite(dist[rows, best])
+
+        idx = lo + np.flatnonzero(valid)[hit]
+        matched[idx] = best[hit]
+        v_best = v_obj[rows[hit], best[hit]]
+        gain[idx] = (v_g[hit, 0] * v_best).sum(axis=1) / (v_best ** 2).sum(axis=1)
+    return matched, gain
+
+
+def classify_samples(time: np.ndarray, xy: np.ndarray, step: int, frame_times: np.ndarray,
+                     positions: np.ndarray, px_per_deg: float, **kwargs) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``labels`` (indices into :data:`LABELS`), matched ``objects`` and ``gain`` per sample.
+
+    Samples with missing gaze are labelled -1.  Extra keyword arguments go
+    to :func:`match_objects`.
+    """
+    vel = gaze_velocity(xy, step)
+    speed = np.hypot(vel[:, 0], vel[:, 1]) / px_per_deg
+    objects, gain = match_objects(time, xy, vel, frame_times, positions,
+                                  object_velocities(frame_times, positions), **kwargs)
+
+    labels = np.full(len(time), -1, dtype=np.int8)
+    # the windowed velocity spans short gaps, so check the samples themselves too
+    finite = np.isfinite(speed) & np.isfinite(xy).all(axis=1)
+    labels[finite] = FIXATION
+    labels[finite & (speed >= FIXATION_DEG_S)] = PURSUIT
+    labels[finite & (objects >= 0)] = PURSUIT
+    labels[finite & (speed > SACCADE_DEG_S)] = SACCADE
+    objects[labels != PURSUIT] = -1
+    gain[labels != PURSUIT] = np.nan
+
+    lo, hi = true_runs(labels == PURSUIT)
+    short = (hi - lo) * step < MIN_PURSUIT_MS
+    _, idx = expand_ranges(lo[short], hi[short])
+    labels[idx] = FIXATION
+    objects[idx] = -1
+    gain[idx] = np.nan
+    return labels, objects, gain
+
+
+def segments(time: np.ndarray, labels: np.ndarray, objects: np.ndarray, gain: np.ndarray,
+             step: int) -> pd.DataFrame:
+    """Collapse per-sample labels into ``label, start, end, duration, object, gain`` rows."""
+    if not len(time):
+        return pd.DataFrame({
+            "label": np.empty(0, dtype=object),
+            "start": np.empty(0, dtype=np.int64),
+            "end": np.empty(0, dtype=np.int64),
+            "duration": np.empty(0, dtype=np.int64),
+            "object": np.empty(0, dtype=np.int64),
+            "gain": np.empty(0),
+        })
+    change = np.flatnonzero((np.diff(labels) != 0) | (np.diff(objects) != 0)) + 1
+    lo = np.concatenate(([0], change))
+    hi = np.concatenate((change, [len(time)]))
+    keep = labels[lo] >= 0
+    lo, hi = lo[keep], hi[keep]
+
+    counts = np.add.reduceat(np.isfinite(gain), lo) if lo.size else np.empty(0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_gain = np.add.reduceat(np.nan_to_num(gain), lo) / counts if lo.size else np.empty(0)
+    # reduceat sums up to the next kept start, which only spans dropped (gain-less) samples
+    return pd.DataFrame({
+        "label": np.asarray(LABELS)[labels[lo]],
+        "start": time[lo],
+        "end": time[hi - 1],
+        "duration": (hi - lo) * step,
+        "object": objects[lo],
+        "gain": mean_gain,
+    })
+
+
+def _trial_segments(asc: AscParser, trial_id: str, frame_times: np.ndarray, positions: np.ndarray,
+                    px_per_deg: float, step: int, span: Tuple[int, int]) -> pd.DataFrame:
+    samples = asc.to_dataframe(trial_id)
+    samples = samples[(samples.index >= span[0]) & (samples.index <= span[1])]
+    time, xy = uniform_grid(samples, ["x", "y"], step)
+    labels, objects, gain = classify_samples(time, xy, step, frame_times, positions, px_per_deg)
+    table = segments(time, labels, objects, gain, step)
+    table.insert(0, "trial_id", trial_id)
+    return table
+
+
+def mot_pursuit(asc: AscParser, config: Optional[list] = None,
+                px_per_deg: Optional[float] = None) -> pd.DataFrame:
+    """Pursuit segments during the movement phase of every MOT trial.
+
+    ``target`` marks segments that follow one of the trial's targets.
+    """
+    config = load_mot_config() if config is None else config
+    px_per_deg = px_per_deg or pixels_per_degree(asc)
+    step = max(1, int(round(1000 / (asc.get_sample_rate() or 1000))))
+    tables = []
+    for trial_id in asc.list_trials():
+        if not trial_id.isdigit():
+            continue
+        timeline = reconstruct_mot_trial(asc, trial_id, config=config)
+        if not len(timeline.frame_times):
+            continue
+        span = (timeline.frame_times[0], timeline.frame_times[-1])
+        table = _trial_segments(asc, trial_id, timeline.frame_times, timeline.positions, px_per_deg, step, span)
+        table["target"] = (table["object"] >= 0) & timeline.targets[table["object"].to_numpy()]
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def game_pursuit(asc: AscParser, px_per_deg: Optional[float] = None) -> pd.DataFrame:
+    """Pursuit segments of every ItalianGame round, with the followed ``animal_type``."""
+    px_per_deg = px_per_deg or pixels_per_degree(asc)
+    step = max(1, int(round(1000 / (asc.get_sample_rate() or 1000))))
+    tables = []
+    for trial_id in asc.list_trials():
+        if not trial_id.isdigit():
+            continue
+        timeline = reconstruct_trial(asc, trial_id)
+        span = (timeline.frame_times[0], timeline.frame_times[-1]) if len(timeline.frame_times) else (0, -1)
+        table = _trial_segments(asc, trial_id, timeline.frame_times, timeline.positions.astype(float),
+                                px_per_deg, step, span)
+        types = np.asarray(timeline.animal_types + [None], dtype=object)
+        table["animal_type"] = types[table["object"].to_numpy()]
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def _session_pursuit(asc_file: str | Path, task: str) -> pd.DataFrame:
+    asc = AscParser(asc_file)
+    return mot_pursuit(asc) if task == "mot" else game_pursuit(asc)
+
+
+def cohort_pursuit(asc_files: Dict[str, str | Path], task: str = "mot",
+                   max_workers: Optional[int] = None) -> pd.DataFrame:
+    """:func:`mot_pursuit` or :func:`game_pursuit` for every session, one session per process."""
+    if task not in ("mot", "game"):
+        raise ValueError(f"Unknown task {task!r}")
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_pursuit, asc_files.values(), [task] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
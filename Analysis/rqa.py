@@ -0,0 +1,142 @@
+"""Fixation-based recurrence quantification analysis (Anderson et al., 2013).
+
+Two fixations *i < j* recur when they lie within ``radius`` px of each
+other.  From the upper triangle of the recurrence matrix:
+
+* ``recurrence`` – percentage of recurrent fixation pairs;
+* ``determinism`` – percentage of recurrences on diagonal lines of at least
+  ``min_line`` points (repeated fixation sequences);
+* ``laminarity`` – percentage of recurrences on horizontal and vertical
+  lines of at least ``min_line`` points (areas re-inspected in detail);
+* ``corm`` – centre of recurrence mass, small when refixations are close in
+  time.
+
+The matrix is never materialised: rows are processed in bands of at most
+``BLOCK_ELEMENTS`` cells, and line lengths that continue across a band
+boundary are carried per diagonal and per column, so memory stays
+``O(N)`` and long game rounds with tens of thousands of fixations are fine.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .trial_arrays import fixation_array
+
+DEFAULT_RADIUS = 64.0  # px
+MIN_LINE = 2
+BLOCK_ELEMENTS = 1 << 22
+
+
+def _line_points(key: np.ndarray, pos: np.ndarray, n_rows: int, carry: np.ndarray, min_line: int) -> int:
+    """Recurrent points on finished lines of at least *min_line* points.
+
+    The recurrent cells of a block are given as line ``key`` (column,
+    diagonal offset or row) and ``pos`` along the line, rows ``0..n_rows-1``.
+    *carry* holds, per key, the length of the line still open at the end of
+    the previous block and is updated in place.
+    """
+    order = np.lexsort((pos, key))
+    key, pos = key[order], pos[order]
+    breaks = np.flatnonzero((np.diff(key) != 0) | (np.diff(pos) != 1)) + 1
+    starts = np.concatenate(([0], breaks)).astype(np.int64)
+    ends = np.concatenate((breaks, [key.size])).astype(np.int64)
+    if not key.size:
+        starts = ends = np.empty(0, dtype=np.int64)
+    run_key = key[starts]
+    length = ends - starts
+
+    # lines entering the block at row 0 continue the carried ones, the rest are finished
+    continued = run_key[pos[starts] == 0]
+    stopped = np.flatnonzero(carry)
+    stopped = stopped[~np.isin(stopped, continued)]
+    points = int(carry[stopped][carry[stopped] >= min_line].sum())
+    length[pos[starts] == 0] += carry[continued]
+
+    carry[:] = 0
+    still_open = pos[ends - 1] == n_rows - 1
+    carry[run_key[still_open]] = length[still_open]
+    done = length[~still_open]
+    return points + int(done[done >= min_line].sum())
+
+
+def _flush(carry: np.ndarray, min_line: int) -> int:
+    return int(carry[carry >= min_line].sum())
+
+
+def rqa(points: np.ndarray, radius: float = DEFAULT_RADIUS, min_line: int = MIN_LINE,
+        block_elements: int = BLOCK_ELEMENTS) -> Dict[str, float]:
+    """RQA measures of an ``(N, 2)`` fixation sequence."""
+    points = np.asarray(points, dtype=float)
+    points = points[np.isfinite(points).all(axis=1)]
+    n = len(points)
+    result = {"n_fixations": n, "recurrences": 0, "recurrence": np.nan, "determinism": np.nan,
+              "laminarity": np.nan, "corm": np.nan}
+    if n < 2:
+        return result
+
+    x, y = points[:, 0], points[:, 1]
+    band = max(1, block_elements // n)
+    diag_carry = np.zeros(n, dtype=np.int64)  # indexed by offset j - i
+    vert_carry = np.zeros(n, dtype=np.int64)  # indexed by column j
+    recurrences = diagonal = horizontal = vertical = 0
+    weighted = 0
+    r2 = radius * radius
+
+    for a in range(0, n, band):
+        b = min(a + band, n)
+        # squared distances of rows a..b-1 to columns a..n-1, in place to bound memory
+        d2 = x[a:b, None] - x[None, a:]
+        np.square(d2, out=d2)
+        dy = y[a:b, None] - y[None, a:]
+        np.square(dy, out=dy)
+        d2 += dy
+        k, c = np.nonzero(d2 <= r2)
+        upper = c > k  # column a + c is right of row a + k
+        k, c = k[upper], c[upper]
+        i, j = a + k, a + c
+
+        recurrences += k.size
+        weighted += int((j - i).sum())
+        vertical += _line_points(j, k, b - a, vert_carry, min_line)
+        diagonal += _line_points(j - i, k, b - a, diag_carry, min_line)
+        row_carry = np.zeros(b - a, dtype=np.int64)
+        horizontal += _line_points(k, c, n - a, row_carry, min_line) + _flush(row_carry, min_line)
+
+    diagonal += _flush(diag_carry, min_line)
+    vertical += _flush(vert_carry, min_line)
+
+    result["recurrences"] = recurrences
+    result["recurrence"] = 100 * 2 * recurrences / (n * (n - 1))
+    if recurrences:
+        result["determinism"] = 100 * diagonal / recurrences
+        result["laminarity"] = 100 * (horizontal + vertical) / (2 * recurrences)
+        result["corm"] = 100 * weighted / ((n - 1) * recurrences)
+    return result
+
+
+def session_rqa(asc: AscParser, eye: Optional[str] = None, radius: float = DEFAULT_RADIUS,
+                min_line: int = MIN_LINE) -> pd.DataFrame:
+    """:func:`rqa` of the fixations of every trial, one row per trial."""
+    rows = []
+    for trial_id in asc.list_trials():
+        fixations = fixation_array(asc, trial_id, eye)
+        rows.append({"trial_id": trial_id, **rqa(fixations[:, 2:4], radius, min_line)})
+    return pd.DataFrame(rows)
+
+
+def _session_rqa(asc_file: str | Path, kwargs: dict) -> pd.DataFrame:
+    return session_rqa(AscParser(asc_file), **kwargs)
+
+
+def cohort_rqa(asc_files: Dict[str, str | Path], max_workers: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """:func:`session_rqa` for every participant, one session per process."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_rqa, asc_files.values(), [kwargs] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
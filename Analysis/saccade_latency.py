@@ -0,0 +1,129 @@
+"""First-saccade latency and accuracy for the AbruptOnset (REACTION) task.
+
+Each trial's target is redrawn from ``config_pairs.json`` exactly like
+``AbruptOnset.get_position_around_center`` does; trials of the second phase
+also get the three '7' distractors at 90° steps.  The first saccade after
+``TARGET_DRAWN`` is found for every trial at once with ``searchsorted`` over
+the session's saccade table.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .task_constants import CONFIG_PAIRS_PATH, DIST_FROM_CENTER, DISTRACTOR_OFFSETS, REACTION_TRIALS_PER_PHASE
+from .trial_arrays import event_times, screen_size, session_saccades, trial_of
+
+MIN_LATENCY_MS = 80  # earlier saccades are anticipatory
+MAX_LATENCY_MS = 1000
+MIN_AMPLITUDE_DEG = 1.0  # ignore microsaccades on the fixation cross
+
+
+def stimulus_layout(screen: Tuple[int, int], config_path: str | Path = CONFIG_PAIRS_PATH) -> pd.DataFrame:
+    """Target and distractor positions of every configured trial.
+
+    Columns ``letter``, ``angle``, ``with_distractors``, ``target_x``,
+    ``target_y`` and ``distractor_{1,2,3}_{x,y}`` (NaN in phase one).
+    """
+    with open(config_path, "r") as f:
+        pairs = json.load(f)
+    cx, cy = screen[0] // 2, screen[1] // 2
+    angles = np.array([float(p["angle"]) for p in pairs])
+    with_distractors = np.arange(len(pairs)) >= REACTION_TRIALS_PER_PHASE
+
+    all_angles = np.radians(np.column_stack([angles] + [(angles + o) % 360 for o in DISTRACTOR_OFFSETS]))
+    xs = (cx + DIST_FROM_CENTER * np.cos(all_angles)).astype(int).astype(float)
+    ys = (cy + DIST_FROM_CENTER * np.sin(all_angles)).astype(int).astype(float)
+    xs[~with_distractors, 1:] = np.nan
+    ys[~with_distractors, 1:] = np.nan
+
+    layout = pd.DataFrame({
+        "letter": [p["letter"] for p in pairs],
+        "angle": angles,
+        "with_distractors": with_distractors,
+        "target_x": xs[:, 0],
+        "target_y": ys[:, 0],
+    })
+    for k in range(1, len(DISTRACTOR_OFFSETS) + 1):
+        layout[f"distractor_{k}_x"] = xs[:, k]
+        layout[f"distractor_{k}_y"] = ys[:, k]
+    return layout
+
+
+def first_saccades(
+    asc: AscParser,
+    eye: Optional[str] = None,
+    min_latency: int = MIN_LATENCY_MS,
+    max_latency: int = MAX_LATENCY_MS,
+    min_amplitude: float = MIN_AMPLITUDE_DEG,
+    config_path: str | Path = CONFIG_PAIRS_PATH,
+) -> pd.DataFrame:
+    """One row per ``TARGET_DRAWN`` with latency, landing error and capture.
+
+    ``landing_item`` is 0 when the saccade landed nearest the target, 1-3
+    for a distractor and -1 when it ended closer to the centre than to any
+    item; ``captured`` marks distractor landings.
+    """
+    screen = screen_size(asc)
+    layout = stimulus_layout(screen, config_path)
+
+    onsets = event_times(asc, "TARGET_DRAWN")
+    trial_ids = trial_of(asc, onsets)
+    # onsets before the first trial belong to no stimulus configuration
+    assigned = np.array([t is not None for t in trial_ids], dtype=bool)
+    onsets, trial_ids = onsets[assigned], trial_ids[assigned]
+    trial_index = np.array([int(t) for t in trial_ids])
+    rows = layout.iloc[trial_index].reset_index(drop=True)
+
+    sacc = session_saccades(asc, eye)
+    sacc = sacc[(sacc["amplitude"] >= min_amplitude) & sacc[["x_end", "y_end"]].notna().all(axis=1)]
+    starts = sacc["start"].to_numpy()
+    idx = np.searchsorted(starts, onsets + min_latency, side="left")
+    found = idx < starts.size
+    found[found] &= starts[idx[found]] <= onsets[found] + max_latency
+    pick = sacc.iloc[idx[found]]
+
+    result = pd.DataFrame({"trial_id": trial_ids, "onset": onsets})
+    result = pd.concat([result, rows], axis=1)
+    for column, source in (("latency", "start"), ("x_start", "x_start"), ("y_start", "y_start"),
+                           ("x_end", "x_end"), ("y_end", "y_end"), ("amplitude", "amplitude")):
+        values = np.full(len(result), np.nan)
+        values[found] = pick[source].to_numpy(dtype=float)
+        result[column] = values
+    result["latency"] -= result["onset"]
+
+    # landing accuracy
+    landing = result[["x_end", "y_end"]].to_numpy()
+    target = result[["target_x", "target_y"]].to_numpy()
+    result["landing_error"] = np.hypot(*(landing - target).T)
+    sacc_dir = np.degrees(np.arctan2(result["y_end"] - result["y_start"], result["x_end"] - result["x_start"]))
+    result["direction_error"] = np.abs((sacc_dir - result["angle"] + 180) % 360 - 180)
+
+    # nearest item among target + distractors, within half the item eccentricity
+    items = np.stack([target] + [result[[f"distractor_{k}_x", f"distractor_{k}_y"]].to_numpy()
+                                 for k in range(1, len(DISTRACTOR_OFFSETS) + 1)], axis=1)
+    dist = np.hypot(*(items - landing[:, None, :]).transpose(2, 0, 1))
+    dist = np.where(np.isnan(dist), np.inf, dist)
+    nearest = np.argmin(dist, axis=1)
+    near_enough = dist[np.arange(len(dist)), nearest] <= DIST_FROM_CENTER / 2
+    result["landing_item"] = np.where(near_enough, nearest, -1)
+    result["captured"] = near_enough & (nearest > 0)
+    return result
+
+
+def _session_latencies(asc_file: str | Path, kwargs: dict) -> pd.DataFrame:
+    return first_saccades(AscParser(asc_file), **kwargs)
+
+
+def cohort_latencies(asc_files: Dict[str, str | Path], max_workers: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """:func:`first_saccades` for every participant, stacked with a ``participant`` column."""
+    names = list(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(_session_latencies, asc_files.values(), [kwargs] * len(names)))
+    return pd.concat([t.assign(participant=name) for name, t in zip(names, tables)], ignore_index=True)
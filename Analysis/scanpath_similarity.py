@@ -0,0 +1,322 @@
+"""Pairwise scanpath similarity between participants on the same trial.
+
+Two families of measures are computed for every pair of participants:
+
+* **string_edit** – Levenshtein distance between AOI-grid strings, normalised
+  to ``1 - d / max(len)``.
+* **MultiMatch-style** vector measures – saccade vectors of both scanpaths are
+  aligned on their vector difference and compared on ``vector``,
+  ``direction``, ``length``, ``position`` and ``duration`` (each ``0..1``,
+  higher is more similar).  The scanpath simplification step of the original
+  MultiMatch is skipped.
+
+Fixations can be drift-corrected first (``drift=`` mode, see
+:mod:`Analysis.drift`).  Pairs are scored in a process pool and stored per
+task, trial, eye and drift mode in an
+``.npz`` file together with the :func:`~Analysis.cache.file_key` of every
+participant's recording, so adding a participant to a cohort only scores
+the new row and a re-exported recording is scored again.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .cache import CACHE_ROOT, cohort_cache_file, file_key
+from .drift import fixation_positions
+from .trial_arrays import screen_size
+
+MEASURES = ("string_edit", "vector", "direction", "length", "position", "duration")
+DEFAULT_GRID = (5, 5)  # columns, rows
+PAIRS_PER_TASK = 64
+
+
+# ---------------------------------------------------------------------
+# Scanpath construction
+# ---------------------------------------------------------------------
+
+def build_scanpath(asc: AscParser, trial_id: str, eye: Optional[str] = None,
+                   drift: Optional[str] = None) -> np.ndarray:
+    """Scanpath of one trial as an ``(N, 3)`` array ``x, y, duration``, drift-corrected if *drift* is set."""
+    return fixation_positions(asc, trial_id, eye, drift)[:, 2:5]
+
+
+def aoi_string(scanpath: np.ndarray, screen: Tuple[int, int],
+               grid: Tuple[int, int] = DEFAULT_GRID, collapse: bool = True) -> np.ndarray:
+    """Encode fixations as AOI-grid cell indices (row-major).
+
+    With *collapse* consecutive fixations in the same cell count once.
+    """
+    cols, rows = grid
+    col = np.clip((scanpath[:, 0] * cols // screen[0]).astype(int), 0, cols - 1)
+    row = np.clip((scanpath[:, 1] * rows // screen[1]).astype(int), 0, rows - 1)
+    codes = row * cols + col
+    if collapse and codes.size:
+        codes = codes[np.r_[True, codes[1:] != codes[:-1]]]
+    return codes
+
+
+# ---------------------------------------------------------------------
+# Distance kernels
+# ---------------------------------------------------------------------
+
+def levenshtein(a: np.ndarray, b: np.ndarray) -> int:
+    """Edit distance with unit costs, one vectorised DP row per symbol of *a*.
+
+    Insertions inside a row are resolved with a running minimum:
+    ``row[j] = j + min_k<=j (t[k] - k)``.
+    """
+    if a.size == 0 or b.size == 0:
+        return int(max(a.size, b.size))
+    idx = np.arange(b.size + 1)
+    row = idx.copy()
+    for i, symbol in enumerate(a, start=1):
+        t = np.empty_like(row)
+        t[0] = i
+        t[1:] = np.minimum(row[1:] + 1, row[:-1] + (b != symbol))
+        row = idx + np.minimum.accumulate(t - idx)
+    return int(row[-1])
+
+
+def string_edit_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    longest = max(a.size, b.size)
+    if longest == 0:
+        return float("nan")
+    return 1.0 - levenshtein(a, b) / longest
+
+
+def _lowest_cost_path(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Monotone path from the top-left to the bottom-right cell of *cost*.
+
+    Steps go right, down or diagonally.  Each DP row is computed in one pass
+    using ``D[i, j] = S[j] + min_k<=j (a[k] - S[k] + M[i, k])`` where ``S`` is
+    the row's cumulative cost and ``a`` the best entry from the row above.
+    """
+    n, m = cost.shape
+    acc = np.empty_like(cost)
+    acc[0] = np.cumsum(cost[0])
+    for i in range(1, n):
+        above = np.empty(m)
+        above[0] = acc[i - 1, 0]
+        above[1:] = np.minimum(acc[i - 1, 1:], acc[i - 1, :-1])
+        s = np.cumsum(cost[i])
+        acc[i] = s + np.minimum.accumulate(above - s + cost[i])
+
+    i, j = n - 1, m - 1
+    path_i, path_j = [i], [j]
+    while i or j:
+        if i == 0:
+            j -= 1
+        elif j == 0:
+            i -= 1
+        else:
+            step = np.argmin((acc[i - 1, j - 1], acc[i - 1, j], acc[i, j - 1]))
+            i, j = (i - 1, j - 1) if step == 0 else (i - 1, j) if step == 1 else (i, j - 1)
+        path_i.append(i)
+        path_j.append(j)
+    return np.array(path_i[::-1]), np.array(path_j[::-1])
+
+
+def multimatch(a: np.ndarray, b: np.ndarray, screen: Tuple[int, int]) -> np.ndarray:
+    """``vector, direction, length, position, duration`` similarities of two scanpaths."""
+    if len(a) < 2 or len(b) < 2:
+        return np.full(5, np.nan)
+    diag = float(np.hypot(*screen))
+
+    vec_a, vec_b = np.diff(a[:, :2], axis=0), np.diff(b[:, :2], axis=0)
+    diff = vec_a[:, None, :] - vec_b[None, :, :]
+    cost = np.hypot(diff[..., 0], diff[..., 1])
+    pi, pj = _lowest_cost_path(cost)
+
+    va, vb = vec_a[pi], vec_b[pj]
+    len_a, len_b = np.hypot(va[:, 0], va[:, 1]), np.hypot(vb[:, 0], vb[:, 1])
+    angle = np.abs(np.arctan2(va[:, 1], va[:, 0]) - np.arctan2(vb[:, 1], vb[:, 0]))
+    angle = np.minimum(angle, 2 * np.pi - angle)
+    pos = a[pi, :2] - b[pj, :2]
+    dur_a, dur_b = a[pi, 2], b[pj, 2]
+
+    return 1.0 - np.array([
+        np.median(cost[pi, pj]) / (2 * diag),
+        np.median(angle) / np.pi,
+        np.median(np.abs(len_a - len_b)) / diag,
+        np.median(np.hypot(pos[:, 0], pos[:, 1])) / diag,
+        np.median(np.abs(dur_a - dur_b) / np.maximum(np.maximum(dur_a, dur_b), 1.0)),
+    ])
+
+
+def compare_scanpaths(a: np.ndarray, b: np.ndarray, screen: Tuple[int, int],
+                      grid: Tuple[int, int] = DEFAULT_GRID) -> np.ndarray:
+    """All :data:`MEASURES` for one pair of scanpaths."""
+    edit = string_edit_similarity(aoi_string(a, screen, grid), aoi_string(b, screen, grid))
+    return np.concatenate(([edit], multimatch(a, b, screen)))
+
+
+def _score_pairs(pairs: List[Tuple[int, int]], scanpaths: List[np.ndarray],
+                 screen: Tuple[int, int], grid: Tuple[int, int]) -> np.ndarray:
+    return np.array([compare_scanpaths(scanpaths[i], scanpaths[j], screen, grid) for i, j in pairs])
+
+
+# ---------------------------------------------------------------------
+# Per-trial cache
+# ---------------------------------------------------------------------
+
+def _cache_file(cache_root: str | Path, task: str, trial_id: str, screen: Tuple[int, int],
+                grid: Tuple[int, int], eye: Optional[str], drift: Optional[str]) -> Path:
+    return cohort_cache_file("scanpath_similarity", f"{task}_trial_{trial_id}", cache_root=cache_root,
+                             screen=list(screen), grid=list(grid), eye=eye, drift=drift)
+
+
+def _load_cache(path: Path) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """Participants, their recording keys, scores and the mask of scored pairs."""
+    if path.exists():
+        with np.load(path, allow_pickle=False) as data:
+            return data["participants"].tolist(), data["sources"].tolist(), data["scores"], data["done"]
+    return [], [], np.empty((0, 0, len(MEASURES))), np.empty((0, 0), dtype=bool)
+
+
+def pairwise_similarity(
+    trial_id: str,
+    scanpaths: Dict[str, np.ndarray],
+    screen: Tuple[int, int],
+    task: str,
+    grid: Tuple[int, int] = DEFAULT_GRID,
+    eye: Optional[str] = None,
+    sources: Optional[Dict[str, str]] = None,
+    cache_root: str | Path = CACHE_ROOT,
+    executor: Optional[Executor] = None,
+    refresh: bool = False,
+    drift: Optional[str] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Similarity matrices of one trial, one DataFrame per measure.
+
+    Parameters
+    ----------
+    scanpaths : dict[participant, (N, 3) ndarray]
+        Output of :func:`build_scanpath` for every participant.
+    task, eye : str
+        Part of the cache key; trial ids restart in every task.
+    sources : dict[participant, str] | None
+        :func:`~Analysis.cache.file_key` of every participant's recording.
+        Cached scores of a participant whose key changed are recomputed.
+    executor : Executor | None
+        Pool used for scoring; a temporary :class:`ProcessPoolExecutor` is
+        created when omitted.
+    refresh : bool
+        Ignore cached scores for the given participants.
+    drift : str | None
+        Drift mode the scanpaths were corrected with; part of the cache key.
+
+    Cached scores are keyed by participant name, so only pairs of given
+    participants that were not scored before are computed.  Participants
+    only in the cache keep their rows; their pairs with new participants
+    stay unscored (NaN) until both scanpaths are given.
+    """
+    sources = sources or {}
+    path = _cache_file(cache_root, task, trial_id, screen, grid, eye, drift)
+    cached, keys, cached_scores, cached_done = _load_cache(path)
+    # participants given again with another recording (or refreshed) are scored anew
+    keep = [i for i, p in enumerate(cached)
+            if p not in scanpaths or (not refresh and keys[i] == sources.get(p, ""))]
+    dropped = len(keep) < len(cached)
+    cached, keys = [cached[i] for i in keep], [keys[i] for i in keep]
+
+    participants = cached + [p for p in scanpaths if p not in cached]
+    keys += [sources.get(p, "") for p in participants[len(cached):]]
+    n, n_old = len(participants), len(cached)
+    scores = np.full((n, n, len(MEASURES)), np.nan)
+    done = np.zeros((n, n), dtype=bool)
+    scores[:n_old, :n_old] = cached_scores[np.ix_(keep, keep)]
+    done[:n_old, :n_old] = cached_done[np.ix_(keep, keep)]
+    scores[np.arange(n), np.arange(n)] = 1.0
+    done[np.arange(n), np.arange(n)] = True
+
+    given = np.array([p in scanpaths for p in participants])
+    pairs = [(i, j) for j in range(n) for i in range(j) if given[i] and given[j] and not done[i, j]]
+    if pairs or dropped:
+        paths = [scanpaths.get(p) for p in participants]
+        chunks = [pairs[k:k + PAIRS_PER_TASK] for k in range(0, len(pairs), PAIRS_PER_TASK)]
+        own_pool = executor is None and bool(chunks)
+        pool = ProcessPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 1)) if own_pool else executor
+        try:
+            futures = [pool.submit(_score_pairs, chunk, paths, screen, grid) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                rows, cols = np.array(chunk).T
+                result = future.result()
+                scores[rows, cols] = result
+                scores[cols, rows] = result
+                done[rows, cols] = done[cols, rows] = True
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, participants=np.array(participants), sources=np.array(keys),
+                            scores=scores, done=done)
+
+    wanted = [participants.index(p) for p in scanpaths]
+    return {
+        name: pd.DataFrame(scores[np.ix_(wanted, wanted)][..., k], index=list(scanpaths), columns=list(scanpaths))
+        for k, name in enumerate(MEASURES)
+    }
+
+
+# ---------------------------------------------------------------------
+# Cohort entry point
+# ---------------------------------------------------------------------
+
+def _load_scanpaths(asc_file: str | Path, eye: Optional[str],
+                    drift: Optional[str]) -> Tuple[Tuple[int, int], Dict[str, np.ndarray]]:
+    asc = AscParser(asc_file)
+    return screen_size(asc), {t: build_scanpath(asc, t, eye, drift) for t in asc.list_trials()}
+
+
+def cohort_similarity(
+    asc_files: Dict[str, str | Path],
+    task: str,
+    trial_ids: Optional[Iterable[str]] = None,
+    grid: Tuple[int, int] = DEFAULT_GRID,
+    eye: Optional[str] = None,
+    cache_root: str | Path = CACHE_ROOT,
+    max_workers: Optional[int] = None,
+    drift: Optional[str] = None,
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """Pairwise similarity for every trial shared by the participants.
+
+    Parameters
+    ----------
+    asc_files : dict[participant, path]
+        One ASC file of *task* per participant.
+    trial_ids : iterable[str] | None
+        Trials to compare (default: every trial present in all files).
+    drift : str | None
+        Drift mode of :func:`~Analysis.drift.fixation_positions` (default: uncorrected).
+
+    Returns ``{trial_id: {measure: DataFrame}}``.
+    """
+    sources = {p: file_key(f) for p, f in asc_files.items()}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        loaded = dict(zip(asc_files, pool.map(_load_scanpaths, asc_files.values(),
+                                              [eye] * len(asc_files), [drift] * len(asc_files))))
+        screens = {screen for screen, _ in loaded.values()}
+        if len(screens) != 1:
+            raise ValueError(f"Recordings use different screen sizes: {sorted(screens)}")
+        screen = screens.pop()
+
+        if trial_ids is None:
+            common = set.intersection(*(set(paths) for _, paths in loaded.values()))
+            trial_ids = [t for t in next(iter(loaded.values()))[1] if t in common]
+
+        return {
+            str(trial_id): pairwise_similarity(
+                str(trial_id),
+                {p: paths[str(trial_id)] for p, (_, paths) in loaded.items()},
+                screen, task, grid, eye, sources, cache_root, executor=pool, drift=drift,
+            )
+            for trial_id in trial_ids
+        }
@@ -0,0 +1,46 @@
+"""Stimulus constants needed to reconstruct what was on screen.
+
+The stimulus modules create a fullscreen pygame window when imported, so the
+values are mirrored here.  Keep them in sync with the files named in each
+section.
+"""
+
+# stimulus/Utils.py
+DISPLAY_SIZE_MULTIPLIER = 1.75
+MOUSE_POS_MSG = "!MOUSE_POS"
+
+# stimulus/ItalianGame/CommonConsts.py, ItalianGame.py, Animal.py
+ANIMAL_TRIALS_PATH = "stimulus/ItalianGame/animal_trials.json"
+ANIMAL_SPEED = 2 * DISPLAY_SIZE_MULTIPLIER  # px per frame
+SPAWN_INTERVAL = 2000  # ms
+GAME_FPS = 30
+ANIMALS_CIRCLE_RADIUS = int(25 * DISPLAY_SIZE_MULTIPLIER)
+HOME_BASE_BOUNDARY_RADIUS = int(100 * DISPLAY_SIZE_MULTIPLIER)
+RED_CIRCLE_RADIUS = 20 * DISPLAY_SIZE_MULTIPLIER
+RED_CIRCLE_DURATION = 300 * DISPLAY_SIZE_MULTIPLIER  # ms
+ANIMAL_DAMAGE = {"Tralalero_Tralala": 20, "Chimpanzini_Bananini": 10, "Tung_Tung_Sahur": 0}
+COUNTED_KILL_TYPE = "Tung_Tung_Sahur"  # the only kills game_round counts (tung_tung_kills)
+GAME_FONT_SIZE = int(36 * DISPLAY_SIZE_MULTIPLIER)
+HOUSE_IMAGE_SIZE = (int(80 * DISPLAY_SIZE_MULTIPLIER), int(80 * DISPLAY_SIZE_MULTIPLIER))
+WEAPON_RANGES = (450 * DISPLAY_SIZE_MULTIPLIER, 250 * DISPLAY_SIZE_MULTIPLIER)  # Bombardino, Bombini
+GAME_BACKGROUND_PATH = "stimulus/ItalianGame/pictures/background.png"
+HOUSE_IMAGE_PATH = "stimulus/ItalianGame/pictures/House.png"
+
+# stimulus/AbruptOnset/AbruptOnset.py
+CONFIG_PAIRS_PATH = "stimulus/AbruptOnset/config_pairs.json"
+DIST_FROM_CENTER = 500 * DISPLAY_SIZE_MULTIPLIER
+REACTION_TRIALS_PER_PHASE = 50  # phase 2 (with '7' distractors) starts at this trial index
+DISTRACTOR_OFFSETS = (90, 180, 270)  # degrees from the target angle
+REACTION_BACKGROUND = (230, 230, 230)
+REACTION_LETTER_COLOR = (50, 50, 180)
+FIXATION_SIZE = int(40 * DISPLAY_SIZE_MULTIPLIER)
+LETTER_FONT_SIZE = int(30 * DISPLAY_SIZE_MULTIPLIER)
+
+# stimulus/Mot/Mot.py
+MOT_CONFIG_PATH = "stimulus/Mot/mot_config.yaml"
+BALL_RADIUS = int(20 * DISPLAY_SIZE_MULTIPLIER)
+MOT_FPS = 30
+
+# stimulus/VisualSearch/VisualSearch.py
+SEARCH_TRIALS_PATHS = tuple(f"stimulus/VisualSearch/{kind}_trials.json" for kind in ("pop_out", "feature", "conjunction"))
+SEARCH_FONT_SIZE = int(40 * DISPLAY_SIZE_MULTIPLIER)  # also the click radius around an item
@@ -0,0 +1,140 @@
+"""NumPy views of :class:`parser.AscParser` trials for offline analysis.
+
+The stimulus modules open a fullscreen pygame window on import, so nothing in
+``Analysis`` imports them; geometry comes from the recording itself
+(``DISPLAY_COORDS``) instead.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from .task_constants import MOUSE_POS_MSG
+
+
+def screen_size(asc: AscParser) -> Tuple[int, int]:
+    """Screen size in pixels.
+
+    ``DISPLAY_COORDS`` stores the right/bottom pixel coordinate, so the size
+    is one more than what :meth:`AscParser.get_screen_dims` reports.
+    """
+    width, height = asc.get_screen_dims()
+    if width is None or height is None:
+        raise ValueError(f"{asc.filepath} has no DISPLAY_COORDS message.")
+    return width + 1, height + 1
+
+
+def pick_eye(asc: AscParser, trial_id: str, eye: Optional[str] = None) -> str:
+    """Eye label (``"L"``/``"R"``) to use for event-based measures.
+
+    Defaults to the right eye when it was recorded, otherwise the left one.
+    """
+    if eye is not None:
+        return eye.upper()
+    eyes = {f["eye"] for f in asc.fixations.get(trial_id, [])}
+    return "R" if "R" in eyes or not eyes else "L"
+
+
+def fixation_array(asc: AscParser, trial_id: str, eye: Optional[str] = None) -> np.ndarray:
+    """Fixations of one eye as an ``(N, 5)`` array ``start, end, x, y, duration``.
+
+    Fixations without a valid position are dropped.
+    """
+    df = asc.fixations_to_dataframe(trial_id)
+    df = df[(df["eye"] == pick_eye(asc, trial_id, eye)) & df[["x", "y"]].notna().all(axis=1)]
+    return df[["start", "end", "x", "y", "duration"]].to_numpy(dtype=float)
+
+
+def gaze_array(asc: AscParser, trial_id: str) -> np.ndarray:
+    """Gaze samples as an ``(N, 3)`` array ``time, x, y``.
+
+    Binocular recordings use the average of both eyes.
+    """
+    df = asc.to_dataframe(trial_id)
+    return np.column_stack([df.index.to_numpy(dtype=float), df["x"].to_numpy(float), df["y"].to_numpy(float)])
+
+
+def session_samples(asc: AscParser) -> pd.DataFrame:
+    """Samples of every trial in one time-ordered frame (index ``time``)."""
+    frames = [asc.to_dataframe(t) for t in asc.list_trials()]
+    return pd.concat(frames).sort_index() if frames else pd.DataFrame()
+
+
+def session_saccades(asc: AscParser, eye: Optional[str] = None) -> pd.DataFrame:
+    """ESACC events of every trial for one eye (right by default), ordered by start."""
+    frames = [asc.saccades_to_dataframe(t) for t in asc.list_trials()]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["eye", "start"])
+    eye = eye.upper() if eye is not None else ("R" if (df["eye"] == "R").any() or df.empty else "L")
+    return df[df["eye"] == eye].sort_values("start", kind="stable").reset_index(drop=True)
+
+
+def trial_of(asc: AscParser, times: np.ndarray) -> np.ndarray:
+    """Trial id active at each EyeLink time (``None`` before the first trial)."""
+    ids = sorted(asc.trial_start_times, key=asc.trial_start_times.get)
+    starts = np.array([asc.trial_start_times[t] for t in ids], dtype=np.int64)
+    idx = np.searchsorted(starts, np.asarray(times), side="right") - 1
+    return np.array([ids[i] if i >= 0 else None for i in idx], dtype=object)
+
+
+def messages_by_trial(asc: AscParser) -> Dict[str, List[Tuple[int, str]]]:
+    """Session messages grouped by the trial they fall into, from one pass."""
+    owners = trial_of(asc, np.array([ts for ts, _ in asc.messages], dtype=np.int64))
+    grouped: Dict[str, List[Tuple[int, str]]] = {t: [] for t in asc.trial_start_times}
+    for owner, message in zip(owners, asc.messages):
+        if owner is not None:
+            grouped[owner].append(message)
+    return grouped
+
+
+def event_times(asc: AscParser, pattern: str) -> np.ndarray:
+    """Timestamps of all session messages matching the regex *pattern* (``re.match``)."""
+    regex = re.compile(pattern)
+    return np.array([ts for ts, msg in asc.messages if regex.match(msg)], dtype=np.int64)
+
+
+def message_times(messages: List[Tuple[int, str]], prefix: str) -> np.ndarray:
+    """Timestamps of the messages starting with *prefix*."""
+    return np.array([ts for ts, msg in messages if msg.startswith(prefix)], dtype=np.int64)
+
+
+def mouse_array(messages: List[Tuple[int, str]]) -> np.ndarray:
+    """``!MOUSE_POS`` messages (one per rendered frame) as ``(N, 3)`` ``time, x, y``."""
+    rows = []
+    for ts, msg in messages:
+        if msg.startswith(MOUSE_POS_MSG):
+            try:
+                _, x_s, y_s = msg.split()
+                rows.append((ts, float(x_s), float(y_s)))
+            except ValueError:
+                continue
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+
+def expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Flatten the index ranges ``[lo[k], hi[k])``.
+
+    Returns ``(owner, index)`` where ``owner`` is the range each index came
+    from, so per-range windows can be processed without a Python loop.
+    """
+    counts = np.maximum(np.asarray(hi) - np.asarray(lo), 0)
+    owner = np.repeat(np.arange(counts.size), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.arange(counts.sum()) - first + np.repeat(lo, counts)
+
+
+def interval_mask(time: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """True for every ``time`` inside any closed ``[start, end]`` interval."""
+    delta = np.zeros(time.size + 1, dtype=np.int64)
+    np.add.at(delta, np.searchsorted(time, starts, side="left"), 1)
+    np.add.at(delta, np.searchsorted(time, ends, side="right"), -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def true_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and (exclusive) end index of every run of True in *mask*."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
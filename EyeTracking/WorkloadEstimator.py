@@ -0,0 +1,313 @@
+"""Online workload estimate from the EyeLink link-sample stream.
+
+Samples are pushed one at a time into a ring buffer holding the last
+``window_s`` seconds.  Every push updates running sums in O(1) – the new
+sample is added and the evicted one subtracted – for
+
+* mean pupil size,
+* gaze dispersion (spatial SD of x/y),
+* fraction of missing samples (blinks / track loss),
+* saccade rate (velocity-threshold onsets inside the window).
+
+The first ``baseline_s`` seconds calibrate a per-feature mean and SD; after
+that every ``1 / emit_hz`` s the estimator emits the weighted mean of the
+feature z-scores as the workload score.
+
+During ``ItalianGame.game_round`` the estimator polls the link once per
+frame (:meth:`WorkloadEstimator.poll_link`) and logs ``WORKLOAD <score>``
+messages.  Offline, :func:`replay` feeds an :class:`AscParser` recording at
+real-time or accelerated speed (or as fast as possible) and reports
+throughput and per-sample update latency.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+
+FEATURES = ("pupil_mean", "dispersion", "missing_fraction", "saccade_rate")
+FEATURE_WEIGHTS = {"pupil_mean": 0.4, "dispersion": 0.2, "missing_fraction": 0.1, "saccade_rate": 0.3}
+WINDOW_S = 10.0
+BASELINE_S = 30.0
+EMIT_HZ = 4.0
+SACCADE_SPEED = 1500.0  # px/s, onset when the sample-to-sample speed crosses it
+SACCADE_REFRACTORY_MS = 20
+WORKLOAD_MSG = "WORKLOAD"
+
+
+class RingBuffer:
+    """Fixed-capacity sample buffer; :meth:`push` returns the evicted row (or None)."""
+
+    def __init__(self, capacity: int, width: int):
+        self.data = np.full((capacity, width), np.nan)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def push(self, row) -> Optional[np.ndarray]:
+        evicted = self.data[self.head].copy() if self.count == self.capacity else None
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return evicted
+
+    def oldest(self) -> np.ndarray:
+        return self.data[(self.head - self.count) % self.capacity]
+
+    def pop_oldest(self) -> np.ndarray:
+        row = self.oldest().copy()
+        self.count -= 1
+        return row
+
+
+class _Welford:
+    """Running mean / SD of one feature during the baseline."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, value: float) -> None:
+        if not math.isfinite(value):
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def sd(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+
+class WorkloadEstimator:
+    """Incremental workload score over a sliding window of gaze samples."""
+
+    def __init__(self, sample_rate: int = 1000, window_s: float = WINDOW_S, baseline_s: float = BASELINE_S,
+                 emit_hz: float = EMIT_HZ, weights: Optional[Dict[str, float]] = None):
+        self.window_ms = window_s * 1000
+        self.baseline_ms = baseline_s * 1000
+        self.emit_ms = 1000 / emit_hz
+        self.weights = dict(FEATURE_WEIGHTS if weights is None else weights)
+        # time, x, y, pupil
+        self.buffer = RingBuffer(int(math.ceil(window_s * sample_rate)) + 1, 4)
+        self.onsets: deque = deque()
+        self.baseline = {name: _Welford() for name in FEATURES}
+        self.n = self.n_missing = 0
+        self.sum_p = self.sum_x = self.sum_y = self.sum_xx = self.sum_yy = 0.0
+        self.n_valid = 0
+        self.first_time = self.next_emit = None
+        self.last_xy: Optional[Tuple[float, float, float]] = None
+        self.last_onset = -math.inf
+        self.above = False
+
+    # -----------------------------------------------------------------
+    # O(1) update
+    # -----------------------------------------------------------------
+
+    def _account(self, row, sign: int) -> None:
+        _, x, y, p = row
+        self.n += sign
+        if math.isfinite(x) and math.isfinite(y) and math.isfinite(p):
+            self.n_valid += sign
+            self.sum_p += sign * p
+            self.sum_x += sign * x
+            self.sum_y += sign * y
+            self.sum_xx += sign * x * x
+            self.sum_yy += sign * y * y
+        else:
+            self.n_missing += sign
+
+    def push(self, t: float, x: float, y: float, pupil: float) -> Optional[Dict[str, float]]:
+        """Add one sample; returns the features and score when an emission is due."""
+        # samples that are out of order (duplicated link data) are ignored
+        if self.last_xy is not None and t <= self.last_xy[0]:
+            return None
+        valid = math.isfinite(x) and math.isfinite(y) and math.isfinite(pupil) and pupil > 0
+        if not valid:
+            x = y = pupil = math.nan
+        row = (t, x, y, pupil)
+
+        # drop rows older than the window (recording gaps), then add the new one
+        while self.buffer.count and self.buffer.oldest()[0] <= t - self.window_ms:
+            self._account(self.buffer.pop_oldest(), -1)
+        evicted = self.buffer.push(row)
+        if evicted is not None:
+            self._account(evicted, -1)
+        self._account(row, +1)
+        while self.onsets and self.onsets[0] <= t - self.window_ms:
+            self.onsets.popleft()
+
+        if valid and self.last_xy is not None and math.isfinite(self.last_xy[1]):
+            dt = (t - self.last_xy[0]) / 1000
+            speed = math.hypot(x - self.last_xy[1], y - self.last_xy[2]) / dt
+            above = speed > SACCADE_SPEED
+            if above and not self.above and t - self.last_onset >= SACCADE_REFRACTORY_MS:
+                self.onsets.append(t)
+                self.last_onset = t
+            self.above = above
+        self.last_xy = (t, x, y)
+
+        if self.first_time is None:
+            self.first_time = t
+            self.next_emit = t + self.emit_ms
+        if t < self.next_emit:
+            return None
+        self.next_emit += self.emit_ms * max(1, math.floor((t - self.next_emit) / self.emit_ms) + 1)
+        return self._emit(t)
+
+    # -----------------------------------------------------------------
+    # Features and score
+    # -----------------------------------------------------------------
+
+    def features(self) -> Dict[str, float]:
+        span_s = (self.last_xy[0] - self.buffer.oldest()[0]) / 1000 if self.buffer.count > 1 else math.nan
+        if not self.n_valid:
+            return {"pupil_mean": math.nan, "dispersion": math.nan,
+                    "missing_fraction": 1.0 if self.n else math.nan, "saccade_rate": math.nan}
+        mean_x, mean_y = self.sum_x / self.n_valid, self.sum_y / self.n_valid
+        var = max(self.sum_xx / self.n_valid - mean_x ** 2, 0.0) + max(self.sum_yy / self.n_valid - mean_y ** 2, 0.0)
+        return {
+            "pupil_mean": self.sum_p / self.n_valid,
+            "dispersion": math.sqrt(var),
+            "missing_fraction": self.n_missing / self.n,
+            "saccade_rate": len(self.onsets) / span_s if span_s > 0 else math.nan,
+        }
+
+    def _emit(self, t: float) -> Dict[str, float]:
+        values = self.features()
+        calibrating = t - self.first_time < self.baseline_ms
+        if calibrating:
+            for name in FEATURES:
+                self.baseline[name].add(values[name])
+
+        score, weight = 0.0, 0.0
+        if not calibrating:
+            for name, w in self.weights.items():
+                stats = self.baseline[name]
+                if stats.n > 1 and stats.sd > 0 and math.isfinite(values[name]):
+                    score += w * (values[name] - stats.mean) / stats.sd
+                    weight += w
+        values["time"] = t
+        values["calibrating"] = calibrating
+        values["score"] = score / weight if weight else math.nan
+        return values
+
+    # -----------------------------------------------------------------
+    # Live link
+    # -----------------------------------------------------------------
+
+    def poll_link(self, el_tracker, send_messages: bool = True) -> List[Dict[str, float]]:
+        """Drain new link samples; log and return any emitted estimates."""
+        import pylink  # only needed on the experiment PC
+
+        emitted = []
+        while True:
+            data_type = el_tracker.getNextData()
+            if not data_type:
+                break
+            if data_type != pylink.SAMPLE_TYPE:
+                continue
+            sample = el_tracker.getFloatData()
+            eyes = [e for e in (sample.getLeftEye() if sample.isLeftSample() else None,
+                                sample.getRightEye() if sample.isRightSample() else None) if e is not None]
+            if not eyes:
+                continue
+            gx = [e.getGaze()[0] for e in eyes]
+            gy = [e.getGaze()[1] for e in eyes]
+            pa = [e.getPupilSize() for e in eyes]
+            missing = pylink.MISSING_DATA
+            valid = [k for k in range(len(eyes)) if gx[k] != missing and gy[k] != missing and pa[k] > 0]
+            if valid:
+                x = sum(gx[k] for k in valid) / len(valid)
+                y = sum(gy[k] for k in valid) / len(valid)
+                p = sum(pa[k] for k in valid) / len(valid)
+            else:
+                x = y = p = math.nan
+            result = self.push(sample.getTime(), x, y, p)
+            if result is not None:
+                emitted.append(result)
+                if send_messages and not result["calibrating"] and math.isfinite(result["score"]):
+                    el_tracker.sendMessage(f"{WORKLOAD_MSG} {result['score']:.3f}")
+        return emitted
+
+
+# ---------------------------------------------------------------------
+# Offline replay
+# ---------------------------------------------------------------------
+
+def recorded_samples(asc: AscParser) -> np.ndarray:
+    """``(N, 4)`` ``time, x, y, pupil`` of every trial, binocular data averaged."""
+    frames = []
+    for trial_id in asc.list_trials():
+        df = asc.to_dataframe(trial_id)
+        if df.empty:
+            continue
+        if "x" in df:
+            xyp = df[["x", "y", "pupil"]].to_numpy(float)
+        else:
+            xyp = np.column_stack([df[["x_l", "x_r"]].mean(axis=1), df[["y_l", "y_r"]].mean(axis=1),
+                                   df[["pupil_l", "pupil_r"]].mean(axis=1)])
+        frames.append(np.column_stack([df.index.to_numpy(float), xyp]))
+    if not frames:
+        return np.empty((0, 4))
+    samples = np.concatenate(frames)
+    return samples[np.argsort(samples[:, 0], kind="stable")]
+
+
+def stream(samples: np.ndarray, speed: Optional[float] = 1.0) -> Iterator[np.ndarray]:
+    """Yield samples paced to their timestamps divided by *speed* (``None`` = unpaced)."""
+    if speed is None or not len(samples):
+        yield from samples
+        return
+    wall_start = time.perf_counter()
+    t0 = samples[0, 0]
+    for row in samples:
+        due = (row[0] - t0) / 1000 / speed
+        lag = due - (time.perf_counter() - wall_start)
+        if lag > 0:
+            time.sleep(lag)
+        yield row
+
+
+def replay(asc: AscParser, estimator: Optional[WorkloadEstimator] = None,
+           speed: Optional[float] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Feed a recording through *estimator*.
+
+    Returns the emitted estimates and timing statistics: ``throughput``
+    (samples/s of wall time), mean / 99th-percentile / max ``push`` latency
+    in µs, and for paced replays the mean lag of emissions behind their
+    scheduled wall time in ms.
+    """
+    estimator = estimator or WorkloadEstimator(asc.get_sample_rate() or 1000)
+    samples = recorded_samples(asc)
+    latencies = np.empty(len(samples))
+    rows = []
+    emit_lag = []
+    start = time.perf_counter()
+    t0 = samples[0, 0] if len(samples) else 0.0
+    for k, (t, x, y, p) in enumerate(stream(samples, speed)):
+        before = time.perf_counter_ns()
+        result = estimator.push(t, x, y, p)
+        latencies[k] = (time.perf_counter_ns() - before) / 1000
+        if result is not None:
+            rows.append(result)
+            if speed is not None:
+                emit_lag.append((time.perf_counter() - start) * 1000 - (t - t0) / speed)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "samples": len(samples),
+        "wall_seconds": elapsed,
+        "throughput": len(samples) / elapsed if elapsed > 0 else math.nan,
+        "push_us_mean": float(latencies.mean()) if len(samples) else math.nan,
+        "push_us_p99": float(np.percentile(latencies, 99)) if len(samples) else math.nan,
+        "push_us_max": float(latencies.max()) if len(samples) else math.nan,
+        "emit_lag_ms_mean": float(np.mean(emit_lag)) if emit_lag else math.nan,
+    }
+    return pd.DataFrame(rows), stats
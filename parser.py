@@ -12,6 +12,10 @@ Other tweaks
   sample line.  It no longer stays ``None`` in monocular logs.
 * ``_RE_SAMPLE`` now accepts **tab** characters (`\t`) as delimiters in
   addition to spaces.
+* ``EFIX`` / ``ESACC`` event summaries are kept per trial and exposed via
+  :meth:`AscParser.fixations_to_dataframe` / :meth:`saccades_to_dataframe`.
+* All ``MSG`` lines are kept in ``messages`` so session-wide lookups do not
+  need to re-read the file.
 """
 from __future__ import annotations
 
@@ -21,7 +25,6 @@ from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
 import pandas as pd
-from stimulus import Utils
 
 
 class AscParser:
@@ -41,6 +44,13 @@ class AscParser:
     _RE_SBLINK = re.compile(r"^SBLINK\s+(\w)\s+(\d+)")
     _RE_EBLINK = re.compile(r"^EBLINK\s+(\w)\s+(\d+)\s+(\d+)")
 
+    # End-of-event summaries; missing values are written as "." by EDF2ASC
+    _RE_EFIX = re.compile(r"^EFIX\s+(\w)\s+(\d+)\s+(\d+)\s+\d+\s+(\S+)\s+(\S+)\s+(\S+)")
+    _RE_ESACC = re.compile(
+        r"^ESACC\s+(\w)\s+(\d+)\s+(\d+)\s+\d+"
+        r"\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)"
+    )
+
     # Allow spaces **or tabs**
     _RE_SAMPLE = re.compile(
         r"^(\d+)"                                     # time stamp
@@ -61,6 +71,10 @@ class AscParser:
         self.trials: Dict[str, List[Dict[str, float | int]]] = defaultdict(list)
         self.blinks: Dict[str, List[dict]] = defaultdict(list)
         self.blink_active: Dict[str, Dict[str, bool]] = defaultdict(lambda: {"L": False, "R": False})
+        self.fixations: Dict[str, List[dict]] = defaultdict(list)
+        self.saccades: Dict[str, List[dict]] = defaultdict(list)
+        self.trial_start_times: Dict[str, int] = {}
+        self.messages: List[Tuple[int, str]] = []  # every MSG line, file order
 
         self._parse_file()
 
@@ -91,6 +105,20 @@ class AscParser:
 
         return df.set_index("time")
 
+    def fixations_to_dataframe(self, trial_id: str) -> pd.DataFrame:
+        """EFIX events of *trial_id* (both eyes), ordered by start time."""
+        return self._events_to_dataframe(
+            self.fixations, trial_id, ["eye", "start", "end", "duration", "x", "y", "pupil"]
+        )
+
+    def saccades_to_dataframe(self, trial_id: str) -> pd.DataFrame:
+        """ESACC events of *trial_id* (both eyes), ordered by start time."""
+        return self._events_to_dataframe(
+            self.saccades, trial_id,
+            ["eye", "start", "end", "duration", "x_start", "y_start", "x_end", "y_end",
+             "amplitude", "peak_velocity"],
+        )
+
     def summary(self) -> dict:
         return {
             "file": str(self.filepath),
@@ -125,6 +153,21 @@ class AscParser:
     # ------------------------------------------------------------------
     # Core parser
     # ------------------------------------------------------------------
+    @staticmethod
+    def _to_float(value: str) -> float:
+        try:
+            return float(value)
+        except ValueError:
+            return float("nan")
+
+    def _events_to_dataframe(self, events: Dict[str, List[dict]], trial_id: str,
+                             columns: List[str]) -> pd.DataFrame:
+        if trial_id not in self.trials:
+            raise KeyError(f"Trial '{trial_id}' not found.")
+        df = pd.DataFrame(events.get(trial_id, []), columns=columns)
+        df["duration"] = df["end"] - df["start"] + 1
+        return df.sort_values("start", kind="stable").reset_index(drop=True)
+
     def _parse_file(self) -> None:
         current_trial: Optional[str] = None
 
@@ -134,6 +177,11 @@ class AscParser:
                 if not line:
                     continue
 
+                if line.startswith("MSG"):
+                    parts = line.split(None, 2)
+                    if len(parts) == 3:
+                        self.messages.append((int(parts[1]), parts[2]))
+
                 # meta – once
                 if self.screen_width is None:
                     m = self._RE_DISPLAY.search(line)
@@ -151,6 +199,8 @@ class AscParser:
                 m = self._RE_TRIAL_START.match(line)
                 if m:
                     current_trial = m.group(1)
+                    # TRIALID precedes TRIAL_START – keep the earliest marker
+                    self.trial_start_times.setdefault(current_trial, int(line.split()[1]))
                     continue
 
                 if self._RE_TRIAL_END.match(line):
@@ -176,6 +226,36 @@ class AscParser:
                         self.blink_active[current_trial][eye] = False
                         continue
 
+                    m = self._RE_EFIX.match(line)
+                    if m:
+                        eye, start, end_, x, y, pupil = m.groups()
+                        self.fixations[current_trial].append({
+                            "eye": eye,
+                            "start": int(start),
+                            "end": int(end_),
+                            "x": self._to_float(x),
+                            "y": self._to_float(y),
+                            "pupil": self._to_float(pupil),
+                        })
+                        continue
+
+                    m = self._RE_ESACC.match(line)
+                    if m:
+                        eye, start, end_, *values = m.groups()
+                        sx, sy, ex, ey, ampl, pvel = map(self._to_float, values)
+                        self.saccades[current_trial].append({
+                            "eye": eye,
+                            "start": int(start),
+                            "end": int(end_),
+                            "x_start": sx,
+                            "y_start": sy,
+                            "x_end": ex,
+                            "y_end": ey,
+                            "amplitude": ampl,
+                            "peak_velocity": pvel,
+                        })
+                        continue
+
                 # --------------------------------------------------
                 # sample stream (numeric) – may appear outside trials
                 # --------------------------------------------------
@@ -0,0 +1,32 @@
+import pygame
+from parser import AscParser
+from ..Replay import run_replay
+from ..ReplayScenes import build_scene
+from ..Utils import HEIGHT, WIDTH
+
+# ---------------------------------------------------------------------
+# Pygame initialisation
+# ---------------------------------------------------------------------
+pygame.init()
+screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+pygame.display.set_caption("Digit Identification replay")
+font = pygame.font.SysFont(None, 40)
+
+
+def visualize_abrupt_onset_experiment(asc_data_parsed: AscParser, n_trials: int | None = None,
+                                      speed: float = 1.0):
+    """Play back the digit-identification trials of a recording with gaze overlays.
+
+    Target and distractor positions are rebuilt from ``config_pairs.json``
+    and shown from ``TARGET_DRAWN`` on.
+    """
+    try:
+        trial_ids = [t for t in asc_data_parsed.list_trials() if t.isdigit()]
+        n_trials = n_trials or len(trial_ids)
+        print(f"Visualising {n_trials} trials out of {len(trial_ids)} total trials.")
+        for trial_id in trial_ids[:n_trials]:
+            trial, scene = build_scene(asc_data_parsed, trial_id, "REACTION", font)
+            run_replay(trial, scene, font, speed)
+
+    except SystemExit:
+        pass  # graceful termination
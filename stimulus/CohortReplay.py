@@ -0,0 +1,158 @@
+"""Replay one trial with the gaze of many participants overlaid.
+
+All participants saw the same configured trials, so their recordings of a
+trial share one stimulus timeline once aligned to the ``TRIAL_START``
+message.  Each participant's gaze for the trial is cached as a small
+``.npz`` (relative time, x, y), so replaying a trial for a cohort never
+parses the ``.asc`` files again.
+
+The streams are merged into one sorted key array (participant offset plus
+relative time), and the samples on screen for all participants at a frame
+come from a single ``searchsorted``.  That keeps dozens of streams at the
+display frame rate.
+
+    python -m stimulus.CohortReplay MOT 3 Data/p01/MOT_p01.asc Data/p02/MOT_p02.asc ...
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pygame
+
+from parser import AscParser
+from Analysis.cache import CACHE_ROOT, cache_file
+from Analysis.trial_arrays import gaze_array
+from .Replay import SPEEDS, ReplayTrial, draw_message, run_replay
+from .ReplayScenes import SCENE_TASKS, build_scene
+
+STALE_MS = 50  # a stream without a newer sample for this long is hidden
+POINT_RADIUS = 6
+FONT_SIZE = 40
+
+
+def trial_start(messages: List[tuple], fallback: int) -> int:
+    """Time of the ``TRIAL_START`` message, else *fallback* (the ``TRIALID`` time)."""
+    return next((ts for ts, msg in messages if msg.startswith("TRIAL_START")), fallback)
+
+
+def cached_trial_gaze(asc_file: str | Path, trial_id: str, cache_root: str | Path = CACHE_ROOT,
+                      refresh: bool = False) -> Optional[np.ndarray]:
+    """``(N, 3)`` gaze of one trial, time relative to its start; *None* if not recorded."""
+    path = cache_file("cohort_gaze", asc_file, cache_root=cache_root, trial=trial_id)
+    if path.exists() and not refresh:
+        with np.load(path) as data:
+            return np.column_stack([data["time"], data["xy"]]) if data["time"].ndim else None
+
+    asc = AscParser(asc_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if trial_id not in asc.trials:
+        # recordings without the trial are cached as a 0-d placeholder
+        np.savez_compressed(path, time=np.array(-1), xy=np.array(-1))
+        return None
+    gaze = gaze_array(asc, trial_id)
+    gaze[:, 0] -= trial_start(asc.get_messages(trial_id), asc.trial_start_times[trial_id])
+    np.savez_compressed(path, time=gaze[:, 0].astype(np.int32), xy=gaze[:, 1:].astype(np.float32))
+    return gaze
+
+
+class CohortGaze:
+    """Gaze streams of many participants, looked up together.
+
+    Every stream gets a key offset larger than any trial duration, so one
+    sorted array holds all of them and a single ``searchsorted`` of the
+    shifted query times finds the current sample of every participant.
+    """
+
+    def __init__(self, streams: List[np.ndarray]):
+        streams = [s[np.argsort(s[:, 0], kind="stable")] for s in streams]
+        lengths = np.array([len(s) for s in streams])
+        times = np.concatenate([s[:, 0] for s in streams]) if streams else np.empty(0)
+        self.n_streams = len(streams)
+        self.span = float(np.ptp(times)) + 2 * STALE_MS + 1 if times.size else 1.0
+        self.base = float(times.min()) if times.size else 0.0
+        self.offsets = np.arange(self.n_streams) * self.span
+        self.keys = np.concatenate([s[:, 0] - self.base + o for s, o in zip(streams, self.offsets)]) \
+            if streams else np.empty(0)
+        self.xy = np.concatenate([s[:, 1:] for s in streams]) if streams else np.empty((0, 2))
+        self.stop = np.cumsum(lengths)
+        self.first = self.stop - lengths  # index range of each stream
+        self.start = float(times.min()) if times.size else 0.0
+        self.end = float(times.max()) if times.size else 0.0
+
+    def at(self, t: float) -> np.ndarray:
+        """``(P, 2)`` gaze of every participant at relative time *t*, NaN when absent or stale."""
+        query = t - self.base + self.offsets
+        idx = np.searchsorted(self.keys, query, side="right") - 1
+        valid = (idx >= self.first) & (idx < self.stop) & (query - self.keys[np.maximum(idx, 0)] <= STALE_MS)
+        points = np.full((self.n_streams, 2), np.nan)
+        points[valid] = self.xy[idx[valid]]
+        return points
+
+
+def stream_colors(n: int) -> List[pygame.Color]:
+    """*n* evenly spaced, saturated hues."""
+    colors = []
+    for k in range(n):
+        color = pygame.Color(0)
+        color.hsva = (360 * k / max(n, 1), 90, 100, 100)
+        colors.append(color)
+    return colors
+
+
+def replay_cohort(asc_files: Dict[str, str | Path], trial_id: str, task: str, speed: float = 1.0,
+                  cache_root: str | Path = CACHE_ROOT):
+    """Replay *trial_id* of *task* with every participant's gaze as a coloured dot.
+
+    The scene and the message overlay come from the first recording; the
+    other participants are aligned to it by their ``TRIAL_START`` times.
+    Uses the current display surface, or opens a window of the recording's
+    size.
+    """
+    trial_id = str(trial_id)
+    names, streams = [], []
+    for name, asc_file in asc_files.items():
+        gaze = cached_trial_gaze(asc_file, trial_id, cache_root)
+        if gaze is not None:
+            names.append(name)
+            streams.append(gaze)
+    cohort = CohortGaze(streams)
+    colors = stream_colors(len(streams))
+
+    reference = AscParser(next(iter(asc_files.values())))
+    if pygame.display.get_surface() is None:
+        pygame.init()
+        width, height = reference.get_screen_dims()
+        pygame.display.set_mode((width + 1, height + 1))
+    font = pygame.font.SysFont(None, FONT_SIZE)
+
+    trial, scene = build_scene(reference, trial_id, task, font)
+    origin = trial_start(reference.get_messages(trial_id), reference.trial_start_times[trial_id])
+    # play from the earliest to the latest sample of any participant
+    trial.start = min(trial.start, origin + cohort.start)
+    trial.end = max(trial.end, origin + cohort.end)
+
+    def overlays(surface: pygame.Surface, font: pygame.font.Font, trial: ReplayTrial,
+                 t: float) -> List[pygame.Rect]:
+        rects = [pygame.draw.circle(surface, color, point.astype(int), POINT_RADIUS)
+                 for color, point in zip(colors, cohort.at(t - origin)) if np.isfinite(point).all()]
+        label = font.render(f"trial {trial_id}: {len(names)} participants", True, (255, 255, 255))
+        rects.append(surface.blit(label, label.get_rect(topright=(surface.get_width() - 20, 20))))
+        return rects + draw_message(surface, font, trial, t)
+
+    try:
+        run_replay(trial, scene, font, speed, overlays=overlays, trail_ms=0)
+    except SystemExit:
+        pass  # graceful termination
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Replay one trial with the gaze of many participants.")
+    cli.add_argument("task", choices=SCENE_TASKS)
+    cli.add_argument("trial_id")
+    cli.add_argument("asc_files", nargs="+")
+    cli.add_argument("--speed", type=float, default=1.0, choices=SPEEDS)
+    args = cli.parse_args()
+    replay_cohort({Path(f).stem: f for f in args.asc_files}, args.trial_id, args.task, args.speed)
@@ -0,0 +1,168 @@
+"""One summary image per trial, tiled into a contact sheet per session.
+
+A thumbnail shows the last display of the trial with everything the
+participant did drawn on top:
+
+* the raw gaze path (segments split at missing samples);
+* fixations as discs whose area grows with their duration;
+* left-click positions as red crosses;
+* a label with the trial id, the fixation count and the share of valid
+  gaze samples, for data-quality triage.
+
+Everything is drawn off-screen (SDL dummy driver) with the replay scenes,
+so the cached MOT keyframes and stimulus layers are reused.  Sessions run
+in parallel, one per process.
+
+    python -m stimulus.ContactSheet sheets/ Data/*/MOT_*.asc
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pygame
+
+from parser import AscParser
+from Analysis.features import task_of
+from Analysis.trial_arrays import fixation_array, screen_size, true_runs
+from .ReplayScenes import build_scene, load_search_trials, scene_font, trial_gaze
+
+THUMB_WIDTH = 480
+COLUMNS = 6
+PADDING = 8
+MAX_PATH_POINTS = 4000  # gaze samples per thumbnail path, evenly thinned
+FIXATION_SCALE = 1.5  # disc radius in px per sqrt(ms)
+PATH_COLOR = (0, 200, 255)
+FIXATION_COLOR = (255, 200, 0, 110)
+CLICK_COLOR = (255, 0, 0)
+SHEET_BACKGROUND = (40, 40, 40)
+LABEL_COLOR = (255, 255, 255)
+
+
+def _init_worker():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+
+
+def click_positions(messages) -> np.ndarray:
+    """``(N, 2)`` positions of the ``!LEFT_MOUSE_DOWN`` messages."""
+    clicks = [msg.split()[1:3] for msg in messages if msg.startswith("!LEFT_MOUSE_DOWN")]
+    return np.array(clicks, dtype=float).reshape(-1, 2)
+
+
+def draw_scanpath(surface: pygame.Surface, gaze: np.ndarray, fixations: np.ndarray, clicks: np.ndarray):
+    """Gaze path, duration-scaled fixations and clicks onto a full-resolution *surface*."""
+    xy = gaze[:: max(1, len(gaze) // MAX_PATH_POINTS), 1:]
+    starts, ends = true_runs(np.isfinite(xy).all(axis=1))
+    for lo, hi in zip(starts, ends):
+        if hi - lo > 1:
+            pygame.draw.lines(surface, PATH_COLOR, False, xy[lo:hi].astype(int).tolist(), 2)
+
+    discs = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    for x, y, duration in fixations[:, 2:5]:
+        radius = max(2, int(FIXATION_SCALE * math.sqrt(duration)))
+        pygame.draw.circle(discs, FIXATION_COLOR, (int(x), int(y)), radius)
+    surface.blit(discs, (0, 0))
+
+    for x, y in clicks.astype(int):
+        pygame.draw.line(surface, CLICK_COLOR, (x - 15, y - 15), (x + 15, y + 15), 4)
+        pygame.draw.line(surface, CLICK_COLOR, (x - 15, y + 15), (x + 15, y - 15), 4)
+
+
+def trial_thumbnail(asc: AscParser, trial_id: str, task: str, font: pygame.font.Font,
+                    label_font: pygame.font.Font, width: int = THUMB_WIDTH,
+                    search_trials: Optional[Dict[str, dict]] = None) -> pygame.Surface:
+    """Summary image of one trial, *width* px wide."""
+    trial, scene = build_scene(asc, trial_id, task, font, search_trials)
+    surface = pygame.Surface(screen_size(asc))
+    scene.draw(surface, trial.end)
+
+    gaze, _ = trial_gaze(asc, trial_id)
+    fixations = fixation_array(asc, trial_id)
+    draw_scanpath(surface, gaze, fixations, click_positions(trial.messages.values))
+
+    height = round(surface.get_height() * width / surface.get_width())
+    thumb = pygame.transform.smoothscale(surface, (width, height))
+    valid = np.isfinite(gaze[:, 1:]).all(axis=1).mean() if len(gaze) else 0.0
+    label = label_font.render(f"trial {trial_id}  {len(fixations)} fix  {100 * valid:.0f}% valid", True,
+                              LABEL_COLOR, SHEET_BACKGROUND)
+    thumb.blit(label, (4, 4))
+    return thumb
+
+
+def tile(thumbs: List[pygame.Surface], title: str, font: pygame.font.Font, columns: int = COLUMNS) -> pygame.Surface:
+    """Grid of equally sized thumbnails under a title line."""
+    tw, th = thumbs[0].get_size()
+    columns = min(columns, len(thumbs))
+    rows = math.ceil(len(thumbs) / columns)
+    header = font.get_linesize() + 2 * PADDING
+    sheet = pygame.Surface((columns * (tw + PADDING) + PADDING, header + rows * (th + PADDING)))
+    sheet.fill(SHEET_BACKGROUND)
+    sheet.blit(font.render(title, True, LABEL_COLOR), (PADDING, PADDING))
+    for k, thumb in enumerate(thumbs):
+        row, col = divmod(k, columns)
+        sheet.blit(thumb, (PADDING + col * (tw + PADDING), header + row * (th + PADDING)))
+    return sheet
+
+
+def session_contact_sheet(asc_file: str | Path, out_dir: str | Path, task: Optional[str] = None,
+                          width: int = THUMB_WIDTH, columns: int = COLUMNS,
+                          save_thumbnails: bool = False) -> Optional[Path]:
+    """Write ``<out_dir>/<stem>_sheet.png`` for one recording; *None* if it has no trials."""
+    if not pygame.get_init():
+        _init_worker()
+    task = task or task_of(asc_file)
+    asc = AscParser(asc_file)
+    trial_ids = [t for t in asc.list_trials() if t.isdigit()]
+    if not trial_ids:
+        return None
+
+    font, label_font = scene_font(task), pygame.font.SysFont(None, 24)
+    search_trials = load_search_trials() if task == "SEARCH" else None
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(asc_file).stem
+
+    thumbs = []
+    for trial_id in trial_ids:
+        thumb = trial_thumbnail(asc, trial_id, task, font, label_font, width, search_trials)
+        thumbs.append(thumb)
+        if save_thumbnails:
+            (out_dir / stem).mkdir(exist_ok=True)
+            pygame.image.save(thumb, str(out_dir / stem / f"trial_{trial_id}.png"))
+
+    sheet_path = out_dir / f"{stem}_sheet.png"
+    pygame.image.save(tile(thumbs, f"{stem} ({task}, {len(thumbs)} trials)", pygame.font.SysFont(None, 36), columns),
+                      str(sheet_path))
+    return sheet_path
+
+
+def cohort_contact_sheets(asc_files: List[str | Path], out_dir: str | Path, max_workers: Optional[int] = None,
+                          **kwargs) -> List[Optional[Path]]:
+    """:func:`session_contact_sheet` for many recordings, one session per process."""
+    n = len(asc_files)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        return list(pool.map(_session_sheet, [str(f) for f in asc_files], [str(out_dir)] * n, [kwargs] * n))
+
+
+def _session_sheet(asc_file: str, out_dir: str, kwargs: dict) -> Optional[Path]:
+    return session_contact_sheet(asc_file, out_dir, **kwargs)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Write one contact sheet of trial thumbnails per recording.")
+    cli.add_argument("out_dir")
+    cli.add_argument("asc_files", nargs="+")
+    cli.add_argument("--width", type=int, default=THUMB_WIDTH)
+    cli.add_argument("--columns", type=int, default=COLUMNS)
+    cli.add_argument("--thumbnails", action="store_true", help="also save every thumbnail")
+    cli.add_argument("--workers", type=int)
+    args = cli.parse_args()
+    sheets = cohort_contact_sheets(args.asc_files, args.out_dir, args.workers, width=args.width,
+                                   columns=args.columns, save_thumbnails=args.thumbnails)
+    print("\n".join(str(s) for s in sheets if s is not None))
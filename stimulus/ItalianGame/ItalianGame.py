@@ -5,11 +5,12 @@ import time
 
 import pylink
 
+from EyeTracking.WorkloadEstimator import WorkloadEstimator
 from .config_builder import generate_trials, get_animal, is_time_to_distruct
 
 from . import CommonConsts as Consts
 from .Animal import Animal, Weapon
-from typing import List
+from typing import List, Optional
 from . import AssetLoader as Assets
 from ..Utils import show_explanation_screen, drift_correction, HEIGHT,WIDTH, WHITE, BLACK, RED, BLUE, GREEN, DUMMY_MODE,MOUSE_POS_MSG, DISPLAY_SIZE_MULTIPLIER, DRIFT_CORRECTION_BALL_RADIUS
 
@@ -134,7 +135,8 @@ def prompt_numeric_input(screen, font, question_text, position=(750 * DISPLAY_SI
                     input_text += event.unicode
 
 #####################################################################
-def game_round(trial_index, el_tracker: pylink.EyeLink, beep_distractions: bool = False, visual_distractions: bool = False):
+def game_round(trial_index, el_tracker: pylink.EyeLink, beep_distractions: bool = False, visual_distractions: bool = False,
+               workload: Optional[WorkloadEstimator] = None):
 
     take_image = False
     draw_red_circle_time = None
@@ -223,6 +225,10 @@ def game_round(trial_index, el_tracker: pylink.EyeLink, beep_distractions: bool
         mouse_x, mouse_y = pygame.mouse.get_pos()
         el_tracker.sendMessage(f"{MOUSE_POS_MSG} {mouse_x} {mouse_y}")
 
+        # Online workload estimate from the link samples (logs WORKLOAD messages)
+        if workload is not None:
+            workload.poll_link(el_tracker)
+
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -361,7 +367,13 @@ def game_round(trial_index, el_tracker: pylink.EyeLink, beep_distractions: bool
              beep_count if beep_distractions else (visual_count if visual_distractions else 0), answer)
 
 
-def main_italian_game_experiment():
+def main_italian_game_experiment(online_workload: bool = False):
+    """Run the three game rounds; returns the performance of each.
+
+    With *online_workload* every round also runs a :class:`WorkloadEstimator`
+    on the link samples, which writes ``WORKLOAD`` messages into the EDF.
+    Off by default so the recording protocol stays unchanged.
+    """
 
     performance = []
 
@@ -371,19 +383,19 @@ def main_italian_game_experiment():
     show_explanation_screen(Assets.instruction_images[0:4])
     game_drift_correction(el_tracker)
 
-    performance.append(game_round(0, el_tracker))
+    performance.append(game_round(0, el_tracker, workload=WorkloadEstimator() if online_workload else None))
     pylink.pumpDelay(100)
     el_tracker.stopRecording()
 
     show_explanation_screen(Assets.instruction_images[4:5])
     game_drift_correction(el_tracker)
-    performance.append(game_round(1, el_tracker, beep_distractions= True))
+    performance.append(game_round(1, el_tracker, beep_distractions= True, workload=WorkloadEstimator() if online_workload else None))
     pylink.pumpDelay(100)
     el_tracker.stopRecording()
 
     show_explanation_screen(Assets.instruction_images[5:6])
     game_drift_correction(el_tracker)
-    performance.append(game_round(2, el_tracker, visual_distractions=True))
+    performance.append(game_round(2, el_tracker, visual_distractions=True, workload=WorkloadEstimator() if online_workload else None))
     pylink.pumpDelay(100)
     el_tracker.stopRecording()
     el_tracker.setOfflineMode()
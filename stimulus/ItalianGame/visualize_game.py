@@ -0,0 +1,32 @@
+import pygame
+from parser import AscParser
+from ..Replay import run_replay
+from ..ReplayScenes import build_scene
+from ..Utils import HEIGHT, WIDTH
+
+# ---------------------------------------------------------------------
+# Pygame initialisation
+# ---------------------------------------------------------------------
+pygame.init()
+screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+pygame.display.set_caption("Italian Game replay")
+font = pygame.font.SysFont(None, 40)
+
+
+def visualize_game_experiment(asc_data_parsed: AscParser, n_trials: int | None = None, speed: float = 1.0):
+    """Play back the game rounds of a recording with gaze and mouse overlays.
+
+    Animal positions are resolved from the cached spline tracks at the
+    replay time (see :class:`stimulus.ReplayScenes.GameScene`), so seeking
+    and 0.25x-16x playback work like in the MOT viewer.
+    """
+    try:
+        trial_ids = [t for t in asc_data_parsed.list_trials() if t.isdigit()]
+        n_trials = n_trials or len(trial_ids)
+        print(f"Visualising {n_trials} rounds out of {len(trial_ids)} total rounds.")
+        for trial_id in trial_ids[:n_trials]:
+            trial, scene = build_scene(asc_data_parsed, trial_id, "GAME", font)
+            run_replay(trial, scene, font, speed)
+
+    except SystemExit:
+        pass  # graceful termination
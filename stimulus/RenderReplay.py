@@ -0,0 +1,179 @@
+"""Headless rendering of recorded sessions to image sequences or video.
+
+Every trial is sampled at ``fps`` frames per second of recording time and
+drawn with the replay scenes onto an off-screen surface (SDL dummy video
+driver), so no display is needed.  The frames of all trials are split
+into jobs of ``FRAMES_PER_JOB`` that a process pool renders independently;
+each worker parses the recording once and keeps the scenes it built.
+
+Images go to ``<out>/trial_<id>/frame_<n>.png``.  Video needs an ``ffmpeg``
+executable: every job encodes one segment and the segments are joined per
+trial into ``<out>/trial_<id>.mp4`` without re-encoding.
+
+    python -m stimulus.RenderReplay Data/MOT_roi.asc renders/ --video
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+from parser import AscParser
+from Analysis.features import task_of
+from Analysis.mot_objects import mot_keyframes
+from Analysis.trial_arrays import screen_size
+from .Replay import GazeTrail, ReplayTrial, draw_overlays
+from .ReplayScenes import SCENE_TASKS, build_scene, load_search_trials, scene_font, trial_gaze
+
+RENDER_FPS = 30
+FRAMES_PER_JOB = 300
+OVERLAY_FONT_SIZE = 40
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+
+
+def _fonts(task: str) -> Tuple[pygame.font.Font, pygame.font.Font]:
+    """Scene and overlay fonts, as in the experiment."""
+    if "fonts" not in _worker_state:
+        _worker_state["fonts"] = scene_font(task), pygame.font.SysFont(None, OVERLAY_FONT_SIZE)
+    return _worker_state["fonts"]
+
+
+def _scene(asc_file: str, task: str, trial_id: str):
+    if _worker_state.get("asc_file") != asc_file:
+        _worker_state.clear()
+        _worker_state["asc_file"] = asc_file
+        _worker_state["asc"] = AscParser(asc_file)
+        _worker_state["scenes"] = {}
+    scenes = _worker_state["scenes"]
+    if trial_id not in scenes:
+        search_trials = load_search_trials() if task == "SEARCH" else None
+        scenes[trial_id] = build_scene(_worker_state["asc"], trial_id, task, _fonts(task)[0], search_trials)
+    return _worker_state["asc"], scenes[trial_id]
+
+
+def trial_frames(asc: AscParser, fps: int = RENDER_FPS) -> Dict[str, Tuple[float, int]]:
+    """Start time and number of frames of every task trial."""
+    frames = {}
+    for trial_id in asc.list_trials():
+        if not trial_id.isdigit():
+            continue
+        gaze_left, _ = trial_gaze(asc, trial_id)
+        trial = ReplayTrial(gaze_left, None, asc.get_messages(trial_id))
+        frames[trial_id] = trial.start, int(math.floor((trial.end - trial.start) * fps / 1000)) + 1
+    return frames
+
+
+def _encoder(path: Path, size: Tuple[int, int], fps: int) -> subprocess.Popen:
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+           "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+           "-c:v", "libx264", "-pix_fmt", "yuv420p", str(path)]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+
+def render_job(asc_file: str, task: str, trial_id: str, first: int, stop: int, out_dir: str,
+               fps: int, scale: float, video: bool) -> int:
+    """Render frames ``first..stop-1`` of one trial; returns the number of frames written."""
+    asc, (trial, scene) = _scene(asc_file, task, trial_id)
+    _, overlay_font = _fonts(task)
+    surface = pygame.Surface(screen_size(asc))
+    trail = GazeTrail(trial, surface.get_size())
+    size = (round(surface.get_width() * scale), round(surface.get_height() * scale))
+    out_dir = Path(out_dir)
+
+    encoder = None
+    if video:
+        encoder = _encoder(out_dir / f"trial_{trial_id}_{first:07d}.mp4", size, fps)
+    else:
+        (out_dir / f"trial_{trial_id}").mkdir(parents=True, exist_ok=True)
+
+    for k in range(first, stop):
+        t = trial.start + k * 1000 / fps
+        scene.draw(surface, t)
+        trail.draw(surface, t)
+        draw_overlays(surface, overlay_font, trial, t)
+        frame = surface if scale == 1 else pygame.transform.smoothscale(surface, size)
+        if encoder is not None:
+            encoder.stdin.write(pygame.image.tobytes(frame, "RGB"))
+        else:
+            pygame.image.save(frame, str(out_dir / f"trial_{trial_id}" / f"frame_{k:06d}.png"))
+
+    if encoder is not None:
+        encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed on trial {trial_id} frames {first}-{stop}.")
+    return stop - first
+
+
+def _join_segments(out_dir: Path, trial_id: str, firsts: List[int]):
+    segments = [out_dir / f"trial_{trial_id}_{first:07d}.mp4" for first in firsts]
+    listing = out_dir / f"trial_{trial_id}_segments.txt"
+    listing.write_text("".join(f"file '{s.name}'\n" for s in segments))
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", listing.name,
+                    "-c", "copy", f"trial_{trial_id}.mp4"], cwd=out_dir, check=True)
+    listing.unlink()
+    for segment in segments:
+        segment.unlink()
+
+
+def render_session(asc_file: str | Path, out_dir: str | Path, task: Optional[str] = None,
+                   trial_ids: Optional[List[str]] = None, fps: int = RENDER_FPS, scale: float = 1.0,
+                   video: bool = False, frames_per_job: int = FRAMES_PER_JOB,
+                   max_workers: Optional[int] = None) -> int:
+    """Render the trials of a recording headlessly; returns the total number of frames.
+
+    *task* defaults to the one in the file name (see
+    :data:`~stimulus.ReplayScenes.SCENE_TASKS`).  *scale* resizes the frames, e.g. 0.5 for half-resolution
+    review videos.
+    """
+    task = task or task_of(asc_file)
+    if video and shutil.which("ffmpeg") is None:
+        raise RuntimeError("Video output needs an ffmpeg executable on PATH; render images instead.")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    asc = AscParser(asc_file)
+    frames = trial_frames(asc, fps)
+    trial_ids = list(frames) if trial_ids is None else [str(t) for t in trial_ids]
+    if task == "MOT":
+        for trial_id in trial_ids:
+            mot_keyframes(asc, trial_id)  # build the cache once, before the workers read it
+    jobs = [(str(asc_file), task, trial_id, first, min(first + frames_per_job, frames[trial_id][1]),
+             str(out_dir), fps, scale, video)
+            for trial_id in trial_ids for first in range(0, frames[trial_id][1], frames_per_job)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        written = sum(pool.map(render_job, *zip(*jobs))) if jobs else 0
+
+    if video:
+        for trial_id in trial_ids:
+            _join_segments(out_dir, trial_id, list(range(0, frames[trial_id][1], frames_per_job)))
+    return written
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Render recorded trials to PNG sequences or video, headless.")
+    cli.add_argument("asc_file")
+    cli.add_argument("out_dir")
+    cli.add_argument("--task", choices=SCENE_TASKS)
+    cli.add_argument("--trials", nargs="*")
+    cli.add_argument("--fps", type=int, default=RENDER_FPS)
+    cli.add_argument("--scale", type=float, default=1.0)
+    cli.add_argument("--video", action="store_true")
+    cli.add_argument("--workers", type=int)
+    args = cli.parse_args()
+    n = render_session(args.asc_file, args.out_dir, args.task, args.trials, args.fps, args.scale,
+                       args.video, max_workers=args.workers)
+    print(f"Rendered {n} frames to {args.out_dir}")
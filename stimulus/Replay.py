@@ -0,0 +1,485 @@
+"""Timestamp-driven playback of recorded trials.
+
+The viewers resolve what was on screen at an EyeLink timestamp instead of
+advancing one step per rendered frame, so playback does not depend on the
+viewer machine's frame rate and any moment of a trial can be shown:
+
+* :class:`TimeIndex` – sorted samples (gaze, mouse, object states) with the
+  state at time *t* found by binary search;
+* :class:`MessageIndex` – the trial's EyeLink messages, for the message
+  overlay and jumping between messages;
+* :class:`ReplayClock` – recording time advanced by wall-clock time times
+  the playback speed, with pause, seek and frame stepping;
+* :class:`GazeTrail` – fading trail of the recent gaze and fixations, kept
+  in fixed-size :class:`RingBuffer` histories;
+* :class:`DirtyRects` – display regions touched by the moving items, so a
+  frame only updates those instead of flipping the whole screen;
+* :func:`run_replay` – the event/draw loop shared by the task viewers.
+
+Keys during playback: ``Space`` pause, ``Left``/``Right`` seek one second
+(one frame while paused), ``Up``/``Down`` speed, ``PageUp``/``PageDown``
+previous/next message, ``Home``/``End`` trial start/end, ``Enter`` next
+trial, ``Esc`` quit.
+
+Importing this module does not open a window.
+"""
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+from Analysis.task_constants import MOUSE_POS_MSG
+from Analysis.trial_arrays import mouse_array
+
+SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+FRAME_MS = 1000 / 30  # one experiment frame
+SEEK_MS = 1000
+MESSAGE_HOLD_MS = 1000  # how long a message stays on screen (recording time)
+VIEWER_FPS = 60
+TRAIL_MS = 500  # gaze history shown behind the current point
+TRAIL_LEVELS = 8  # fade steps of the trail
+TRAIL_WIDTH = 3
+FIXATION_COUNT = 5  # recent fixations shown
+FIXATION_HOLD_MS = 2000  # how long a fixation stays on screen after it ended
+FIXATION_SCALE = 1.0  # disc radius in px per sqrt(ms)
+
+LEFT_EYE_COLOR = (0, 255, 0)
+RIGHT_EYE_COLOR = (0, 0, 255)
+MOUSE_COLOR = (255, 255, 0)
+TEXT_COLOR = (0, 255, 0)
+FIXATION_COLOR = (255, 128, 0)
+
+
+class TimeIndex:
+    """Time-stamped rows; the state at *t* is the last row at or before *t*."""
+
+    def __init__(self, times: np.ndarray, values: np.ndarray):
+        times = np.asarray(times, dtype=float)
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.values = np.asarray(values)[order]
+
+    def __len__(self) -> int:
+        return self.times.size
+
+    def index(self, t: float) -> int:
+        """Row on screen at *t*, -1 before the first one."""
+        return int(np.searchsorted(self.times, t, side="right")) - 1
+
+    def at(self, t: float):
+        i = self.index(t)
+        return self.values[i] if i >= 0 else None
+
+    def span(self, t0: float, t1: float) -> slice:
+        """Rows with ``t0 < time <= t1``."""
+        lo, hi = np.searchsorted(self.times, (t0, t1), side="right")
+        return slice(int(lo), int(hi))
+
+    def window(self, t0: float, t1: float) -> np.ndarray:
+        return self.values[self.span(t0, t1)]
+
+
+class MessageIndex(TimeIndex):
+    """EyeLink messages of a trial, ``(time, text)``."""
+
+    def __init__(self, messages: List[Tuple[int, str]]):
+        super().__init__([ts for ts, _ in messages], np.array([msg for _, msg in messages], dtype=object))
+
+    def latest(self, t: float, hold_ms: float = MESSAGE_HOLD_MS) -> Optional[str]:
+        """Message sent within *hold_ms* before *t*, if any."""
+        i = self.index(t)
+        if i < 0 or t - self.times[i] >= hold_ms:
+            return None
+        return self.values[i]
+
+    def first(self, prefix: str) -> Optional[float]:
+        """Time of the first message starting with *prefix*."""
+        for ts, msg in zip(self.times, self.values):
+            if msg.startswith(prefix):
+                return float(ts)
+        return None
+
+    def next_time(self, t: float) -> Optional[float]:
+        i = int(np.searchsorted(self.times, t, side="right"))
+        return float(self.times[i]) if i < len(self) else None
+
+    def previous_time(self, t: float) -> Optional[float]:
+        i = int(np.searchsorted(self.times, t, side="left")) - 1
+        return float(self.times[i]) if i >= 0 else None
+
+
+class ReplayTrial:
+    """Indexes of one recorded trial.
+
+    Parameters
+    ----------
+    gaze_left : (N, 3) ndarray
+        Columns ``time, x, y`` in EyeLink time for the left (or only) eye.
+    gaze_right : (N, 3) ndarray | None
+        Same for the right eye; *None* for monocular recordings.
+    messages : list[(time, msg)]
+        EyeLink messages of the trial; ``!MOUSE_POS`` ones become the mouse
+        track, the rest the message overlay.
+    fixations : (N, 5) ndarray, optional
+        ``start, end, x, y, duration`` as from
+        :func:`Analysis.trial_arrays.fixation_array`, indexed by their end.
+    """
+
+    def __init__(self, gaze_left: np.ndarray, gaze_right: Optional[np.ndarray],
+                 messages: List[Tuple[int, str]], fixations: Optional[np.ndarray] = None):
+        self.gaze_left = TimeIndex(gaze_left[:, 0], gaze_left[:, 1:])
+        self.gaze_right = TimeIndex(gaze_right[:, 0], gaze_right[:, 1:]) if gaze_right is not None else None
+        mouse = mouse_array(messages)
+        self.mouse = TimeIndex(mouse[:, 0], mouse[:, 1:])
+        self.messages = MessageIndex([(ts, msg) for ts, msg in messages if not msg.startswith(MOUSE_POS_MSG)])
+        fixations = np.empty((0, 5)) if fixations is None else fixations
+        self.fixations = TimeIndex(fixations[:, 1], fixations[:, 2:5])
+
+        bounds = [index.times[[0, -1]] for index in (self.gaze_left, self.messages) if len(index)]
+        bounds = np.concatenate(bounds) if bounds else np.zeros(1)
+        self.start = float(bounds.min())
+        self.end = float(bounds.max())
+
+
+class ReplayClock:
+    """Recording time driven by the wall clock.
+
+    :meth:`update` advances the time by the elapsed wall time multiplied by
+    the playback speed, so the replay runs at the same pace whatever the
+    viewer's frame rate.
+    """
+
+    def __init__(self, start: float, end: float, speed: float = 1.0, frame_ms: float = FRAME_MS):
+        self.start = start
+        self.end = end
+        self.frame_ms = frame_ms
+        self.time = start
+        self.paused = False
+        if speed not in SPEEDS:
+            raise ValueError(f"Unsupported replay speed {speed}; choose one of {', '.join(map(str, SPEEDS))}")
+        self._speed = SPEEDS.index(speed)
+        self._wall = time.perf_counter()
+
+    @property
+    def speed(self) -> float:
+        return SPEEDS[self._speed]
+
+    @property
+    def finished(self) -> bool:
+        return not self.paused and self.time >= self.end
+
+    def update(self) -> float:
+        now = time.perf_counter()
+        if not self.paused:
+            self.seek(self.time + (now - self._wall) * 1000 * self.speed)
+        self._wall = now
+        return self.time
+
+    def seek(self, t: float):
+        self.time = min(max(t, self.start), self.end)
+
+    def step(self, frames: int = 1):
+        """Pause and move by whole experiment frames."""
+        self.paused = True
+        self.seek(self.time + frames * self.frame_ms)
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self._wall = time.perf_counter()
+
+    def faster(self):
+        self._speed = min(self._speed + 1, len(SPEEDS) - 1)
+
+    def slower(self):
+        self._speed = max(self._speed - 1, 0)
+
+
+def handle_replay_keys(events, clock: ReplayClock, messages: MessageIndex) -> bool:
+    """Apply the playback keys; True when the viewer should move to the next trial."""
+    for event in events:
+        if event.type == pygame.QUIT:
+            raise SystemExit("Experiment terminated by user.")
+        if event.type != pygame.KEYDOWN:
+            continue
+        if event.key == pygame.K_ESCAPE:
+            raise SystemExit("Experiment terminated by user.")
+        elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            return True
+        elif event.key == pygame.K_SPACE:
+            clock.toggle_pause()
+        elif event.key in (pygame.K_RIGHT, pygame.K_LEFT):
+            sign = 1 if event.key == pygame.K_RIGHT else -1
+            if clock.paused:
+                clock.step(sign)
+            else:
+                clock.seek(clock.time + sign * SEEK_MS)
+        elif event.key == pygame.K_UP:
+            clock.faster()
+        elif event.key == pygame.K_DOWN:
+            clock.slower()
+        elif event.key == pygame.K_PAGEDOWN:
+            target = messages.next_time(clock.time)
+            if target is not None:
+                clock.seek(target)
+        elif event.key == pygame.K_PAGEUP:
+            target = messages.previous_time(clock.time)
+            if target is not None:
+                clock.seek(target)
+        elif event.key == pygame.K_HOME:
+            clock.seek(clock.start)
+        elif event.key == pygame.K_END:
+            clock.seek(clock.end)
+    return False
+
+
+def _draw_gaze(surface: pygame.Surface, index: Optional[TimeIndex], t: float, color) -> List[pygame.Rect]:
+    point = index.at(t) if index is not None else None
+    if point is not None and np.isfinite(point).all():
+        return [pygame.draw.circle(surface, color, point.astype(int), 8, 2)]
+    return []
+
+
+def draw_overlays(surface: pygame.Surface, font: pygame.font.Font, trial: ReplayTrial,
+                  t: float) -> List[pygame.Rect]:
+    """Gaze of both eyes, mouse crosshair and the latest message; returns the rectangles drawn."""
+    rects = _draw_gaze(surface, trial.gaze_left, t, LEFT_EYE_COLOR)
+    rects += _draw_gaze(surface, trial.gaze_right, t, RIGHT_EYE_COLOR)
+
+    mouse = trial.mouse.at(t)
+    if mouse is not None:
+        mx, my = mouse.astype(int)
+        rects.append(pygame.draw.line(surface, MOUSE_COLOR, (mx - 10, my), (mx + 10, my), 2))
+        rects.append(pygame.draw.line(surface, MOUSE_COLOR, (mx, my - 10), (mx, my + 10), 2))
+
+    return rects + draw_message(surface, font, trial, t)
+
+
+def draw_message(surface: pygame.Surface, font: pygame.font.Font, trial: ReplayTrial,
+                 t: float) -> List[pygame.Rect]:
+    """The message sent within ``MESSAGE_HOLD_MS`` before *t*, top left."""
+    message = trial.messages.latest(t)
+    if message:
+        return [surface.blit(font.render(message, True, TEXT_COLOR), (20, 20))]
+    return []
+
+
+def draw_status(surface: pygame.Surface, font: pygame.font.Font, clock: ReplayClock) -> pygame.Rect:
+    status = f"{clock.time - clock.start:8.0f} ms  x{clock.speed:g}" + ("  paused" if clock.paused else "")
+    text = font.render(status, True, TEXT_COLOR)
+    return surface.blit(text, text.get_rect(bottomleft=(20, surface.get_height() - 20)))
+
+
+class RingBuffer:
+    """Fixed-capacity history of time-stamped rows; the oldest rows are overwritten.
+
+    All arrays are allocated once, :meth:`ordered` copies the rows into a
+    scratch buffer in time order.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.times = np.empty(capacity)
+        self.values = np.empty((capacity, width))
+        self._times = np.empty(capacity)
+        self._values = np.empty((capacity, width))
+        self.head = 0  # next row to write
+        self.size = 0
+
+    def clear(self):
+        self.head = self.size = 0
+
+    def extend(self, times: np.ndarray, values: np.ndarray):
+        n = min(len(times), self.capacity)
+        times, values = times[len(times) - n:], values[len(values) - n:]
+        first = min(n, self.capacity - self.head)
+        self.times[self.head:self.head + first] = times[:first]
+        self.values[self.head:self.head + first] = values[:first]
+        self.times[:n - first] = times[first:]
+        self.values[:n - first] = values[first:]
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Times and rows, oldest first (views of the scratch buffers)."""
+        start = (self.head - self.size) % self.capacity
+        if start + self.size <= self.capacity:
+            return self.times[start:start + self.size], self.values[start:start + self.size]
+        older = self.capacity - start
+        self._times[:older], self._times[older:self.size] = self.times[start:], self.times[:self.head]
+        self._values[:older], self._values[older:self.size] = self.values[start:], self.values[:self.head]
+        return self._times[:self.size], self._values[:self.size]
+
+
+class GazeTrail:
+    """Fading gaze trail of the last *trail_ms* and the recent fixations.
+
+    The samples of each eye and the last ``FIXATION_COUNT`` fixations are
+    kept in :class:`RingBuffer` histories that are appended to as the replay
+    advances (and refilled after a seek).  The trail is drawn into one
+    pre-allocated alpha surface: only its bounding rectangle is cleared and
+    redrawn each frame, and every fade level is a single ``lines`` call, so
+    the cost hardly grows with the trail length.  The fade offsets and
+    colours are computed once and the validity mask reuses scratch buffers,
+    so a frame allocates no per-sample arrays.
+    """
+
+    def __init__(self, trial: ReplayTrial, size: Tuple[int, int], trail_ms: float = TRAIL_MS):
+        self.trail_ms = trail_ms
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.rect: Optional[pygame.Rect] = None
+        self.last_t: Optional[float] = None
+        times = trial.gaze_left.times[:1000]
+        step = float(np.median(np.diff(times))) if times.size > 1 else 1.0
+        capacity = int(np.ceil(trail_ms / max(step, 1e-3))) + 1
+        eyes = [(trial.gaze_left, LEFT_EYE_COLOR), (trial.gaze_right, RIGHT_EYE_COLOR)]
+        # one RGBA per fade level, oldest (faintest) first
+        self.eyes = [(index, RingBuffer(capacity, 2), [(*color, 255 * (level + 1) // TRAIL_LEVELS)
+                                                       for level in range(TRAIL_LEVELS)])
+                     for index, color in eyes if index is not None]
+        self.fixation_index = trial.fixations
+        self.fixations = RingBuffer(FIXATION_COUNT, 3)
+        # level k + 1 starts fade_ms[k] before t
+        self.fade_ms = [trail_ms * (1 - level / TRAIL_LEVELS) for level in range(1, TRAIL_LEVELS)]
+        self._finite = np.empty((capacity, 2), dtype=bool)
+        self._valid = np.empty(capacity, dtype=bool)
+        self._invalid = np.empty(capacity, dtype=bool)
+
+    def _advance(self, t: float):
+        hold = max(self.trail_ms, FIXATION_HOLD_MS)
+        refill = self.last_t is None or t < self.last_t or t - self.last_t > hold
+        histories = [(index, ring) for index, ring, _ in self.eyes] + [(self.fixation_index, self.fixations)]
+        for index, ring in histories:
+            if refill:
+                ring.clear()
+            rows = index.span(t - hold if refill else self.last_t, t)
+            ring.extend(index.times[rows], index.values[rows])
+        self.last_t = t
+
+    def _grow(self, rect: pygame.Rect):
+        if self.rect is None:
+            self.rect = rect
+        else:
+            self.rect.union_ip(rect)
+
+    def _draw_fixations(self, t: float):
+        times, fixations = self.fixations.ordered()
+        for end, (x, y, duration) in zip(times, fixations):
+            age = t - end
+            if 0 <= age <= FIXATION_HOLD_MS:
+                alpha = int(120 * (1 - age / FIXATION_HOLD_MS))
+                radius = max(2, int(FIXATION_SCALE * np.sqrt(duration)))
+                self._grow(pygame.draw.circle(self.surface, (*FIXATION_COLOR, alpha), (int(x), int(y)), radius))
+
+    def _draw_trail(self, ring: RingBuffer, colors: List[Tuple[int, int, int, int]], t: float):
+        times, xy = ring.ordered()
+        lo = int(np.searchsorted(times, t - self.trail_ms, side="right"))
+        hi = int(np.searchsorted(times, t, side="right"))
+        n = hi - lo
+        times, xy = times[lo:hi], xy[lo:hi]
+        finite, valid, invalid = self._finite[:n], self._valid[:n], self._invalid[:n]
+        np.isfinite(xy, out=finite)
+        np.logical_and(finite[:, 0], finite[:, 1], out=valid)
+        np.logical_not(valid, out=invalid)
+        first = 0
+        for level in range(TRAIL_LEVELS):
+            end = int(np.searchsorted(times, t - self.fade_ms[level])) if level + 1 < TRAIL_LEVELS else n
+            # each level runs into the first sample of the next one, so the trail has no gaps
+            a, stop = first, min(end + 1, n)
+            while a < stop:
+                a += int(valid[a:stop].argmax())
+                if not valid[a]:
+                    break
+                gap = int(invalid[a:stop].argmax())
+                b = a + gap if gap else stop
+                if b - a > 1:
+                    self._grow(pygame.draw.lines(self.surface, colors[level], False, xy[a:b], TRAIL_WIDTH))
+                a = b
+            first = end
+
+    def draw(self, surface: pygame.Surface, t: float) -> List[pygame.Rect]:
+        """Trail and fixations at *t* onto *surface*; returns the rectangle drawn, if any."""
+        self._advance(t)
+        if self.rect is not None:
+            self.surface.fill((0, 0, 0, 0), self.rect)
+            self.rect = None
+        self._draw_fixations(t)
+        for _, ring, colors in self.eyes:
+            self._draw_trail(ring, colors, t)
+        if self.rect is None:
+            return []
+        return [surface.blit(self.surface, self.rect, self.rect)]
+
+
+class DirtyRects:
+    """Partial display updates for a static layer with moving items on top.
+
+    Each frame, :meth:`begin` erases the previous frame's items by copying
+    their rectangles back from the layer, and :meth:`present` pushes only
+    those rectangles and the newly drawn ones to the display.  A different
+    layer (the static display changed, e.g. at an onset) is blitted and
+    flipped whole.
+    """
+
+    def __init__(self, surface: pygame.Surface):
+        self.surface = surface
+        self.layer: Optional[pygame.Surface] = None
+        self.previous: Optional[List[pygame.Rect]] = None  # None: the whole display is dirty
+
+    def invalidate(self):
+        """Redraw everything on the next frame, e.g. after the window was exposed."""
+        self.layer = None
+
+    def begin(self, layer: pygame.Surface):
+        if layer is not self.layer:
+            self.surface.blit(layer, (0, 0))
+            self.layer = layer
+            self.previous = None
+        else:
+            for rect in self.previous:
+                self.surface.blit(layer, rect, rect)
+
+    def present(self, rects: List[pygame.Rect]):
+        if self.previous is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + rects)
+        self.previous = rects
+
+
+def run_replay(trial: ReplayTrial, scene, font: pygame.font.Font, speed: float = 1.0,
+               fps: int = VIEWER_FPS, overlays=draw_overlays, trail_ms: float = TRAIL_MS):
+    """Play *trial* until its end (or ``Enter``) on the display surface.
+
+    *scene* is one of :mod:`stimulus.ReplayScenes`: every frame its cached
+    ``layer(size, t)`` is the background, and ``draw_moving(surface, t)``,
+    the :class:`GazeTrail` of the last *trail_ms* (0 to hide it),
+    ``overlays(surface, font, trial, t)`` and the status line draw on top,
+    each returning the rectangles they touched.  Only those are updated on
+    the display (see :class:`DirtyRects`).  ``fps=0`` does not cap the
+    frame rate.
+    """
+    clock = ReplayClock(trial.start, trial.end, speed)
+    ticker = pygame.time.Clock()
+    surface = pygame.display.get_surface()
+    dirty = DirtyRects(surface)
+    trail = GazeTrail(trial, surface.get_size(), trail_ms) if trail_ms > 0 else None
+    while True:
+        events = pygame.event.get()
+        if any(event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) for event in events):
+            dirty.invalidate()
+        if handle_replay_keys(events, clock, trial.messages):
+            return
+        t = clock.update()
+        dirty.begin(scene.layer(surface.get_size(), t))
+        rects = scene.draw_moving(surface, t)
+        if trail is not None:
+            rects += trail.draw(surface, t)
+        rects += overlays(surface, font, trial, t)
+        rects.append(draw_status(surface, font, clock))
+        dirty.present(rects)
+        if clock.finished:
+            return
+        ticker.tick(fps)
@@ -0,0 +1,299 @@
+"""Task scenes for :mod:`stimulus.Replay`, drawable onto any surface.
+
+A scene draws what the task showed at a recording timestamp.  The
+interactive viewers draw it onto the display and the headless renderer
+onto an off-screen surface.  Like :mod:`stimulus.Replay`, this module
+does not open a window on import.
+
+Every scene is a :class:`LayeredScene`: a cached layer for what stays put
+and the moving items drawn on top.  The viewers use that split to update
+only the changed display regions.
+"""
+from __future__ import annotations
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pygame
+
+from parser import AscParser
+from Analysis.game_trajectories import GameTimeline, reconstruct_trial
+from Analysis.mot_objects import MotKeyframes, MotTimeline, mot_keyframes
+from Analysis.saccade_latency import stimulus_layout
+from Analysis.task_constants import (
+    ANIMALS_CIRCLE_RADIUS,
+    BALL_RADIUS,
+    DISPLAY_SIZE_MULTIPLIER,
+    DISTRACTOR_OFFSETS,
+    FIXATION_SIZE,
+    GAME_BACKGROUND_PATH,
+    HOME_BASE_BOUNDARY_RADIUS,
+    HOUSE_IMAGE_PATH,
+    HOUSE_IMAGE_SIZE,
+    LETTER_FONT_SIZE,
+    REACTION_BACKGROUND,
+    REACTION_LETTER_COLOR,
+    RED_CIRCLE_DURATION,
+    RED_CIRCLE_RADIUS,
+    SEARCH_FONT_SIZE,
+    SEARCH_TRIALS_PATHS,
+    WEAPON_RANGES,
+)
+from Analysis.trial_arrays import fixation_array, screen_size
+from .Replay import MessageIndex, ReplayTrial, TimeIndex
+
+WHITE, RED, GREEN, BLACK = (255, 255, 255), (255, 0, 0), (0, 255, 0), (0, 0, 0)
+BLUE = (0, 0, 255)
+SEARCH_COLORS = {"WHITE": WHITE, "RED": RED, "GREEN": GREEN, "BLACK": BLACK, "BLUE": BLUE}
+DISTRACTOR_LETTER = "7"  # AbruptOnset phase-two distractor
+
+
+def trial_gaze(asc: AscParser, trial_id: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Left (or mono) and right gaze of a trial as ``time, x, y`` arrays in EyeLink time."""
+    df = asc.to_dataframe(trial_id)
+    time_ms = df.index.to_numpy(dtype=float)
+    if {"x_l", "y_l"}.issubset(df.columns):
+        return (np.column_stack([time_ms, df[["x_l", "y_l"]].to_numpy(float)]),
+                np.column_stack([time_ms, df[["x_r", "y_r"]].to_numpy(float)]))
+    return np.column_stack([time_ms, df[["x", "y"]].to_numpy(float)]), None
+
+
+class LayeredScene:
+    """Scene drawn as a cached full-screen layer plus moving items.
+
+    :meth:`layer` returns the same surface for as long as the static part
+    of the display does not change; :meth:`draw_moving` draws the rest and
+    returns the rectangles it touched.
+    """
+
+    def layer(self, size: Tuple[int, int], t: float) -> pygame.Surface:
+        raise NotImplementedError
+
+    def draw_moving(self, surface: pygame.Surface, t: float) -> List[pygame.Rect]:
+        return []
+
+    def draw(self, surface: pygame.Surface, t: float):
+        surface.blit(self.layer(surface.get_size(), t), (0, 0))
+        self.draw_moving(surface, t)
+
+
+def _new_layer(size: Tuple[int, int], color) -> pygame.Surface:
+    layer = pygame.Surface(size)
+    if pygame.display.get_surface() is not None:
+        layer = layer.convert()  # match the display format for fast blits
+    layer.fill(color)
+    return layer
+
+
+class MotScene(LayeredScene):
+    """MOT dots from a reconstructed :class:`MotTimeline` or :class:`MotKeyframes`.
+
+    Targets are red during the cue and after the motion stops, when the
+    click prompt is shown as well.
+    """
+
+    def __init__(self, timeline: MotTimeline | MotKeyframes, messages: MessageIndex, font: pygame.font.Font,
+                 radius: int = BALL_RADIUS):
+        self.timeline = timeline
+        self.radius = radius
+        self.movement_start = messages.first("MOVEMENT_START")
+        self.movement_stop = messages.first("MOVEMENT_STOPPED")
+        self.prompt = font.render("Click on the targets!", True, GREEN)
+        self._layers: Dict[Tuple[Tuple[int, int], bool], pygame.Surface] = {}
+
+    def moving(self, t: float) -> bool:
+        return self.movement_start is not None and t >= self.movement_start and \
+            (self.movement_stop is None or t < self.movement_stop)
+
+    def positions(self, t: float) -> np.ndarray:
+        if not len(self.timeline.frame_times):
+            return self.timeline.initial
+        return self.timeline.positions_at(np.array([t]))[0]
+
+    def layer(self, size: Tuple[int, int], t: float) -> pygame.Surface:
+        """Black, with the click prompt once the motion has stopped."""
+        key = (size, self.movement_stop is not None and t >= self.movement_stop)
+        if key not in self._layers:
+            layer = _new_layer(size, BLACK)
+            if key[1]:
+                layer.blit(self.prompt, self.prompt.get_rect(center=layer.get_rect().center))
+            self._layers[key] = layer
+        return self._layers[key]
+
+    def draw_moving(self, surface: pygame.Surface, t: float) -> List[pygame.Rect]:
+        moving = self.moving(t)
+        rects = []
+        for idx, pos in enumerate(self.positions(t).astype(int)):
+            col = RED if self.timeline.targets[idx] and not moving else WHITE
+            rects.append(pygame.draw.circle(surface, col, pos, self.radius))
+        return rects
+
+
+def load_search_trials(paths=SEARCH_TRIALS_PATHS) -> Dict[str, dict]:
+    """Saved search displays by ``trial_id`` (ids are unique across the three files)."""
+    trials = {}
+    for path in paths:
+        with open(path, "r") as f:
+            for trial in json.load(f):
+                trials[str(trial["trial_id"])] = trial
+    return trials
+
+
+class StaticScene(LayeredScene):
+    """Scene whose display only changes once, at an onset message.
+
+    The displays before and after the onset are rendered once per surface
+    size into cached layers, so every frame is a single blit; only the
+    overlays are drawn per frame on top.
+    """
+
+    background = WHITE
+
+    def __init__(self, messages: MessageIndex, onset_prefix: str):
+        self.onset = messages.first(onset_prefix)
+        self._layers: Dict[Tuple[Tuple[int, int], bool], pygame.Surface] = {}
+
+    def _render(self, surface: pygame.Surface, shown: bool):
+        raise NotImplementedError
+
+    def layer(self, size: Tuple[int, int], t: float) -> pygame.Surface:
+        """Cached display shown at *t* for a surface of *size*."""
+        key = (size, self.onset is not None and t >= self.onset)
+        if key not in self._layers:
+            layer = _new_layer(size, self.background)
+            self._render(layer, key[1])
+            self._layers[key] = layer
+        return self._layers[key]
+
+
+def _blit_text(surface: pygame.Surface, font: pygame.font.Font, text: str, color, pos, angle=0):
+    text_surface = font.render(text, True, color)
+    if angle:
+        text_surface = pygame.transform.rotate(text_surface, angle)
+    surface.blit(text_surface, text_surface.get_rect(center=(pos[0], pos[1])).topleft)
+
+
+class SearchScene(StaticScene):
+    """Fixation cross until ``LETTERS_DRAWN``, then the T/L search display."""
+
+    def __init__(self, trial_data: dict, messages: MessageIndex, font: pygame.font.Font):
+        super().__init__(messages, "LETTERS_DRAWN")
+        self.font = font
+        items = [(trial_data["target_type"], trial_data["target_color"], trial_data["target_pos"], 0)]
+        items += [(d["shape"], d["color"], d["pos"], d["angle"]) for d in trial_data["distractors"]]
+        self.items = items
+
+    def _render(self, surface: pygame.Surface, shown: bool):
+        if not shown:
+            _blit_text(surface, self.font, "+", BLACK, surface.get_rect().center)
+            return
+        # Distractors first, target on top as in the experiment
+        for shape, color, pos, angle in self.items[1:] + self.items[:1]:
+            letter = "L" if shape == "L_SHAPE" else "T"
+            _blit_text(surface, self.font, letter, SEARCH_COLORS[color], pos, angle)
+
+
+class ReactionScene(StaticScene):
+    """AbruptOnset fixation cross, plus the digits from ``TARGET_DRAWN`` on.
+
+    *layout* is one row of :func:`Analysis.saccade_latency.stimulus_layout`.
+    """
+
+    background = REACTION_BACKGROUND
+
+    def __init__(self, layout: pd.Series, messages: MessageIndex):
+        super().__init__(messages, "TARGET_DRAWN")
+        self.fixation_font = pygame.font.SysFont(None, FIXATION_SIZE)
+        self.letter_font = pygame.font.SysFont(None, LETTER_FONT_SIZE)
+        self.letters = [(layout["letter"], (layout["target_x"], layout["target_y"]))]
+        if layout["with_distractors"]:
+            self.letters += [(DISTRACTOR_LETTER, (layout[f"distractor_{k}_x"], layout[f"distractor_{k}_y"]))
+                             for k in range(1, len(DISTRACTOR_OFFSETS) + 1)]
+
+    def _render(self, surface: pygame.Surface, shown: bool):
+        _blit_text(surface, self.fixation_font, "+", BLACK, surface.get_rect().center)
+        if shown:
+            for letter, pos in self.letters:
+                _blit_text(surface, self.letter_font, letter, REACTION_LETTER_COLOR, pos)
+
+
+class GameScene(LayeredScene):
+    """ItalianGame round: cached background layer plus the animals of the current frame.
+
+    Animal circles come from a :class:`GameTimeline`, whose spline tracks
+    are cached per trial, so a frame is one row lookup.  Like the
+    reconstruction, animals shot by the player keep moving until they
+    reach the home base.  Visual distractions are shown from their
+    ``VISUAL_DISTRACTION`` messages.
+    """
+
+    # the background is the same for every round, so the layers are shared
+    _layers: Dict[Tuple[int, int], pygame.Surface] = {}
+
+    def __init__(self, timeline: GameTimeline, messages: MessageIndex):
+        self.timeline = timeline
+        distractions = [(ts, msg.split()[2:4]) for ts, msg in zip(messages.times, messages.values)
+                        if msg.startswith("VISUAL_DISTRACTION")]
+        self.distractions = TimeIndex([ts for ts, _ in distractions],
+                                      np.array([xy for _, xy in distractions], dtype=float).reshape(-1, 2))
+
+    def _render_layer(self, size: Tuple[int, int]) -> pygame.Surface:
+        layer = pygame.transform.scale(pygame.image.load(GAME_BACKGROUND_PATH), size)
+        house = pygame.transform.scale(pygame.image.load(HOUSE_IMAGE_PATH), HOUSE_IMAGE_SIZE)
+        if pygame.display.get_surface() is not None:
+            layer, house = layer.convert(), house.convert_alpha()
+        home = ((size[0] - HOUSE_IMAGE_SIZE[0]) // 2, (size[1] - HOUSE_IMAGE_SIZE[1]) // 2)
+        centre = (home[0] + HOUSE_IMAGE_SIZE[0] // 2, home[1] + HOUSE_IMAGE_SIZE[1] // 2)
+        layer.blit(house, home)
+        for weapon_range in WEAPON_RANGES:
+            pygame.draw.circle(layer, GREEN, centre, weapon_range, 2)
+        pygame.draw.circle(layer, RED, centre, HOME_BASE_BOUNDARY_RADIUS, 2)
+        return layer
+
+    def layer(self, size: Tuple[int, int], t: float) -> pygame.Surface:
+        if size not in self._layers:
+            self._layers[size] = self._render_layer(size)
+        return self._layers[size]
+
+    def draw_moving(self, surface: pygame.Surface, t: float) -> List[pygame.Rect]:
+        rects = []
+        i = self.distractions.index(t)
+        if i >= 0 and t - self.distractions.times[i] < RED_CIRCLE_DURATION:
+            rects.append(pygame.draw.circle(surface, RED, self.distractions.values[i], RED_CIRCLE_RADIUS))
+
+        frame = int(self.timeline.frame_index(np.array([t]))[0])
+        if frame < 0:
+            return rects
+        centres = self.timeline.positions[frame]
+        for x, y in centres[np.isfinite(centres).all(axis=1)].astype(int):
+            rects.append(pygame.draw.circle(surface, BLUE, (x, y), ANIMALS_CIRCLE_RADIUS))
+        return rects
+
+
+SCENE_TASKS = ("MOT", "SEARCH", "GAME", "REACTION")
+
+
+def scene_font(task: str) -> pygame.font.Font:
+    """Font the task drew its text with (search letters, MOT prompt); GAME and REACTION need none."""
+    if task == "SEARCH":
+        return pygame.font.SysFont(None, SEARCH_FONT_SIZE, bold=True)
+    return pygame.font.SysFont(None, int(40 * DISPLAY_SIZE_MULTIPLIER))
+
+
+def build_scene(asc: AscParser, trial_id: str, task: str, font: pygame.font.Font,
+                search_trials: Optional[Dict[str, dict]] = None):
+    """:class:`ReplayTrial` and scene of one recorded trial of *task* (one of :data:`SCENE_TASKS`)."""
+    gaze_left, gaze_right = trial_gaze(asc, trial_id)
+    trial = ReplayTrial(gaze_left, gaze_right, asc.get_messages(trial_id), fixation_array(asc, trial_id))
+    if task == "MOT":
+        return trial, MotScene(mot_keyframes(asc, trial_id), trial.messages, font)
+    if task == "SEARCH":
+        search_trials = load_search_trials() if search_trials is None else search_trials
+        return trial, SearchScene(search_trials[trial_id], trial.messages, font)
+    if task == "GAME":
+        return trial, GameScene(reconstruct_trial(asc, trial_id), trial.messages)
+    if task == "REACTION":
+        return trial, ReactionScene(stimulus_layout(screen_size(asc)).iloc[int(trial_id)], trial.messages)
+    raise ValueError(f"No replay scene for task {task!r}.")
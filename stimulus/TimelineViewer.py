@@ -0,0 +1,183 @@
+"""Zoomable timeline of gaze x/y, pupil and gaze speed for a trial or a session.
+
+Lanes are drawn from the cached min/max pyramids of
+:mod:`Analysis.lod_pyramid`: whatever the zoom, every lane gets at most
+about one bin per pixel, so a frame draws a few thousand points even for a
+whole round.  Messages (without ``!MOUSE_POS``) are vertical markers,
+labelled once few enough are in view.
+
+Mouse wheel zooms around the cursor, dragging or ``Left``/``Right`` pans,
+``Up``/``Down`` zoom around the centre, ``Home`` shows everything, ``Esc``
+quits.  Like :mod:`stimulus.Replay`, importing this module does not open a
+window.
+
+    python -m stimulus.TimelineViewer Data/GAME_p01.asc --trial 2
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+from parser import AscParser
+from Analysis.lod_pyramid import LodPyramid, lod_pyramid
+from Analysis.task_constants import MOUSE_POS_MSG
+from Analysis.trial_arrays import true_runs
+from .Replay import MessageIndex
+
+WINDOW_SIZE = (1600, 900)
+MARGIN = 90  # lane labels, px
+AXIS_HEIGHT = 30
+ZOOM_STEP = 1.25
+PAN_FRACTION = 0.25  # of the visible span per key press
+MIN_SPAN_MS = 20
+MAX_LABELS = 30  # message labels shown when at most this many messages are in view
+FONT_SIZE = 20
+
+BACKGROUND = (20, 20, 20)
+GRID_COLOR = (60, 60, 60)
+MARKER_COLOR = (110, 110, 110)
+TEXT_COLOR = (220, 220, 220)
+LANE_COLORS = {"x": (0, 200, 255), "y": (0, 255, 120), "pupil": (255, 200, 0), "speed": (255, 80, 80)}
+
+
+class TimelineView:
+    """Visible time window over a :class:`LodPyramid` and the session messages."""
+
+    def __init__(self, pyramid: LodPyramid, messages: MessageIndex):
+        self.pyramid = pyramid
+        self.messages = messages
+        self.t0, self.t1 = float(pyramid.start), float(pyramid.end)
+        self._labels: Dict[str, pygame.Surface] = {}
+
+    def reset(self):
+        self.t0, self.t1 = float(self.pyramid.start), float(self.pyramid.end)
+
+    def zoom(self, factor: float, around: float):
+        """Shrink the window by *factor* (>1 zooms in) keeping time *around* in place."""
+        span = min(max((self.t1 - self.t0) / factor, MIN_SPAN_MS), self.pyramid.end - self.pyramid.start)
+        frac = (around - self.t0) / (self.t1 - self.t0)
+        self.t0 = around - frac * span
+        self.t1 = self.t0 + span
+        self.pan(0)
+
+    def pan(self, dt: float):
+        span = self.t1 - self.t0
+        self.t0 = min(max(self.t0 + dt, self.pyramid.start - span / 2), self.pyramid.end - span / 2)
+        self.t1 = self.t0 + span
+
+    def time_at(self, x: float, width: int) -> float:
+        return self.t0 + (x - MARGIN) / (width - MARGIN) * (self.t1 - self.t0)
+
+    def _x(self, times: np.ndarray, width: int) -> np.ndarray:
+        return MARGIN + (times - self.t0) / (self.t1 - self.t0) * (width - MARGIN)
+
+    def _label(self, font: pygame.font.Font, text: str) -> pygame.Surface:
+        if text not in self._labels:
+            self._labels[text] = pygame.transform.rotate(font.render(text, True, MARKER_COLOR), 90)
+        return self._labels[text]
+
+    def _draw_lane(self, surface: pygame.Surface, font: pygame.font.Font, c: int, top: float, height: float,
+                   xs: np.ndarray, mins: np.ndarray, maxs: np.ndarray):
+        name = self.pyramid.channels[c]
+        lo, hi = self.pyramid.limits[c]
+        pygame.draw.line(surface, GRID_COLOR, (0, top + height), (surface.get_width(), top + height))
+        surface.blit(font.render(name, True, TEXT_COLOR), (8, top + 6))
+        if not np.isfinite([lo, hi]).all():
+            return
+        surface.blit(font.render(f"{hi:.0f}", True, MARKER_COLOR), (8, top + 26))
+        surface.blit(font.render(f"{lo:.0f}", True, MARKER_COLOR), (8, top + height - 22))
+
+        def y(values):
+            return top + height - np.clip((values - lo) / max(hi - lo, 1e-9), 0, 1) * (height - 4) - 2
+
+        upper, lower = y(maxs[:, c]), y(mins[:, c])
+        color = LANE_COLORS.get(name, TEXT_COLOR)
+        starts, ends = true_runs(np.isfinite(upper) & np.isfinite(lower))
+        for a, b in zip(starts, ends):
+            top_edge = np.column_stack([xs[a:b], upper[a:b]])
+            if b - a == 1:
+                pygame.draw.line(surface, color, top_edge[0], (xs[a], lower[a]))
+                continue
+            # filled min/max envelope; at the sample level both edges coincide
+            pygame.draw.polygon(surface, color, np.concatenate([top_edge, np.column_stack([xs[a:b], lower[a:b]])[::-1]]))
+            pygame.draw.lines(surface, color, False, top_edge)
+
+    def draw(self, surface: pygame.Surface, font: pygame.font.Font):
+        surface.fill(BACKGROUND)
+        width, height = surface.get_size()
+        times, mins, maxs = self.pyramid.envelope(self.t0, self.t1, width - MARGIN)
+        level = self.pyramid.level_for(self.t0, self.t1, width - MARGIN)
+        # a bin is drawn at its centre
+        xs = self._x(times + self.pyramid.bin_ms(level) / 2, width)
+
+        rows = self.messages.span(self.t0, self.t1)
+        marker_xs = self._x(self.messages.times[rows], width)
+        for x in marker_xs:
+            pygame.draw.line(surface, MARKER_COLOR, (x, 0), (x, height - AXIS_HEIGHT))
+        if len(marker_xs) <= MAX_LABELS:
+            for x, msg in zip(marker_xs, self.messages.values[rows]):
+                surface.blit(self._label(font, msg), (x + 2, 4))
+
+        n = len(self.pyramid.channels)
+        lane = (height - AXIS_HEIGHT) / n
+        for c in range(n):
+            self._draw_lane(surface, font, c, c * lane, lane, xs, mins, maxs)
+
+        span = self.t1 - self.t0
+        axis = (f"{(self.t0 - self.pyramid.start) / 1000:.3f} s  -  {(self.t1 - self.pyramid.start) / 1000:.3f} s"
+                f"   span {span / 1000:.3f} s   level {level} ({self.pyramid.bin_ms(level)} ms bins, {len(times)} shown)")
+        surface.blit(font.render(axis, True, TEXT_COLOR), (MARGIN, height - AXIS_HEIGHT + 6))
+
+
+def timeline_messages(asc: AscParser, trial_id: Optional[str] = None) -> MessageIndex:
+    messages: List[Tuple[int, str]] = asc.messages if trial_id is None else asc.get_messages(trial_id)
+    return MessageIndex([(ts, msg) for ts, msg in messages if not msg.startswith(MOUSE_POS_MSG)])
+
+
+def view_timeline(asc_file: str, trial_id: Optional[str] = None, size: Tuple[int, int] = WINDOW_SIZE):
+    """Open the timeline of one trial (or the whole session) until closed."""
+    asc = AscParser(asc_file)
+    view = TimelineView(lod_pyramid(asc, trial_id), timeline_messages(asc, trial_id))
+    pygame.init()
+    surface = pygame.display.set_mode(size, pygame.RESIZABLE)
+    pygame.display.set_caption(f"{asc.filepath.stem} " + (f"trial {trial_id}" if trial_id else "session"))
+    font = pygame.font.SysFont(None, FONT_SIZE)
+
+    dragging = False
+    while True:
+        view.draw(surface, font)
+        pygame.display.flip()
+        # redraw only on input
+        for event in [pygame.event.wait()] + pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                return
+            width = surface.get_width()
+            span = view.t1 - view.t0
+            if event.type == pygame.MOUSEWHEEL:
+                around = view.time_at(pygame.mouse.get_pos()[0], width)
+                view.zoom(ZOOM_STEP ** event.y, around)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                dragging = True
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                dragging = False
+            elif event.type == pygame.MOUSEMOTION and dragging:
+                view.pan(-event.rel[0] / (width - MARGIN) * span)
+            elif event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    view.pan((1 if event.key == pygame.K_RIGHT else -1) * PAN_FRACTION * span)
+                elif event.key in (pygame.K_UP, pygame.K_DOWN):
+                    view.zoom(ZOOM_STEP if event.key == pygame.K_UP else 1 / ZOOM_STEP, (view.t0 + view.t1) / 2)
+                elif event.key == pygame.K_HOME:
+                    view.reset()
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Zoomable gaze, pupil and speed timeline of a recording.")
+    cli.add_argument("asc_file")
+    cli.add_argument("--trial", help="trial id (default: the whole session)")
+    args = cli.parse_args()
+    view_timeline(args.asc_file, args.trial)
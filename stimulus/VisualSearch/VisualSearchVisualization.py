@@ -7,9 +7,14 @@ import math
 import json
 import os
 
+import numpy as np
+
 from parser import AscParser
+from Analysis.trial_arrays import fixation_array
 
 
+from ..Replay import ReplayTrial, run_replay
+from ..ReplayScenes import SearchScene
 from ..Utils import  HEIGHT,WIDTH,WHITE, RED, GREEN, BLACK ,BLUE
 
 # Initialize pygame
@@ -85,99 +90,16 @@ def quit_check(events):
         if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
             raise SystemExit("Experiment terminated by user.")
         
-def search_trial(trial_index: int, gaze_data, messages, SEARCH_TYPE: str):
-    trial_data = load_trial_config(SEARCH_TYPE, trial_index)
-    target_pos = tuple(trial_data["target_pos"])
-    target_type = trial_data["target_type"]
-    target_color = trial_data["target_color"]
-    distractors = trial_data["distractors"]
-
-    target_shape = L_SHAPE if target_type == "L_SHAPE" else T_SHAPE
-
-    # ---- Init gaze/message pointers ----
-    gaze_ptr = 0
-    msg_ptr = 0
-    show_message = None
-    message_timer = 0
-    clock = pygame.time.Clock()
-
-    # ---- Phase 1: fixation cross with gaze ----
-    start_time = pygame.time.get_ticks()
-    focus_duration = 1000  # ms
-    while pygame.time.get_ticks() - start_time < focus_duration:
-        elapsed = pygame.time.get_ticks() - start_time
-        events = pygame.event.get()
-        quit_check(events)
-
-        screen.fill(WHITE)
-        focus_text = font.render("+", True, BLACK)
-        focus_rect = focus_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(focus_text, focus_rect.topleft)
-
-        # Gaze
-        while gaze_ptr < gaze_data.shape[0] and gaze_data[gaze_ptr, 0] <= elapsed:
-            gaze_ptr += 1
-        if gaze_ptr:
-            gx, gy = gaze_data[gaze_ptr - 1, 1:].astype(int)
-            pygame.draw.circle(screen, GREEN, (gx, gy), 8, 2)
-
-        # Messages
-        while msg_ptr < len(messages) and messages[msg_ptr][0] <= elapsed:
-            show_message = messages[msg_ptr][1]
-            message_timer = pygame.time.get_ticks()
-            print(f"[MSG @ {elapsed} ms]: {show_message}")
-            msg_ptr += 1
-
-        if show_message and pygame.time.get_ticks() - message_timer < 1000:
-            text = font.render(show_message, True, GREEN)
-            screen.blit(text, (20, 20))
-
-        pygame.display.flip()
-        clock.tick(30)
-
-    # ---- Phase 2: stimuli + gaze/messages ----
-    start_time = pygame.time.get_ticks()
-    done = False
-    while not done:
-        elapsed = pygame.time.get_ticks() - start_time
-        events = pygame.event.get()
-        for event in events:
-            quit_check([event])
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                done = True
-
-        screen.fill(WHITE)
-
-        # Draw distractors
-        for d in distractors:
-            shape = L_SHAPE if d["shape"] == "L_SHAPE" else T_SHAPE
-            color = eval(d["color"])
-            draw_letter(shape, color, d["pos"], d["angle"])
-
-        draw_letter(target_shape, eval(target_color), target_pos)
-
-        # Gaze
-        while gaze_ptr < gaze_data.shape[0] and gaze_data[gaze_ptr, 0] <= elapsed + focus_duration:
-            gaze_ptr += 1
-        if gaze_ptr < gaze_data.shape[0]:
-            gx, gy = gaze_data[gaze_ptr - 1, 1:].astype(int)
-            pygame.draw.circle(screen, GREEN, (gx, gy), 8, 2)
-        else:
-            done = True
-
-        # Messages
-        while msg_ptr < len(messages) and messages[msg_ptr][0] <= elapsed + focus_duration:
-            show_message = messages[msg_ptr][1]
-            message_timer = pygame.time.get_ticks()
-            print(f"[MSG @ {elapsed + focus_duration} ms]: {show_message}")
-            msg_ptr += 1
-
-        if show_message and pygame.time.get_ticks() - message_timer < 1000:
-            text = font.render(show_message, True, GREEN)
-            screen.blit(text, (20, 20))
-
-        pygame.display.flip()
-        clock.tick(30)
+def search_trial(trial_index: int, gaze_data, messages, SEARCH_TYPE: str, speed: float = 1.0, fixations=None):
+    """Replays one search trial: fixation cross until ``LETTERS_DRAWN``, then the display.
+
+    ``gaze_data`` is ``(N, 3)`` ``time, x, y`` and ``messages`` the trial's
+    EyeLink messages, both in EyeLink time; ``fixations`` the optional
+    fixation events shown in the gaze trail.
+    """
+    trial = ReplayTrial(gaze_data, None, messages, fixations)
+    scene = SearchScene(load_trial_config(SEARCH_TYPE, trial_index), trial.messages, font)
+    run_replay(trial, scene, font, speed)
 
 def visual_search_visualization(ascDataParsed : AscParser):
     num_trials = 1
@@ -187,11 +109,9 @@ def visual_search_visualization(ascDataParsed : AscParser):
     for distractors in num_distractors:
         for _ in range(num_trials):
             df = ascDataParsed.to_dataframe(str(trial_count))
-            df["rel_ms"] = df.index - df.index[0]
-            gaze = df[["rel_ms", "x", "y"]].to_numpy()
-            messages = ascDataParsed.get_messages(trial_count)
-            messages = [(t - df.index[0], msg) for t, msg in messages]
-            search_trial(trial_count,gaze,messages,"pop_out")
+            gaze = np.column_stack([df.index.to_numpy(dtype=float), df[["x", "y"]].to_numpy(float)])
+            messages = ascDataParsed.get_messages(str(trial_count))
+            search_trial(trial_count,gaze,messages,"pop_out",fixations=fixation_array(ascDataParsed, str(trial_count)))
             trial_count += 1
 
 
@@ -199,21 +119,17 @@ def visual_search_visualization(ascDataParsed : AscParser):
     for distractors in num_distractors:
         for _ in range(num_trials):
             df = ascDataParsed.to_dataframe(str(trial_count))
-            df["rel_ms"] = df.index - df.index[0]
-            gaze = df[["rel_ms", "x", "y"]].to_numpy()
-            messages = ascDataParsed.get_messages(trial_count)
-            messages = [(t - df.index[0], msg) for t, msg in messages]
-            search_trial(trial_count,gaze,messages,"feature")
+            gaze = np.column_stack([df.index.to_numpy(dtype=float), df[["x", "y"]].to_numpy(float)])
+            messages = ascDataParsed.get_messages(str(trial_count))
+            search_trial(trial_count,gaze,messages,"feature",fixations=fixation_array(ascDataParsed, str(trial_count)))
             trial_count += 1
 
     for distractors in num_distractors:
         for _ in range(num_trials):
             df = ascDataParsed.to_dataframe(str(trial_count))
-            df["rel_ms"] = df.index - df.index[0]
-            gaze = df[["rel_ms", "x", "y"]].to_numpy()
-            messages = ascDataParsed.get_messages(trial_count)
-            messages = [(t - df.index[0], msg) for t, msg in messages]
-            search_trial(trial_count,gaze,messages,"conjunction")
+            gaze = np.column_stack([df.index.to_numpy(dtype=float), df[["x", "y"]].to_numpy(float)])
+            messages = ascDataParsed.get_messages(str(trial_count))
+            search_trial(trial_count,gaze,messages,"conjunction",fixations=fixation_array(ascDataParsed, str(trial_count)))
             trial_count += 1
 
 
@@ -0,0 +1,16 @@
+"""Run the tests from the repository root without installing anything.
+
+Modules import ``parser`` and ``Analysis`` as top-level packages, and
+pygame-based modules draw off-screen with the SDL dummy driver.
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+DATA = ROOT / "Data"
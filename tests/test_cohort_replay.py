@@ -0,0 +1,46 @@
+import numpy as np
+
+from conftest import DATA
+from stimulus.CohortReplay import STALE_MS, CohortGaze, cached_trial_gaze, trial_start
+
+
+def naive_at(streams, t):
+    points = np.full((len(streams), 2), np.nan)
+    for p, stream in enumerate(streams):
+        past = stream[stream[:, 0] <= t]
+        if len(past) and t - past[-1, 0] <= STALE_MS:
+            points[p] = past[-1, 1:]
+    return points
+
+
+def test_cohort_gaze_matches_per_stream_lookup():
+    rng = np.random.default_rng(2)
+    streams = []
+    for start, step in ((-30, 1), (0, 2), (500, 4)):
+        time = np.arange(start, start + 2000, step, dtype=float)
+        time = np.delete(time, np.arange(200, 300))  # a gap longer than STALE_MS
+        streams.append(np.column_stack([time, rng.random((len(time), 2)) * 1000]))
+    cohort = CohortGaze(streams)
+    assert cohort.start == -30 and cohort.end == streams[2][-1, 0]
+    for t in np.linspace(-100, 2600, 400):
+        np.testing.assert_array_equal(cohort.at(t), naive_at(streams, t))
+
+
+def test_stale_and_unsorted_streams():
+    stream = np.array([[20.0, 5, 5], [0.0, 1, 1], [10.0, 3, 3]])
+    cohort = CohortGaze([stream])
+    assert np.isnan(cohort.at(-1)).all()
+    assert cohort.at(15)[0].tolist() == [3, 3]
+    assert np.isfinite(cohort.at(20 + STALE_MS)).all()
+    assert np.isnan(cohort.at(21 + STALE_MS)).all()
+    assert CohortGaze([]).at(0).shape == (0, 2)
+
+
+def test_cached_trial_gaze(tmp_path):
+    fresh = cached_trial_gaze(DATA / "REACTION_roi.asc", "1", cache_root=tmp_path)
+    cached = cached_trial_gaze(DATA / "REACTION_roi.asc", "1", cache_root=tmp_path)
+    np.testing.assert_allclose(cached, fresh, rtol=1e-6)
+    assert cached_trial_gaze(DATA / "REACTION_roi.asc", "999", cache_root=tmp_path) is None
+    assert cached_trial_gaze(DATA / "REACTION_roi.asc", "999", cache_root=tmp_path) is None
+    assert trial_start([(5, "TRIALID 1"), (9, "TRIAL_START")], 5) == 9
+    assert trial_start([(5, "TRIALID 1")], 5) == 5
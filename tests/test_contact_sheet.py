@@ -0,0 +1,40 @@
+import shutil
+
+import numpy as np
+import pygame
+import pytest
+
+from conftest import DATA
+from stimulus.ContactSheet import PADDING, click_positions, session_contact_sheet, tile
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def test_click_positions():
+    messages = ["!MOUSE_POS 1 2", "!LEFT_MOUSE_DOWN 100 200", "TARGET_DRAWN", "!LEFT_MOUSE_DOWN 5 6 extra"]
+    np.testing.assert_array_equal(click_positions(messages), [[100, 200], [5, 6]])
+    assert click_positions([]).shape == (0, 2)
+
+
+def test_tile_grid():
+    font = pygame.font.SysFont(None, 24)
+    thumbs = [pygame.Surface((40, 30)) for _ in range(5)]
+    sheet = tile(thumbs, "title", font, columns=3)
+    header = font.get_linesize() + 2 * PADDING
+    assert sheet.get_size() == (3 * (40 + PADDING) + PADDING, header + 2 * (30 + PADDING))
+    assert tile(thumbs[:2], "title", font, columns=3).get_width() == 2 * (40 + PADDING) + PADDING
+
+
+def test_session_contact_sheet(tmp_path):
+    asc_file = shutil.copy(DATA / "REACTION_roi.asc", tmp_path / "REACTION_p01.asc")
+    sheet = session_contact_sheet(asc_file, tmp_path / "sheets", width=120, columns=10, save_thumbnails=True)
+    assert sheet == tmp_path / "sheets" / "REACTION_p01_sheet.png"
+    thumbnails = list((tmp_path / "sheets" / "REACTION_p01").glob("trial_*.png"))
+    assert len(thumbnails) == 40
+    assert pygame.image.load(str(thumbnails[0])).get_size() == (120, 68)
+    assert pygame.image.load(str(sheet)).get_width() == 10 * (120 + PADDING) + PADDING
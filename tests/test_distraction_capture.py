@@ -0,0 +1,26 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from Analysis.distraction_capture import report_accuracy, saccade_capture
+
+
+def test_first_landing_saccade_in_window_captures():
+    events = pd.DataFrame({"time": [1000, 5000, 9000], "kind": ["visual", "beep", "visual"],
+                           "x": [100.0, np.nan, 800.0], "y": [100.0, np.nan, 800.0]})
+    saccades = pd.DataFrame({
+        "start": [1050, 1200, 1300, 5200, 9200],
+        "x_end": [105.0, 400.0, 100.0, 100.0, 100.0],
+        "y_end": [100.0, 400.0, 100.0, 100.0, 100.0],
+    })
+    captured, latency = saccade_capture(events, saccades, window=(80, 1000), radius=20)
+    # the saccade at +50 ms is anticipatory; the one at +300 ms lands on the distractor
+    np.testing.assert_array_equal(captured, [True, False, False])
+    np.testing.assert_array_equal(latency, [300, np.nan, np.nan])
+
+
+def test_report_accuracy(tmp_path):
+    path = tmp_path / "GAME_p01_performance.json"
+    path.write_text(json.dumps([[80, 10, 7, 3, 4], [50, 12, 6, 2, 2]]))
+    np.testing.assert_array_equal(report_accuracy(path)["count_error"], [1, 0])
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Analysis.drift import DriftModel, correct_fixations, correct_samples
+
+ANCHORS = np.array([1000.0, 3000.0])
+OFFSETS = np.array([[10.0, -10.0], [30.0, 10.0]])
+
+
+def test_trial_mode_holds_each_offset_until_the_next_anchor():
+    model = DriftModel(ANCHORS, OFFSETS, "trial")
+    np.testing.assert_array_equal(model.offset_at([0, 1000, 2999, 5000]),
+                                  [[10, -10], [10, -10], [10, -10], [30, 10]])
+
+
+def test_interpolate_mode_is_linear_between_anchors():
+    model = DriftModel(ANCHORS, OFFSETS, "interpolate")
+    np.testing.assert_array_equal(model.offset_at([2000]), [[20, 0]])
+    with pytest.raises(ValueError):
+        DriftModel(ANCHORS, OFFSETS, "median")
+
+
+def test_empty_model_leaves_positions_unchanged():
+    model = DriftModel(np.empty(0), np.empty((0, 2)))
+    np.testing.assert_array_equal(model.apply([1, 2], [[5, 6], [7, 8]]), [[5, 6], [7, 8]])
+
+
+def test_fixations_are_corrected_at_their_midpoint():
+    fixations = np.array([[2800, 3200, 500, 500, 400], [100, 300, 600, 600, 200]], dtype=float)
+    corrected = correct_fixations(fixations, DriftModel(ANCHORS, OFFSETS, "trial"))
+    np.testing.assert_array_equal(corrected[:, 2:4], [[470, 490], [590, 610]])
+    np.testing.assert_array_equal(corrected[:, [0, 1, 4]], fixations[:, [0, 1, 4]])
+
+
+def test_samples_correct_every_gaze_channel():
+    samples = pd.DataFrame({"x_l": [100.0], "x_r": [200.0], "y_l": [50.0], "y_r": [60.0], "pupil": [900.0]},
+                           index=pd.Index([3500], name="time"))
+    corrected = correct_samples(samples, DriftModel(ANCHORS, OFFSETS, "trial"))
+    assert corrected.iloc[0].tolist() == [70.0, 170.0, 40.0, 50.0, 900.0]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from parser import AscParser
+from Analysis.epochs import Epochs, SessionGrid, epoch_index, uniform_grid
+from conftest import DATA
+
+
+def test_uniform_grid_fills_gaps_with_nan():
+    samples = pd.DataFrame({"x": [1.0, 2.0, 4.0]}, index=[100, 102, 106])
+    time, data = uniform_grid(samples, ["x"], 2)
+    np.testing.assert_array_equal(time, [100, 102, 104, 106])
+    np.testing.assert_array_equal(data[:, 0], [1.0, 2.0, np.nan, 4.0])
+
+
+def test_epoch_index_marks_samples_outside_the_recording():
+    offsets, idx, inside = epoch_index(np.arange(0, 10, 2), np.array([0, 8]), (-4, 4), 2)
+    np.testing.assert_array_equal(offsets, [-4, -2, 0, 2])
+    np.testing.assert_array_equal(inside, [[False, False, True, True], [True, True, True, False]])
+    np.testing.assert_array_equal(idx[1, :3], [2, 3, 4])
+
+
+def test_baseline_correction():
+    data = np.arange(12, dtype=float).reshape(2, 3, 2)
+    epochs = Epochs(np.array([-2, 0, 2]), data, np.array([10, 20]), ["a", "b"], ["0", "1"], ["x", "y"])
+    corrected = epochs.baseline_corrected((-2, 0))
+    np.testing.assert_array_equal(corrected.channel("x"), [[0, 2, 4], [0, 2, 4]])
+    np.testing.assert_array_equal(epochs.average()[:, 1], [4, 6, 8])
+
+
+def test_session_epochs_line_up_with_messages():
+    grid = SessionGrid(AscParser(DATA / "REACTION_roi.asc"), ["x", "y"])
+    epochs = grid.epochs("TARGET_DRAWN", (-100, 300))
+    assert len(epochs) == 40 and epochs.data.shape[1:] == (400 // grid.step, 2)
+    assert all(t is not None for t in epochs.trial_ids)
+    at_onset = np.searchsorted(grid.time, epochs.onsets)
+    np.testing.assert_array_equal(epochs.channel("x")[:, epochs.times == 0][:, 0], grid.data[at_onset, 0])
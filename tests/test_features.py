@@ -0,0 +1,67 @@
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Analysis.features as features
+from Analysis.features import (performance_features, read_feature_table, session_features, task_of,
+                               write_feature_table)
+from Analysis.game_trajectories import load_game_trials
+from conftest import DATA
+
+
+@pytest.fixture
+def session(tmp_path):
+    asc_file = tmp_path / "SEARCH_p01.asc"
+    shutil.copy(DATA / "SEARCH_roi.asc", asc_file)
+    (tmp_path / "SEARCH_p01_performance.json").write_text(json.dumps([1200, -1, 900] + [1000] * 30))
+    return asc_file
+
+
+def test_task_of():
+    assert task_of("Data/p01/GAME_p01.asc") == "GAME"
+    assert task_of("notes.asc") is None
+
+
+def test_groups_are_memoised_per_input(session, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    first = session_features(session, cache_root=cache)
+    assert first["task"].eq("SEARCH").all()
+    assert first.loc[first["trial_id"] == "1", "perf_accuracy"].item() == 0.0
+
+    class NoParse:
+        def __init__(self, *args):
+            raise AssertionError("the recording was parsed")
+
+    monkeypatch.setattr(features, "AscParser", NoParse)
+    cached = session_features(session, cache_root=cache)
+    assert cached.equals(first)
+
+    # a new performance file only invalidates the performance group
+    (tmp_path / "SEARCH_p01_performance.json").write_text(json.dumps([-1] * 33))
+    with pytest.raises(AssertionError, match="parsed"):
+        session_features(session, cache_root=cache)
+    others = [group for group in features.FEATURE_GROUPS if group != "performance"]
+    assert session_features(session, groups=others, cache_root=cache).equals(first.drop(columns=[
+        c for c in first.columns if c.startswith("perf_")]))
+
+
+def test_feature_table_round_trip(tmp_path):
+    table = pd.DataFrame({"participant": ["p01", "p02"], "task": ["MOT", "GAME"], "trial_id": ["0", "3"],
+                          "fix_count": [3.0, np.nan]})
+    path = write_feature_table(table, tmp_path / "features.npz")
+    assert read_feature_table(path).equals(table)
+    assert read_feature_table(path, ["fix_count"]).columns.tolist() == ["fix_count"]
+
+
+def test_game_kill_ratio_counts_only_tung_tung_sahur(tmp_path):
+    path = tmp_path / "GAME_p01_performance.json"
+    path.write_text(json.dumps([[80, 10, 2, 3, 4], [50, 0, 0, 0, 0]]))
+    table = performance_features(None, ["0", "1"], task="GAME", performance_file=path)
+    spawned = load_game_trials()[0]["animals"][:10]
+    tung_tung = sum(animal["animal_type"] == "Tung_Tung_Sahur" for animal in spawned)
+    assert table.loc["0", "perf_tung_tung_kill_ratio"] == 2 / tung_tung
+    assert np.isnan(table.loc["1", "perf_tung_tung_kill_ratio"])
+    assert table["perf_count_error"].tolist() == [1, 0]
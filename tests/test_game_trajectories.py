@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+
+from Analysis.game_trajectories import (GameTimeline, _build_tracks, animal_tracks, load_game_trials, nearest_animal,
+                                        threat_metrics)
+from Analysis.task_constants import ANIMAL_SPEED, ANIMALS_CIRCLE_RADIUS, HOME_BASE_BOUNDARY_RADIUS
+from stimulus.ItalianGame.Spline import Spline
+
+
+def timeline():
+    frame_times = np.arange(0, 100, 10, dtype=np.int64)
+    positions = np.full((10, 2, 2), np.nan, dtype=np.float32)
+    positions[:, 0] = (100, 100)  # on screen from the first frame
+    positions[5:, 1] = (500, 100)  # spawns on frame 5
+    return GameTimeline("0", ["fox", "bear"], frame_times, positions, np.array([0, 5]))
+
+
+def test_nearest_animal_ignores_hidden_animals_and_missing_gaze():
+    gaze = np.array([[-5, 500, 100], [20, 480, 100], [60, 480, 100], [70, np.nan, np.nan]], dtype=float)
+    nearest, dist = nearest_animal(timeline(), gaze)
+    np.testing.assert_array_equal(nearest, [-1, 0, 1, -1])
+    np.testing.assert_allclose(dist, [np.inf, 380, 20, np.inf])
+
+
+def test_threat_metrics_dwell_and_first_look():
+    time = np.arange(0, 100, dtype=float)
+    x = np.where(time < 60, 100.0, 900.0)
+    x[75:] = 505.0
+    table = threat_metrics(timeline(), np.column_stack([time, x, np.full(100, 100.0)]), sample_rate=1000,
+                           radius=50)
+    assert table["dwell_ms"].tolist() == [60.0, 25.0]
+    assert table["spawn_time"].tolist() == [0.0, 50.0]
+    assert table["first_look_latency"].tolist() == [0.0, 25.0]
+
+
+def live_centres(animal):
+    """Circle centres of an animal stepped like ``game_round`` until it reaches the home base."""
+    spline_data = animal["spline"]
+    spline = Spline.create(tuple(spline_data["start"]), tuple(spline_data["end"]), seed=spline_data["seed"])
+    home = spline_data["end"]
+    centres = []
+    while True:
+        x, y = spline.get_next(ANIMAL_SPEED)
+        centre = (x + ANIMALS_CIRCLE_RADIUS, y + ANIMALS_CIRCLE_RADIUS)
+        if np.hypot(centre[0] - home[0], centre[1] - home[1]) <= ANIMALS_CIRCLE_RADIUS + HOME_BASE_BOUNDARY_RADIUS:
+            return np.array(centres)
+        centres.append(centre)
+
+
+def test_tracks_match_the_live_spline_steps():
+    animals = load_game_trials()[0]["animals"][:5]
+    tracks, n_steps = _build_tracks(animals)
+    for a, animal in enumerate(animals):
+        centres = live_centres(animal)
+        assert n_steps[a] == len(centres)
+        np.testing.assert_allclose(tracks[a, :n_steps[a]], centres, atol=1e-3)
+        assert np.isnan(tracks[a, n_steps[a]:]).all()
+
+
+def test_animal_tracks_cache_is_keyed_by_the_trials_file(tmp_path):
+    trials = load_game_trials()[:1]
+    path = tmp_path / "animal_trials.json"
+    path.write_text(json.dumps(trials))
+    types, tracks, _ = animal_tracks(0, path, cache_root=tmp_path / "cache")
+
+    trials[0]["animals"] = trials[0]["animals"][1:3]
+    other = tmp_path / "other_trials.json"
+    other.write_text(json.dumps(trials))
+    other_types, other_tracks, _ = animal_tracks(0, other, cache_root=tmp_path / "cache")
+    assert other_types == types[1:3] and len(other_tracks) == 2
+    cached_types, cached_tracks, _ = animal_tracks(0, path, cache_root=tmp_path / "cache")
+    assert cached_types == types
+    np.testing.assert_array_equal(cached_tracks, tracks)
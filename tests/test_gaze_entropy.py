@@ -0,0 +1,61 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import Analysis.gaze_entropy as gaze_entropy
+from conftest import DATA
+from parser import AscParser
+from Analysis.gaze_entropy import SEARCH_AOIS, _item_codes, aoi_labels, entropies, session_codes, transition_counts
+from Analysis.task_constants import SEARCH_TRIALS_PATHS
+
+
+def test_transition_counts_never_cross_trials():
+    transitions, visits = transition_counts([np.array([0, 1, 1]), np.array([], dtype=int), np.array([2, 0])], 3)
+    np.testing.assert_array_equal(visits, [[1, 2, 0], [0, 0, 0], [1, 0, 1]])
+    assert transitions[0, 0, 1] == 1 and transitions[0, 1, 1] == 1 and transitions[2, 2, 0] == 1
+    assert transitions.sum() == 3  # no 1 -> 2 transition between trial 0 and trial 2
+
+
+def test_entropy_of_a_cycle_and_of_an_empty_trial():
+    cycle = np.tile(np.arange(4), 5)  # all AOIs equally often, fully predictable order
+    table = entropies(*transition_counts([cycle, np.array([], dtype=int)], 4))
+    assert table.loc[0, "stationary_entropy"] == pytest.approx(2.0)
+    assert table.loc[0, "stationary_entropy_norm"] == pytest.approx(1.0)
+    assert table.loc[0, "transition_entropy"] == pytest.approx(0.0)
+    assert table.loc[1, ["stationary_entropy", "transition_entropy"]].isna().all()
+
+
+def test_random_order_has_transition_entropy():
+    sequence = np.random.default_rng(0).integers(0, 4, 5000)
+    table = entropies(*transition_counts([sequence], 4))
+    assert table.loc[0, "transition_entropy_norm"] == pytest.approx(1.0, abs=0.01)
+
+
+def test_item_codes_pick_the_nearest_item_within_radius():
+    items = np.array([[100.0, 100.0], [130.0, 100.0], [np.nan, np.nan]])
+    xy = np.array([[105.0, 100.0], [126.0, 100.0], [500.0, 500.0]])
+    np.testing.assert_array_equal(_item_codes(xy, items, np.array([True, False, False]), 20), [0, 1, 2])
+    with pytest.raises(ValueError):
+        aoi_labels("hexagons")
+
+
+def test_editing_the_task_configuration_recomputes_cached_codes(tmp_path, monkeypatch):
+    paths = tuple(shutil.copy(path, tmp_path) for path in SEARCH_TRIALS_PATHS)
+    monkeypatch.setitem(gaze_entropy.AOI_CONFIG_PATHS, "search", paths)
+    asc = AscParser(DATA / "SEARCH_roi.asc")
+    codes = session_codes(asc, "search", cache_root=tmp_path / "cache")
+    assert any((c != SEARCH_AOIS.index("other")).any() for c in codes.values())
+
+    for path in paths:
+        trials = json.loads(Path(path).read_text())
+        for trial in trials:  # move every item off screen
+            trial["target_pos"] = [-9999, -9999]
+            for distractor in trial["distractors"]:
+                distractor["pos"] = [-9999, -9999]
+        Path(path).write_text(json.dumps(trials))
+    moved = session_codes(asc, "search", cache_root=tmp_path / "cache")
+    assert moved.keys() == codes.keys()
+    assert all((c == SEARCH_AOIS.index("other")).all() for c in moved.values())
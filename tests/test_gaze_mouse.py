@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from Analysis.gaze_mouse import click_latencies, coupling, fft_xcorr
+
+
+def test_fft_xcorr_matches_direct_sum():
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal(50), rng.standard_normal(50)
+    lags, c = fft_xcorr(a, b, 10)
+    direct = [np.sum(a[max(0, -k):50 - max(0, k)] * b[max(0, k):50 + min(0, k)]) / 50 for k in lags]
+    np.testing.assert_allclose(c, direct, atol=1e-12)
+
+
+def test_coupling_recovers_eye_lead():
+    t = np.arange(0, 10_000, 2.0)
+    rng = np.random.default_rng(1)
+    path = np.cumsum(rng.standard_normal((t.size + 200, 2)), axis=0)
+    gaze = np.column_stack([t, path[200:]])
+    mouse = np.column_stack([t, path[100:-100]])  # the hand follows 100 samples (200 ms) later
+    lag, peak = coupling(gaze, mouse)
+    assert lag == 200
+    assert peak > 0.9
+
+
+def test_coupling_needs_enough_overlap():
+    t = np.arange(0, 500, 2.0)
+    xy = np.column_stack([t, t, t])
+    assert np.isnan(coupling(xy, xy)).all()
+
+
+def test_click_latency_uses_first_nearby_fixation():
+    fixations = np.array([[0, 100, 900, 900, 100], [200, 400, 510, 500, 200], [500, 700, 500, 500, 200.0]])
+    clicks = np.array([[800, 500, 500], [900, 50, 50]], dtype=float)
+    np.testing.assert_array_equal(click_latencies(fixations, clicks), [600, np.nan])
+    assert click_latencies(fixations, clicks, lookback=400)[0] == pytest.approx(300)
@@ -0,0 +1,58 @@
+import numpy as np
+
+from conftest import DATA
+from parser import AscParser
+from Analysis.lod_pyramid import CHANNELS, _reduce, build_pyramid, lod_pyramid
+from stimulus.Replay import MessageIndex
+from stimulus.TimelineViewer import MIN_SPAN_MS, TimelineView
+
+
+def test_reduce_ignores_nan_and_pads_the_last_bin():
+    data = np.array([[1.0], [np.nan], [3.0], [-2.0], [np.nan], [np.nan], [7.0]])
+    mins, maxs = _reduce(data, data, 2)
+    np.testing.assert_array_equal(mins[:, 0], [1, -2, np.nan, 7])
+    np.testing.assert_array_equal(maxs[:, 0], [1, 3, np.nan, 7])
+
+
+def test_envelope_matches_naive_min_max():
+    rng = np.random.default_rng(1)
+    time = np.arange(1000, 1000 + 5000 * 2, 2)
+    data = rng.normal(size=(5000, 2))
+    data[100:140] = np.nan
+    pyramid = build_pyramid(time, data, ["a", "b"], factor=4, min_bins=16)
+    assert len(pyramid.levels[-1][0]) <= 16 and pyramid.end == time[-1] + 2
+
+    times, mins, maxs = pyramid.envelope(1300, 7000, 300)
+    width = pyramid.bin_ms(pyramid.level_for(1300, 7000, 300))
+    assert len(times) <= 300 + 1 and times[0] <= 1300 < times[0] + width
+    for t, lo, hi in zip(times, mins, maxs):
+        window = data[(time >= t) & (time < t + width)]
+        np.testing.assert_array_equal(lo, np.nanmin(window, axis=0) if np.isfinite(window).any() else np.nan)
+        np.testing.assert_array_equal(hi, np.nanmax(window, axis=0) if np.isfinite(window).any() else np.nan)
+
+
+def test_cached_pyramid_equals_fresh(tmp_path):
+    asc = AscParser(DATA / "REACTION_roi.asc")
+    fresh = lod_pyramid(asc, "1", cache_root=tmp_path)
+    cached = lod_pyramid(asc, "1", cache_root=tmp_path)
+    assert cached.channels == list(CHANNELS) and (cached.start, cached.step) == (fresh.start, fresh.step)
+    np.testing.assert_array_equal(cached.limits, fresh.limits)
+    assert len(cached.levels) == len(fresh.levels)
+    for (cached_min, cached_max), (fresh_min, fresh_max) in zip(cached.levels, fresh.levels):
+        np.testing.assert_array_equal(cached_min, fresh_min)
+        np.testing.assert_array_equal(cached_max, fresh_max)
+
+
+def test_timeline_view_zoom_and_pan_stay_in_bounds():
+    time = np.arange(0, 10000)
+    view = TimelineView(build_pyramid(time, np.zeros((10000, 1)), ["x"]), MessageIndex([]))
+    view.zoom(4, around=2000)
+    assert (view.t0, view.t1) == (1500, 4000)
+    view.pan(-1e6)
+    assert view.t0 == -1250 and view.t1 - view.t0 == 2500  # at most half a span before the start
+    view.zoom(1e9, around=0)
+    assert view.t1 - view.t0 == MIN_SPAN_MS
+    view.zoom(1e-9, around=0)
+    assert view.t1 - view.t0 == 10000
+    view.reset()
+    assert (view.t0, view.t1) == (0, 10000)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from Analysis.mot_decoding import emission_log_prob, viterbi_uniform
+
+
+def naive_viterbi(emissions, switch_prob):
+    n_frames, n_states = emissions.shape
+    log_a = np.full((n_states, n_states), np.log(switch_prob / max(n_states - 1, 1)))
+    np.fill_diagonal(log_a, np.log1p(-switch_prob))
+    delta = emissions[0] - np.log(n_states)
+    back = np.zeros((n_frames, n_states), dtype=int)
+    for f in range(1, n_frames):
+        scores = delta[:, None] + log_a
+        back[f] = np.argmax(scores, axis=0)
+        delta = scores[back[f], np.arange(n_states)] + emissions[f]
+    path = [int(np.argmax(delta))]
+    for f in range(n_frames - 1, 0, -1):
+        path.append(back[f, path[-1]])
+    return np.array(path[::-1])
+
+
+def test_batched_viterbi_matches_full_transition_matrix():
+    rng = np.random.default_rng(0)
+    sizes = [(40, 5), (25, 3), (40, 2), (1, 4)]  # (frames, states)
+    emissions = np.full((len(sizes), 40, 5), -np.inf)
+    trials = []
+    for k, (frames, states) in enumerate(sizes):
+        e = rng.normal(0, 2, (frames, states))
+        trials.append(e)
+        emissions[k, :frames, :states] = e
+        emissions[k, frames:, :states] = 0.0
+    paths = viterbi_uniform(emissions, np.array([s for _, s in sizes]), np.array([f for f, _ in sizes]), 0.2)
+    for path, e in zip(paths, trials):
+        np.testing.assert_array_equal(path[:len(e)], naive_viterbi(e, 0.2))
+
+
+def test_missing_gaze_is_uninformative():
+    gaze = np.array([[100.0, 100.0], [np.nan, np.nan]])
+    states = np.array([[[100.0, 100.0], [900.0, 900.0]]] * 2)
+    log_p = emission_log_prob(gaze, states, screen_area=2048 * 1152)
+    assert log_p[0, 0] > log_p[0, 1]
+    np.testing.assert_array_equal(log_p[1], [0.0, 0.0])
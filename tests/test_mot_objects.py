@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from parser import AscParser
+from Analysis.mot_objects import (load_mot_config, mot_keyframes, reconstruct_mot_trial, simulate_keyframes,
+                                  simulate_objects)
+from conftest import DATA
+
+
+def test_keyframes_are_rows_of_the_dense_simulation():
+    trial = load_mot_config()[2]
+    dense = simulate_objects(trial, (3840, 2160), 100)
+    keys, _ = simulate_keyframes(trial, (3840, 2160), 100, every=7)
+    np.testing.assert_array_equal(keys, dense[::7])
+
+
+@pytest.mark.parametrize("trial_id", ["0", "1"])
+def test_random_access_matches_the_dense_timeline(trial_id, tmp_path):
+    asc = AscParser(DATA / "MOT_roi.asc")
+    dense = reconstruct_mot_trial(asc, trial_id)
+    fresh = mot_keyframes(asc, trial_id, cache_root=tmp_path)
+    cached = mot_keyframes(asc, trial_id, cache_root=tmp_path)
+    rng = np.random.default_rng(0)
+    times = rng.uniform(dense.frame_times[0] - 500, dense.frame_times[-1] + 500, 200)
+    expected = dense.positions_at(times)
+    np.testing.assert_array_equal(fresh.positions_at(times), expected)
+    np.testing.assert_array_equal(cached.positions_at(times), expected)
+    np.testing.assert_array_equal(cached.initial, fresh.initial)
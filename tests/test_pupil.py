@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from parser import AscParser
+from Analysis.pupil import MAX_GAP_MS, PupilTrace, dilation_speed, preprocess_pupil
+from Analysis.trial_arrays import true_runs
+from conftest import DATA
+
+
+def test_dilation_speed_takes_larger_neighbour_change():
+    np.testing.assert_allclose(dilation_speed(np.array([0.0, 2.0, 2.0, 8.0]), 2.0), [1.0, 1.0, 3.0, 3.0])
+
+
+def test_baseline_modes():
+    time = np.arange(0, 1000, 10)
+    trace = PupilTrace(time, time.astype(float), 100.0 + time, np.zeros(time.size, dtype=bool), 100)
+    offsets, data = trace.epochs(np.array([500]), window=(-100, 100), baseline=(-100, 0))
+    assert data[0, offsets == 0] == pytest.approx(55.0)
+    _, ratio = trace.epochs(np.array([500]), window=(-100, 100), baseline=(-100, 0), mode="divisive")
+    assert ratio[0, offsets == 0] == pytest.approx(55.0 / 545.0)
+    with pytest.raises(ValueError):
+        trace.epochs(np.array([500]), mode="median")
+
+
+def test_only_short_gaps_are_interpolated():
+    trace = preprocess_pupil(AscParser(DATA / "REACTION_roi.asc"))
+    assert trace.interpolated.any()
+    assert np.isfinite(trace.clean[trace.interpolated]).all()
+    starts, ends = true_runs(np.isnan(trace.clean))
+    short = (ends - starts) * trace.step_ms <= MAX_GAP_MS
+    inner = (starts > 0) & (ends < trace.time.size)
+    assert not (short & inner).any()
@@ -0,0 +1,68 @@
+import numpy as np
+
+from conftest import DATA
+from parser import AscParser
+from Analysis.mot_objects import load_mot_config, simulate_objects
+from Analysis.pursuit import LABELS, classify_samples, game_pursuit, segments
+from Analysis.task_constants import BALL_RADIUS
+
+PX_PER_DEG = 40.0
+
+
+def moving_dot(n=1000):
+    """One dot crossing the screen at 400 px/s, rendered at 100 Hz."""
+    frame_times = np.arange(0, n + 10, 10)
+    positions = np.column_stack([200 + 0.4 * frame_times, np.full(frame_times.size, 500.0)])[:, None, :]
+    return frame_times, positions
+
+
+def test_following_a_dot_is_pursuit_with_unit_gain():
+    frame_times, positions = moving_dot()
+    time = np.arange(1000)
+    xy = np.column_stack([200 + 0.4 * time, np.full(time.size, 505.0)])
+    xy[400:450, 0] += 300  # saccade away and back: 300 px jump
+    xy[600:620] = np.nan
+    labels, objects, gain = classify_samples(time, xy, 1, frame_times, positions, PX_PER_DEG)
+    assert LABELS[labels[100]] == "pursuit" and objects[100] == 0
+    np.testing.assert_allclose(gain[100:300], 1.0, atol=0.05)
+    assert (labels[600:620] == -1).all()
+    table = segments(time, labels, objects, gain, 1)
+    assert {"pursuit", "saccade"} <= set(table["label"])
+    assert table["start"].is_monotonic_increasing
+    assert not ((table["start"] <= 619) & (table["end"] >= 600)).any()
+
+
+def test_looking_elsewhere_is_fixation():
+    frame_times, positions = moving_dot()
+    time = np.arange(1000)
+    xy = np.column_stack([np.full(time.size, 1500.0), np.full(time.size, 900.0)])
+    labels, objects, _ = classify_samples(time, xy, 1, frame_times, positions, PX_PER_DEG)
+    finite = labels >= 0
+    assert (np.asarray(LABELS)[labels[finite]] == "fixation").all() and (objects == -1).all()
+
+
+def test_simulated_dots_stay_on_screen():
+    trial = load_mot_config()[0]
+    screen = (3840, 2160)  # the configured dot layout
+    positions = simulate_objects(trial, screen, 600)
+    assert positions.shape[0] == 601
+    assert (positions >= 0).all() and (positions[..., 0] <= screen[0]).all() and (positions[..., 1] <= screen[1]).all()
+    steps = np.abs(np.diff(positions, axis=0)).max()
+    assert 0 < steps < BALL_RADIUS
+
+
+def test_game_round_without_frames(tmp_path):
+    # round 0 ends as it starts, so it has no rendered frames; round 1 plays normally
+    lines = []
+    for line in (DATA / "REACTION_roi.asc").read_text().splitlines():
+        if line.startswith("MSG") and line.split()[2:4] == ["TRIALID", "2"]:
+            break
+        lines.append(line)
+        if line.startswith("MSG") and line.split()[2:4] == ["TRIALID", "0"]:
+            lines.append(f"MSG\t{line.split()[1]} GAME_OVER")
+    asc_file = tmp_path / "GAME_p01.asc"
+    asc_file.write_text("\n".join(lines) + "\n")
+
+    table = game_pursuit(AscParser(asc_file), px_per_deg=PX_PER_DEG)
+    assert set(table["trial_id"]) == {"1"}
+    assert table["object"].dtype == np.int64 and table["animal_type"].notna().eq(table["object"] >= 0).all()
@@ -0,0 +1,36 @@
+import shutil
+
+import pygame
+import pytest
+
+from parser import AscParser
+from stimulus.RenderReplay import _init_worker, render_job, render_session, trial_frames
+from conftest import DATA
+
+
+@pytest.fixture(scope="module")
+def asc_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "REACTION_p01.asc"
+    shutil.copy(DATA / "REACTION_roi.asc", path)
+    return path
+
+
+def test_frames_cover_every_trial(asc_file):
+    frames = trial_frames(AscParser(asc_file), fps=10)
+    assert list(frames) == [str(k) for k in range(len(frames))]
+    assert all(n >= 1 for _, n in frames.values())
+
+
+def test_jobs_split_frames_without_changing_them(asc_file, tmp_path):
+    n = trial_frames(AscParser(asc_file), fps=5)["1"][1]
+    written = render_session(asc_file, tmp_path / "pool", trial_ids=["1"], fps=5, scale=0.25,
+                             frames_per_job=3, max_workers=2)
+    images = sorted((tmp_path / "pool" / "trial_1").glob("frame_*.png"))
+    assert written == n == len(images)
+
+    _init_worker()
+    last = n - 1
+    assert render_job(str(asc_file), "REACTION", "1", last, n, str(tmp_path / "single"), 5, 0.25, False) == 1
+    single = pygame.image.load(str(tmp_path / "single" / "trial_1" / f"frame_{last:06d}.png"))
+    pooled = pygame.image.load(str(images[last]))
+    assert pygame.image.tobytes(single, "RGB") == pygame.image.tobytes(pooled, "RGB")
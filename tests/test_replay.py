@@ -0,0 +1,107 @@
+import numpy as np
+import pygame
+import pytest
+
+from stimulus.Replay import (SPEEDS, DirtyRects, GazeTrail, MessageIndex, ReplayClock, ReplayTrial, RingBuffer,
+                             TimeIndex)
+
+
+def test_time_index_state_and_spans():
+    index = TimeIndex([30, 10, 20], np.array(["c", "a", "b"]))
+    assert index.at(5) is None and index.at(10) == "a" and index.at(25) == "b"
+    assert list(index.window(10, 30)) == ["b", "c"]  # t0 excluded, t1 included
+
+
+def test_message_index_navigation():
+    messages = MessageIndex([(100, "TRIALID 1"), (400, "MOVEMENT_START"), (900, "MOVEMENT_STOPPED")])
+    assert messages.latest(450, hold_ms=100) == "MOVEMENT_START"
+    assert messages.latest(600, hold_ms=100) is None
+    assert messages.first("MOVEMENT") == 400
+    assert messages.next_time(400) == 900 and messages.previous_time(400) == 100
+    assert messages.next_time(900) is None and messages.previous_time(100) is None
+
+
+def test_trial_bounds_cover_gaze_and_messages():
+    gaze = np.column_stack([np.arange(200, 800), np.zeros(600), np.zeros(600)])
+    trial = ReplayTrial(gaze, None, [(100, "TRIALID 1"), (150, "!MOUSE_POS 5 6"), (900, "TRIAL_END")])
+    assert (trial.start, trial.end) == (100, 900)
+    assert trial.mouse.at(200).tolist() == [5, 6] and len(trial.messages) == 2
+
+
+def test_clock_seek_step_and_speed():
+    clock = ReplayClock(0, 1000, speed=2.0, frame_ms=10)
+    clock.seek(-50)
+    assert clock.time == 0
+    clock.step(3)
+    assert clock.paused and clock.time == 30
+    assert clock.update() == 30  # paused clocks do not advance
+    for _ in range(len(SPEEDS)):
+        clock.faster()
+    assert clock.speed == SPEEDS[-1]
+    for _ in range(len(SPEEDS)):
+        clock.slower()
+    assert clock.speed == SPEEDS[0]
+
+
+def test_clock_rejects_unsupported_speeds():
+    with pytest.raises(ValueError, match="choose one of"):
+        ReplayClock(0, 1000, speed=1.5)
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((64, 48))
+    pygame.quit()
+
+
+def test_dirty_rects_erase_previous_items(screen):
+    layer = pygame.Surface((64, 48))
+    layer.fill((10, 20, 30))
+    dirty = DirtyRects(screen)
+    dirty.begin(layer)
+    dirty.present([pygame.draw.rect(screen, (255, 0, 0), (5, 5, 10, 10))])
+    assert dirty.previous == [pygame.Rect(5, 5, 10, 10)]
+    dirty.begin(layer)
+    assert screen.get_at((8, 8))[:3] == (10, 20, 30)
+
+    dirty.present([])
+    dirty.invalidate()
+    screen.fill((0, 0, 0))
+    dirty.begin(layer)
+    assert dirty.previous is None and screen.get_at((60, 40))[:3] == (10, 20, 30)
+
+
+def test_ring_buffer_keeps_the_latest_rows_in_order():
+    rng = np.random.default_rng(0)
+    ring = RingBuffer(7, 2)
+    times, values = [], []
+    for _ in range(200):
+        n = int(rng.integers(0, 12))
+        new_times, new_values = np.arange(len(times), len(times) + n, dtype=float), rng.random((n, 2))
+        ring.extend(new_times, new_values)
+        times += new_times.tolist()
+        values += new_values.tolist()
+        ordered_times, ordered_values = ring.ordered()
+        keep = min(7, len(times))
+        assert ordered_times.tolist() == times[len(times) - keep:]
+        np.testing.assert_array_equal(ordered_values, np.reshape(values[len(values) - keep:], (-1, 2)))
+    ring.clear()
+    assert ring.ordered()[0].size == 0
+
+
+def test_gaze_trail_draws_and_clears_the_recent_path(screen):
+    time = np.arange(0, 2000, 2.0)
+    x = np.where(time < 1000, 10.0, 50.0)
+    gaze = np.column_stack([time, x, np.linspace(5, 40, len(time))])
+    gaze[(time > 1400) & (time < 1700), 1:] = np.nan
+    trail = GazeTrail(ReplayTrial(gaze, None, [(0, "TRIALID 1")]), screen.get_size(), trail_ms=200)
+
+    [rect] = trail.draw(screen, 900)
+    assert rect.collidepoint(10, 19) and rect.right < 20  # y runs from 17 to 21 in the last 200 ms
+    assert trail.surface.get_at((10, 19)).a > 0
+
+    [rect] = trail.draw(screen, 1300)
+    assert rect.left > 40 and trail.surface.get_at((10, 19)).a == 0
+    assert trail.draw(screen, 1650) == []
+    assert len(trail.draw(screen, 100)) == 1  # seeking back refills the history
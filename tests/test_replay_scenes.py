@@ -0,0 +1,57 @@
+import numpy as np
+import pygame
+import pytest
+
+from parser import AscParser
+from Analysis.game_trajectories import GameTimeline
+from stimulus.Replay import MessageIndex
+from stimulus.ReplayScenes import GameScene, build_scene, scene_font
+from conftest import DATA
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def test_search_display_is_rendered_once_per_state():
+    asc = AscParser(DATA / "SEARCH_roi.asc")
+    trial, scene = build_scene(asc, "1", "SEARCH", scene_font("SEARCH"))
+    size = (2048, 1152)
+    before = scene.layer(size, scene.onset - 1)
+    after = scene.layer(size, scene.onset)
+    assert scene.layer(size, trial.start) is before and scene.layer(size, trial.end) is after
+    assert after is not before
+    # the search display has many more dark pixels than the fixation cross
+    dark = [(pygame.surfarray.array3d(layer).sum(axis=2) < 600).sum() for layer in (before, after)]
+    assert dark[1] > dark[0] > 0
+    assert scene.layer((640, 360), scene.onset) is not after
+
+
+def test_reaction_scene_shows_the_digits_from_target_onset():
+    asc = AscParser(DATA / "REACTION_roi.asc")
+    # the target of trial 5 lies on the 2048x1152 test screen
+    trial, scene = build_scene(asc, "5", "REACTION", scene_font("REACTION"))
+    before, after = scene.layer((2048, 1152), scene.onset - 1), scene.layer((2048, 1152), scene.onset)
+    assert pygame.image.tobytes(before, "RGB") != pygame.image.tobytes(after, "RGB")
+
+
+def test_game_scene_draws_visible_animals_and_distractions():
+    frame_times = np.arange(0, 1000, 20, dtype=np.int64)
+    positions = np.full((50, 2, 2), np.nan, dtype=np.float32)
+    positions[:, 0] = (300, 300)
+    positions[25:, 1] = (900, 600)
+    timeline = GameTimeline("0", ["fox", "bear"], frame_times, positions, np.array([0, 25]))
+    scene = GameScene(timeline, MessageIndex([(600, "VISUAL_DISTRACTION 1 100 100")]))
+    surface = pygame.Surface((1280, 720))
+    assert len(scene.draw_moving(surface, 100)) == 1
+    rects = scene.draw_moving(surface, 700)
+    assert len(rects) == 3 and rects[0].collidepoint(100, 100)
+    assert scene.layer((1280, 720), 0) is GameScene(timeline, MessageIndex([])).layer((1280, 720), 500)
+
+
+def test_unknown_task_has_no_scene():
+    with pytest.raises(ValueError, match="No replay scene"):
+        build_scene(AscParser(DATA / "REACTION_roi.asc"), "0", "TYPING", scene_font("MOT"))
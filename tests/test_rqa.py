@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from Analysis.rqa import rqa
+
+
+def run_points(cells, min_line):
+    """Points on runs of at least *min_line* consecutive True cells."""
+    total = run = 0
+    for cell in list(cells) + [False]:
+        if cell:
+            run += 1
+            continue
+        total += run if run >= min_line else 0
+        run = 0
+    return total
+
+
+def naive_rqa(points, radius, min_line):
+    n = len(points)
+    dist = np.hypot(*(points[:, None, :] - points[None, :, :]).transpose(2, 0, 1))
+    rec = np.triu(dist <= radius, k=1)
+    count = rec.sum()
+    diagonal = sum(run_points(np.diagonal(rec, offset), min_line) for offset in range(1, n))
+    vertical = sum(run_points(rec[:, j], min_line) for j in range(n))
+    horizontal = sum(run_points(rec[i], min_line) for i in range(n))
+    i, j = np.nonzero(rec)
+    return {
+        "recurrences": count,
+        "recurrence": 100 * 2 * count / (n * (n - 1)),
+        "determinism": 100 * diagonal / count,
+        "laminarity": 100 * (horizontal + vertical) / (2 * count),
+        "corm": 100 * (j - i).sum() / ((n - 1) * count),
+    }
+
+
+@pytest.mark.parametrize("block_elements", [7, 64, 1 << 22])
+def test_banded_rqa_matches_full_matrix(block_elements):
+    rng = np.random.default_rng(3)
+    # a few revisited locations so that lines of every kind occur
+    points = rng.integers(0, 5, (60, 2)) * 100 + rng.normal(0, 5, (60, 2))
+    result = rqa(points, radius=30, min_line=2, block_elements=block_elements)
+    for name, value in naive_rqa(points, 30, 2).items():
+        assert result[name] == pytest.approx(value), name
+
+
+def test_rqa_drops_missing_fixations_and_short_sequences():
+    result = rqa(np.array([[0.0, 0.0], [np.nan, 1.0]]))
+    assert result["n_fixations"] == 1 and np.isnan(result["recurrence"])
+    assert rqa(np.array([[0.0, 0.0], [500.0, 0.0]]))["recurrence"] == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import Analysis.saccade_latency as saccade_latency
+from parser import AscParser
+from Analysis.saccade_latency import MAX_LATENCY_MS, MIN_LATENCY_MS, first_saccades, stimulus_layout
+from Analysis.task_constants import DIST_FROM_CENTER, REACTION_TRIALS_PER_PHASE
+from conftest import DATA
+
+
+@pytest.fixture(scope="module")
+def asc():
+    return AscParser(DATA / "REACTION_roi.asc")
+
+
+def test_layout_places_items_on_the_circle():
+    layout = stimulus_layout((2048, 1152))
+    radius = np.hypot(layout["target_x"] - 1024, layout["target_y"] - 576)
+    assert np.allclose(radius, DIST_FROM_CENTER, atol=2)
+    phase_one = ~layout["with_distractors"]
+    assert phase_one.sum() == REACTION_TRIALS_PER_PHASE
+    assert layout.loc[phase_one, "distractor_1_x"].isna().all()
+    assert layout.loc[~phase_one, "distractor_1_x"].notna().all()
+
+
+def test_latencies_stay_in_window(asc):
+    result = first_saccades(asc)
+    latency = result["latency"].dropna()
+    assert len(latency) and latency.between(MIN_LATENCY_MS, MAX_LATENCY_MS).all()
+    assert result.loc[result["latency"].isna(), "landing_item"].eq(-1).all()
+
+
+def test_onsets_outside_trials_are_dropped(asc, monkeypatch):
+    trial_of = saccade_latency.trial_of
+    monkeypatch.setattr(saccade_latency, "trial_of",
+                        lambda asc, times: np.array([None] + list(trial_of(asc, times)[1:]), dtype=object))
+    result = first_saccades(asc)
+    assert len(result) == len(saccade_latency.event_times(asc, "TARGET_DRAWN")) - 1
+    assert result["trial_id"].notna().all()
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from Analysis.scanpath_similarity import MEASURES, _lowest_cost_path, levenshtein, pairwise_similarity
+
+SCREEN = (2048, 1152)
+
+
+def naive_levenshtein(a, b):
+    d = np.arange(len(b) + 1)
+    for i, x in enumerate(a, start=1):
+        prev, d[0] = d.copy(), i
+        for j, y in enumerate(b, start=1):
+            d[j] = min(prev[j] + 1, d[j - 1] + 1, prev[j - 1] + (x != y))
+    return int(d[-1])
+
+
+def naive_path_cost(cost):
+    n, m = cost.shape
+    acc = np.full((n, m), np.inf)
+    for i in range(n):
+        for j in range(m):
+            best = 0.0 if i == j == 0 else min(acc[i - 1, j] if i else np.inf, acc[i, j - 1] if j else np.inf,
+                                               acc[i - 1, j - 1] if i and j else np.inf)
+            acc[i, j] = best + cost[i, j]
+    return acc[-1, -1]
+
+
+def test_levenshtein_matches_naive_dp():
+    rng = np.random.default_rng(0)
+    assert levenshtein(np.array([1, 2, 3]), np.array([])) == 3
+    for _ in range(200):
+        a, b = rng.integers(0, 4, rng.integers(0, 9)), rng.integers(0, 4, rng.integers(0, 9))
+        assert levenshtein(a, b) == naive_levenshtein(a, b)
+
+
+def test_lowest_cost_path_is_monotone_and_optimal():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        cost = rng.random((rng.integers(1, 8), rng.integers(1, 8)))
+        pi, pj = _lowest_cost_path(cost)
+        assert (pi[0], pj[0]) == (0, 0) and (pi[-1], pj[-1]) == (cost.shape[0] - 1, cost.shape[1] - 1)
+        steps = np.column_stack([np.diff(pi), np.diff(pj)])
+        assert ((steps >= 0) & (steps <= 1)).all() and steps.any(axis=1).all()
+        assert cost[pi, pj].sum() == pytest.approx(naive_path_cost(cost))
+
+
+def scanpath(seed, n=6):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0, SCREEN[0], n), rng.uniform(0, SCREEN[1], n), rng.uniform(100, 400, n)])
+
+
+def test_pairwise_similarity_scores_only_given_pairs(tmp_path):
+    paths = {p: scanpath(k) for k, p in enumerate("abc")}
+    with ThreadPoolExecutor(2) as pool:
+        first = pairwise_similarity("1", {p: paths[p] for p in "ab"}, SCREEN, "MOT", cache_root=tmp_path,
+                                    sources={"a": "a1", "b": "b1"}, executor=pool)
+        # "a" is only in the cache: its pair with "c" must stay unscored, not be stored as NaN
+        pairwise_similarity("1", {"c": paths["c"]}, SCREEN, "MOT", cache_root=tmp_path, executor=pool)
+        full = pairwise_similarity("1", paths, SCREEN, "MOT", cache_root=tmp_path,
+                                   sources={"a": "a1", "b": "b1"}, executor=pool)
+    assert set(first) == set(MEASURES)
+    table = full["string_edit"]
+    assert np.isfinite(table.to_numpy()).all()
+    assert table.loc["a", "b"] == first["string_edit"].loc["a", "b"]
+    assert table.loc["a", "c"] == table.loc["c", "a"]
+    # one cache file per task and trial
+    other = list(tmp_path.rglob("*.npz"))
+    assert len(other) == 1 and other[0].name.startswith("MOT_trial_1_")
@@ -0,0 +1,23 @@
+import numpy as np
+
+from Analysis.trial_arrays import expand_ranges, interval_mask, true_runs
+
+
+def test_true_runs():
+    starts, ends = true_runs(np.array([1, 1, 0, 0, 1, 0, 1], dtype=bool))
+    np.testing.assert_array_equal(starts, [0, 4, 6])
+    np.testing.assert_array_equal(ends, [2, 5, 7])
+    assert true_runs(np.zeros(3, dtype=bool))[0].size == 0
+
+
+def test_interval_mask_is_closed_and_handles_overlaps():
+    time = np.arange(10)
+    mask = interval_mask(time, np.array([2, 3, 8]), np.array([4, 5, 20]))
+    np.testing.assert_array_equal(np.flatnonzero(mask), [2, 3, 4, 5, 8, 9])
+    assert not interval_mask(time, np.array([], dtype=int), np.array([], dtype=int)).any()
+
+
+def test_expand_ranges_flattens_windows():
+    owner, index = expand_ranges(np.array([2, 5, 0]), np.array([4, 5, 1]))
+    np.testing.assert_array_equal(owner, [0, 0, 2])
+    np.testing.assert_array_equal(index, [2, 3, 0])
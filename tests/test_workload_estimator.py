@@ -0,0 +1,49 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from EyeTracking.WorkloadEstimator import RingBuffer, WorkloadEstimator
+
+
+def test_ring_buffer_evicts_oldest_rows_in_order():
+    ring, reference = RingBuffer(3, 2), deque()
+    for k in range(7):
+        evicted = ring.push((k, -k))
+        reference.append((k, -k))
+        if len(reference) > 3:
+            assert tuple(evicted) == reference.popleft()
+        else:
+            assert evicted is None
+        assert tuple(ring.oldest()) == reference[0]
+    assert tuple(ring.pop_oldest()) == reference.popleft()
+    assert ring.count == 2 and tuple(ring.oldest()) == reference[0]
+
+
+def test_running_features_match_the_window():
+    rng = np.random.default_rng(0)
+    n = 3000
+    samples = np.column_stack([np.arange(n, dtype=float), rng.normal(500, 20, n), rng.normal(400, 10, n),
+                               rng.normal(1000, 50, n)])
+    samples[rng.random(n) < 0.1, 1:] = np.nan
+    estimator = WorkloadEstimator(sample_rate=1000, window_s=1.0, baseline_s=1.0, emit_hz=4.0)
+    emitted = [r for r in (estimator.push(*row) for row in samples) if r is not None]
+
+    window = samples[samples[:, 0] > samples[-1, 0] - 1000]
+    valid = np.isfinite(window[:, 1:]).all(axis=1)
+    features = estimator.features()
+    assert features["pupil_mean"] == pytest.approx(window[valid, 3].mean())
+    assert features["dispersion"] == pytest.approx(np.hypot(window[valid, 1].std(), window[valid, 2].std()))
+    assert features["missing_fraction"] == pytest.approx(1 - valid.mean())
+
+    times = np.array([r["time"] for r in emitted])
+    np.testing.assert_allclose(np.diff(times), 250)
+    assert [r["calibrating"] for r in emitted] == [t - samples[0, 0] < 1000 for t in times]
+    assert np.isfinite([r["score"] for r in emitted if not r["calibrating"]]).all()
+
+
+def test_out_of_order_samples_are_ignored():
+    estimator = WorkloadEstimator()
+    estimator.push(10.0, 1.0, 1.0, 1000.0)
+    assert estimator.push(5.0, 1.0, 1.0, 1000.0) is None
+    assert estimator.buffer.count == 1